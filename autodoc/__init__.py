@@ -0,0 +1,39 @@
+"""
+AutoDoc AI engine: question loading, answer generation, DOCX rendering and
+progress handling, importable without Tk. Run `python -m autodoc --help` for the CLI.
+
+Names are imported from their modules on first use, so `import autodoc` (or
+one of its light modules, such as autodoc.config) does not load openai,
+python-docx or numpy until something needs them.
+"""
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    "VERSION": "config", "MODEL_PRICING": "config", "DEFAULT_TEMPLATES": "config",
+    "RunControl": "control", "Cancelled": "control",
+    "OpenAIClient": "client", "RateLimiter": "client", "get_rate_limiter": "client",
+    "parse_markdown_to_docx": "render", "add_formatted_text": "render",
+    "AnswerCache": "cache", "BatchRunner": "batch", "build_batch_requests": "batch",
+    "DocxWriter": "writer", "ProgressJournal": "journal",
+    "QuestionDetector": "extract", "QuestionLoader": "extract", "iter_questions": "extract", "load_questions": "extract",
+    "SimilarQuestions": "similar", "EmbeddingIndex": "similar", "HashEmbedder": "similar", "OpenAIEmbedder": "similar",
+    "Packer": "packing",
+    "OpenAIBackend": "backends", "FakeBackend": "backends", "get_backend": "backends", "available_models": "backends",
+    "Router": "routing",
+    "list_volumes": "volumes", "combine_volumes": "volumes",
+    "Engine": "engine", "default_output_path": "utils",
+    "Job": "jobs", "JobQueue": "jobs", "JobRunner": "jobs", "collect_inputs": "jobs",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,15 @@
+import os
+import sys
+import logging
+
+from .cli import main
+
+code = main()
+if code == 130:
+    # Interrupted: requests still in flight were abandoned (they are redone on
+    # resume), so exit without waiting for them to come back.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    logging.shutdown()
+    os._exit(code)
+sys.exit(code)
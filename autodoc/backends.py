@@ -0,0 +1,212 @@
+"""
+Model backends. A model is named "<backend>:<model>", e.g. "local:llama3.1:8b";
+a bare name such as "gpt-4o-mini" is an OpenAI model. Every backend answers
+chat completions in the OpenAI SDK's response shapes:
+
+- "openai": the OpenAI API (OPENAI_BASE_URL is honoured as usual).
+- Any OpenAI-compatible server (vLLM, llama.cpp, Ollama, another host),
+  declared in backends.json with its base URL, prices and rate limits:
+
+      {"local": {"base_url": "http://localhost:11434/v1",
+                 "pricing": {"llama3.1:8b": [0, 0]},
+                 "limits": {"llama3.1:8b": [600, 2000000]}}}
+
+  Optional keys: "api_key" or "api_key_env" (local servers usually need
+  neither), "default_limits" for models not in "limits". Models listed in
+  "pricing" are offered in the GUI; any other name can be used as well.
+- "fake": deterministic offline answers for tests and benchmarks (see
+  FakeBackend); no key, no network. A backends.json entry with
+  "type": "fake" adds another one, e.g. with a "latency" in seconds.
+
+HTTP backends share one connection pool (keep-alive, HTTP/2 when the `h2`
+package is installed), so connections stay warm across questions, files
+and runs instead of each run opening its own. The openai package is only
+imported when the first HTTP backend is created.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import importlib.util
+from types import SimpleNamespace
+
+from .config import (MODEL_PRICING, MODEL_LIMITS, DEFAULT_LIMITS, LOCAL_DEFAULT_LIMITS, BACKENDS_FILE,
+                     HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_SECS,
+                     CONNECT_TIMEOUT_SECS, REQUEST_TIMEOUT_SECS)
+
+# ================= REGISTRY =================
+BUILTIN_BACKENDS = {
+    "openai": {"pricing": MODEL_PRICING, "limits": MODEL_LIMITS, "default_limits": DEFAULT_LIMITS},
+    "fake": {"pricing": {"test": (0, 0)}, "default_limits": LOCAL_DEFAULT_LIMITS, "latency": 0.0},
+}
+
+_specs = None
+_specs_lock = threading.Lock()
+
+def backend_specs():
+    """{backend name: spec}: the built-in backends, updated from BACKENDS_FILE (read once)."""
+    global _specs
+    with _specs_lock:
+        if _specs is None:
+            specs = {name: dict(spec) for name, spec in BUILTIN_BACKENDS.items()}
+            try:
+                with open(BACKENDS_FILE, encoding="utf-8") as f: extra = json.load(f)
+            except FileNotFoundError:
+                extra = {}
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring {BACKENDS_FILE}: {e}")
+                extra = {}
+            for name, spec in extra.items():
+                if not isinstance(spec, dict): continue
+                specs[name] = {"default_limits": LOCAL_DEFAULT_LIMITS, **specs.get(name, {}), **spec}
+            _specs = specs
+        return _specs
+
+def split_model(model):
+    """("backend", "model") for a model name; names without a known backend prefix are OpenAI models."""
+    backend, sep, name = model.partition(":")
+    if sep and name and backend in backend_specs(): return backend, name
+    return "openai", model
+
+def model_pricing(model):
+    """(USD per 1M input tokens, per 1M output tokens); (0, 0) for unknown models."""
+    backend, name = split_model(model)
+    return tuple(backend_specs()[backend].get("pricing", {}).get(name, (0, 0)))
+
+def model_limits(model):
+    """Starting (requests/min, tokens/min) budget for a model."""
+    backend, name = split_model(model)
+    spec = backend_specs()[backend]
+    return tuple(spec.get("limits", {}).get(name, spec.get("default_limits", DEFAULT_LIMITS)))
+
+def available_models():
+    """Model names to offer in pickers: OpenAI models first, then each configured backend's priced models."""
+    models = list(MODEL_PRICING)
+    for backend, spec in backend_specs().items():
+        if backend in ("openai", "fake"): continue
+        models += [f"{backend}:{name}" for name in spec.get("pricing", {})]
+    return models
+
+def needs_api_key(*models):
+    """Whether any of the models is served by the OpenAI API (and so needs OPENAI_API_KEY)."""
+    return any(m and split_model(m)[0] == "openai" for m in models)
+
+# ================= HTTP POOL =================
+HTTP2 = importlib.util.find_spec("h2") is not None
+_http_client = None
+_http_lock = threading.Lock()
+
+def get_http_client():
+    """The connection pool shared by every HTTP backend in the process."""
+    global _http_client
+    with _http_lock:
+        if _http_client is None:
+            from openai import DefaultHttpxClient, DEFAULT_CONNECTION_LIMITS
+            limits = type(DEFAULT_CONNECTION_LIMITS)(max_connections=HTTP_MAX_CONNECTIONS,
+                                                     max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                                                     keepalive_expiry=HTTP_KEEPALIVE_SECS)
+            _http_client = DefaultHttpxClient(http2=HTTP2, limits=limits)
+        return _http_client
+
+# ================= BACKENDS =================
+class OpenAIBackend:
+    """The OpenAI API, or any server with an OpenAI-compatible chat completions endpoint."""
+    def __init__(self, name, spec, api_key=None, timeout=REQUEST_TIMEOUT_SECS):
+        from openai import OpenAI, Timeout
+        self.name = name
+        if name != "openai":
+            api_key = spec.get("api_key") or os.getenv(spec.get("api_key_env") or "", "") or "none"
+        # Retries (429, 408, 409, 5xx, connection errors) are handled by OpenAIClient so every wait is cancellable
+        self.client = OpenAI(api_key=api_key or None, base_url=spec.get("base_url"), max_retries=0,
+                             timeout=Timeout(timeout, connect=CONNECT_TIMEOUT_SECS), http_client=get_http_client())
+
+    def create(self, **kwargs):
+        """(response headers, parsed completion or stream) for one chat completion request."""
+        raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+        return raw.headers, raw.parse()
+
+FAKE_WORDS = ("analysis framework policy evidence reform governance impact growth institutions challenges "
+              "stakeholders outcomes balance justice sustainability federal constitutional economic social "
+              "ethical regional capacity welfare accountability transparency innovation resilience").split()
+
+class FakeBackend:
+    """
+    Deterministic offline answers: the same question, model and temperature
+    always get the same markdown answer. Its length is picked from a hash of
+    the request (about 80-450 tokens) and cut at `max_tokens` with finish_reason
+    "length". JSON-mode requests (packing) get {"answers": [...]} with one
+    entry per question id. Each request takes `latency` seconds; streaming
+    and usage are reported like the real API. Tokens are ~4 characters.
+    """
+    def __init__(self, name="fake", spec=None, api_key=None, timeout=None):
+        self.name = name
+        self.latency = float((spec or {}).get("latency", 0.0))
+
+    @staticmethod
+    def answer(question, model, temperature):
+        seed = int.from_bytes(hashlib.blake2b(f"{model}|{temperature}|{question}".encode("utf-8"), digest_size=8).digest(), "little")
+        words = [FAKE_WORDS[((seed >> (k % 48)) + k) % len(FAKE_WORDS)] for k in range(15 + seed % 120)]
+        points = [" ".join(words[k:k + 8]).capitalize() for k in range(0, len(words), 8)]
+        return (f"## Introduction\n{question.strip()[:200]}\n\n## Key Points\n"
+                + "\n".join(f"- **Point {k+1}:** {p}." for k, p in enumerate(points))
+                + f"\n\n## Conclusion\n{points[-1]}.")
+
+    def create(self, model, messages, temperature=1.0, max_tokens=None, stream=False, stream_options=None,
+               response_format=None, **kwargs):
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        if (response_format or {}).get("type") == "json_object":
+            try: items = json.loads(user)
+            except ValueError: items = []
+            content = json.dumps({"answers": [{"id": it.get("id"), "answer": self.answer(it.get("question", ""), model, temperature)}
+                                              for it in items if isinstance(it, dict)]}, ensure_ascii=False)
+        else:
+            content = self.answer(user, model, temperature)
+        finish_reason = "stop"
+        if max_tokens and len(content) > max_tokens * 4:
+            content, finish_reason = content[:max_tokens * 4], "length"
+        pt, ct = (len(system) + len(user)) // 4 + 1, len(content) // 4 + 1
+        usage = SimpleNamespace(prompt_tokens=pt, completion_tokens=ct, total_tokens=pt + ct)
+        if self.latency: time.sleep(self.latency)
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            return {}, FakeStream(content, finish_reason, usage if include_usage else None)
+        message = SimpleNamespace(role="assistant", content=content)
+        return {}, SimpleNamespace(model=model, choices=[SimpleNamespace(message=message, finish_reason=finish_reason)], usage=usage)
+
+class FakeStream:
+    """Iterates a fake answer as streamed chunks of a few words each."""
+    CHUNK_CHARS = 24
+
+    def __init__(self, content, finish_reason, usage):
+        self.content = content
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.closed = False
+
+    def __iter__(self):
+        for start in range(0, len(self.content), self.CHUNK_CHARS):
+            if self.closed: return
+            delta = SimpleNamespace(content=self.content[start:start + self.CHUNK_CHARS])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=None, finish_reason=self.finish_reason)], usage=None)
+        if self.usage: yield SimpleNamespace(choices=[], usage=self.usage)
+
+    def close(self):
+        self.closed = True
+
+BACKEND_TYPES = {"fake": FakeBackend}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name, api_key=None, timeout=REQUEST_TIMEOUT_SECS):
+    """The backend called `name`, shared by every client in the process (backends are thread-safe)."""
+    key = (name, api_key if name == "openai" else None, timeout)
+    with _backends_lock:
+        if key not in _backends:
+            spec = backend_specs()[name]
+            _backends[key] = BACKEND_TYPES.get(spec.get("type", name), OpenAIBackend)(name, spec, api_key, timeout)
+        return _backends[key]
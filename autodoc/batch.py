@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import logging
+
+from .client import get_retry_after, is_transient
+from .config import BATCH_POLL_SECS, BATCH_COMPLETION_WINDOW
+from .utils import load_json, save_json
+
+def build_batch_requests(indexed_questions, system_prompt, model, temp, max_tokens):
+    """Builds Batch API request lines; custom_id carries the question index."""
+    return [{
+        "custom_id": f"q-{i}",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": q}
+            ],
+            "temperature": temp,
+            "max_tokens": max_tokens
+        }
+    } for i, q in indexed_questions]
+
+class BatchRunner:
+    """
+    Submits a question set to the OpenAI Batch API and collects the results.
+    `client` is an `openai.OpenAI` instance or any object exposing the same
+    `files` and `batches` methods (e.g. a fake for tests, or a stub server via OPENAI_BASE_URL).
+    The batch id is persisted in `state_file` so polling resumes after a restart.
+    """
+    TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client, state_file):
+        self.client = client
+        self.state_file = state_file
+        self.state = load_json(state_file, {})
+
+    @property
+    def batch_id(self):
+        return self.state.get("batch_id")
+
+    def submit(self, requests, metadata=None):
+        payload = "\n".join(json.dumps(r) for r in requests).encode('utf-8')
+        upload = self.client.files.create(file=("autodoc_batch.jsonl", payload), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        self.state = {"batch_id": batch.id, "input_file_id": upload.id, "submitted": time.time(), **(metadata or {})}
+        save_json(self.state_file, self.state)
+        return batch
+
+    def wait(self, stop_event, on_status=None, poll_secs=None):
+        """
+        Polls until the batch reaches a terminal state; returns None if stopped first.
+        A poll that hits a 429, a connection error or a transient status error is
+        retried with backoff (at most `poll_secs` apart), since the batch keeps
+        running on the server meanwhile; other errors are raised.
+        """
+        from openai import RateLimitError, APIConnectionError, APIStatusError # Deferred, as in client.py
+        poll_secs = poll_secs or BATCH_POLL_SECS
+        failures = 0
+        while True:
+            try:
+                batch = self.client.batches.retrieve(self.batch_id)
+            except (RateLimitError, APIConnectionError, APIStatusError) as e:
+                if isinstance(e, APIStatusError) and not isinstance(e, RateLimitError) and not is_transient(e): raise
+                wait_time = min(get_retry_after(e) or 2 * (2 ** failures), poll_secs)
+                failures += 1
+                logging.warning(f"Polling batch {self.batch_id} failed ({failures}): {e}. Retrying in {wait_time:.1f}s...")
+                if stop_event.wait(wait_time): return None
+                continue
+            failures = 0
+            if on_status: on_status(batch)
+            if batch.status in self.TERMINAL_STATES: return batch
+            if stop_event.wait(poll_secs): return None
+
+    def fetch_results(self, batch):
+        """Returns ({index: (answer, prompt_tokens, completion_tokens)}, {index: error message})."""
+        results, errors = {}, {}
+        if getattr(batch, "output_file_id", None):
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip(): continue
+                item = json.loads(line)
+                i = int(item["custom_id"].split("-", 1)[1])
+                resp = item.get("response") or {}
+                if resp.get("status_code") == 200:
+                    body = resp["body"]
+                    usage = body.get("usage") or {}
+                    results[i] = (body["choices"][0]["message"]["content"], usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+                else:
+                    errors[i] = (item.get("error") or resp.get("body", {}).get("error") or {}).get("message", "Request failed")
+        if getattr(batch, "error_file_id", None):
+            for line in self.client.files.content(batch.error_file_id).text.splitlines():
+                if not line.strip(): continue
+                item = json.loads(line)
+                i = int(item["custom_id"].split("-", 1)[1])
+                errors.setdefault(i, ((item.get("error") or {}).get("message") or "Request failed"))
+        return results, errors
+
+    def clear(self):
+        self.state = {}
+        if os.path.exists(self.state_file): os.remove(self.state_file)
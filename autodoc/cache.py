@@ -0,0 +1,76 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+from .config import CACHE_FILE, CACHE_MAX_AGE_DAYS, CACHE_MAX_ENTRIES
+
+class AnswerCache:
+    """
+    Persistent SQLite cache of generated answers, keyed by a hash of
+    (system prompt, question, model, temperature). Safe to share across threads.
+
+    With `read_only` the file must exist and is opened as it is: no schema
+    migration, no eviction and no writes (for the dry-run estimator).
+    """
+    def __init__(self, path=CACHE_FILE, max_age_days=CACHE_MAX_AGE_DAYS, max_entries=CACHE_MAX_ENTRIES, read_only=False):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if read_only:
+            self.conn = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+            return
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY, answer TEXT NOT NULL,
+                prompt_tokens INTEGER, completion_tokens INTEGER,
+                created REAL NOT NULL, accessed REAL NOT NULL)""")
+            # Columns added after the first release; also feed the cost/time estimator
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(answers)")}
+            if "model" not in columns: self.conn.execute("ALTER TABLE answers ADD COLUMN model TEXT")
+            if "latency" not in columns: self.conn.execute("ALTER TABLE answers ADD COLUMN latency REAL")
+        self.evict(max_age_days, max_entries)
+
+    @staticmethod
+    def make_key(system_prompt, question, model, temp):
+        raw = json.dumps([system_prompt.strip(), question.strip(), model, round(float(temp), 2)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns (answer, prompt_tokens, completion_tokens) or None."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT answer, prompt_tokens, completion_tokens FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE answers SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def put(self, key, answer, prompt_tokens, completion_tokens, model=None, latency=None):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("""INSERT OR REPLACE INTO answers
+                (key, answer, prompt_tokens, completion_tokens, created, accessed, model, latency)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, answer, prompt_tokens, completion_tokens, now, now, model, latency))
+
+    def history(self, model):
+        """Returns (answers, avg completion tokens, avg latency or None) recorded for `model`."""
+        with self.lock:
+            n, ct, latency = self.conn.execute(
+                "SELECT COUNT(*), AVG(completion_tokens), AVG(latency) FROM answers WHERE model = ?", (model,)).fetchone()
+        return n, ct, latency
+
+    def evict(self, max_age_days, max_entries):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM answers WHERE created < ?", (time.time() - max_age_days * 86400,))
+            self.conn.execute("""DELETE FROM answers WHERE key IN (
+                SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (max_entries,))
+
+    def close(self):
+        with self.lock: self.conn.close()
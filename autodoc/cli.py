@@ -0,0 +1,127 @@
+"""
+Headless command line entry point:
+
+    python -m autodoc questions.docx -p "UPSC GS Expert" -m gpt-4o-mini -c 8
+    python -m autodoc papers/ -o answers/ --mode batch
+    python -m autodoc questions.docx -m local:llama3.1:8b --hard-model gpt-4o
+    python -m autodoc big_bank.docx --volume-size 500 --combine index
+"""
+import os
+import sys
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from .config import (VERSION, LOG_FILE, DEBUG_MODE, TEMPLATES_FILE, DEFAULT_TEMPLATES,
+                     DEFAULT_CONCURRENCY, MAX_CONCURRENCY, MAX_PARALLEL_JOBS, USD_TO_INR,
+                     DEDUPE_MODES, DEDUPE_THRESHOLD, VOLUME_SIZE, VOLUME_COMBINE_MODES)
+from .engine import Engine
+from .extract import QuestionLoader, load_questions
+from .jobs import JobQueue, JobRunner, collect_inputs
+from .estimate import estimate_run, format_estimate
+from .metrics import format_routes
+from .backends import available_models, needs_api_key
+from .utils import load_json, default_output_path
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m autodoc", description=f"AutoDoc AI {VERSION} - generate answers for DOCX question papers.")
+    parser.add_argument("inputs", nargs="+", help="Input .docx files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help="Output .docx (single input) or output directory (multiple inputs)")
+    parser.add_argument("-p", "--profile", default="UPSC Mains Expert", help="Profile name from templates.json")
+    parser.add_argument("--system-prompt", help="Custom system instruction (overrides --profile)")
+    parser.add_argument("-m", "--model", default="gpt-4o-mini",
+                        help=f"Model name ({', '.join(available_models())}), or <backend>:<model> for a backend in backends.json")
+    parser.add_argument("--hard-model", help="Send hard questions (high marks or long) to this model and the rest to --model")
+    parser.add_argument("--adaptive", action="store_true", help="Size max_tokens per question (short/standard/long, word limits, profile); cut-off answers are retried bigger")
+    parser.add_argument("-t", "--temperature", type=float, default=0.5)
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Requests in flight (1-{MAX_CONCURRENCY})")
+    parser.add_argument("-j", "--parallel-files", type=int, default=MAX_PARALLEL_JOBS, help="Input files processed at the same time")
+    parser.add_argument("--mode", choices=["interactive", "batch"], default="interactive")
+    parser.add_argument("--page-break", action="store_true", help="Insert a page break after each answer")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse cached answers")
+    parser.add_argument("--stream", action="store_true", help="Stream responses (records time-to-first-token)")
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, help="Answer near-duplicate questions once; repeats get a cross-reference or a copy")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEDUPE_THRESHOLD, help="Cosine similarity at which questions count as duplicates")
+    parser.add_argument("--embeddings", choices=["local", "openai"], default="local", help="Embeddings for --dedupe (local: offline hashing)")
+    parser.add_argument("--reuse-earlier", action=argparse.BooleanOptionalAction, help="With --dedupe: reuse cached answers of near-duplicates from earlier papers (default: only with --embeddings openai)")
+    parser.add_argument("--pack", action="store_true", help="Answer several short questions per request (JSON mode); malformed replies fall back to one request per question")
+    parser.add_argument("--volume-size", type=int, default=VOLUME_SIZE, metavar="N", help="Split the output into volumes of N questions (<output>_Vol01.docx, ...); 0: one document")
+    parser.add_argument("--combine", choices=VOLUME_COMBINE_MODES, help="With --volume-size: when done, write <output> as an index linking the volumes or as one merged document")
+    parser.add_argument("--estimate", action="store_true", help="Dry run: print projected tokens, cost and time per model, then exit")
+    parser.add_argument("--api-key", help="OpenAI API key (default: OPENAI_API_KEY)")
+    return parser
+
+def print_event(kind, data):
+    if kind == "log":
+        print(f"• {data}", flush=True)
+    elif kind == "progress":
+        print(f"  [{data['val']:3d}%] {data['text']}", flush=True)
+    elif kind == "stats":
+        latency = f" | TTFT {data['ttft']:.2f}s | {data['tps']:.0f} tok/s" if data.get("ttft") is not None else ""
+        if data.get("qpm") is not None: latency += f" | {data['qpm']:.1f} Q/min"
+        print(f"  ${data['usd']:.4f} | ₹{data['usd']*USD_TO_INR:.2f} | ETA: {data['eta']}{latency}", flush=True)
+        if data.get("routes"): print(f"  Routes: {format_routes(data['routes'])}", flush=True)
+    elif kind == "job" and data["status"] != "running":
+        print(f"{os.path.basename(data['input_path'])}: {data['status']} ({data['processed']}/{data['total']}, ${data['cost']:.4f})", flush=True)
+
+def main(argv=None):
+    logging.basicConfig(filename=LOG_FILE, level=logging.DEBUG if DEBUG_MODE else logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.system_prompt:
+        sys_prompt = args.system_prompt
+    else:
+        templates = load_json(TEMPLATES_FILE, DEFAULT_TEMPLATES)
+        if args.profile not in templates: parser.error(f"Unknown profile '{args.profile}'. Available: {', '.join(templates)}")
+        sys_prompt = templates[args.profile]
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs: parser.error("No input .docx files found.")
+    single_output = None
+    if len(inputs) == 1:
+        single_output = args.output if args.output and args.output.lower().endswith(".docx") else default_output_path(inputs[0], args.output)
+
+    if args.estimate:
+        questions = [q for path in inputs for q in load_questions(path)]
+        print(f"{len(questions)} questions in {len(inputs)} file(s) · concurrency {args.concurrency}\n")
+        print(format_estimate(estimate_run(questions, sys_prompt, args.concurrency)))
+        return 0
+
+    api_key = args.api_key or os.getenv("OPENAI_API_KEY", "")
+    if not api_key and (needs_api_key(args.model, args.hard_model) or args.embeddings == "openai"):
+        parser.error("API Key required (--api-key or OPENAI_API_KEY).")
+    if args.output and not args.output.lower().endswith(".docx"): os.makedirs(args.output, exist_ok=True)
+
+    engine_kwargs = {"api_key": api_key, "system_prompt": sys_prompt, "model": args.model, "temp": args.temperature,
+                     "concurrency": args.concurrency, "page_break": args.page_break, "use_cache": not args.no_cache,
+                     "stream": args.stream, "dedupe": args.dedupe, "dedupe_threshold": args.dedupe_threshold,
+                     "embedder": args.embeddings, "reuse_earlier": args.reuse_earlier, "pack": args.pack,
+                     "hard_model": args.hard_model, "adaptive": args.adaptive,
+                     "volume_size": args.volume_size, "combine": args.combine}
+    if single_output:
+        engine = Engine(**engine_kwargs, on_event=print_event)
+        stats = engine.stats
+        questions = QuestionLoader(inputs[0], on_done=lambda l: print(f"{inputs[0]}: {len(l)} questions -> {single_output}", flush=True)).start()
+        run = engine.run_batch if args.mode == "batch" else engine.run
+        try: ok = run(questions, inputs[0], single_output)
+        except KeyboardInterrupt: return interrupted(engine)
+    else:
+        job_queue = JobQueue(path=None)
+        job_queue.add_paths(inputs, args.output)
+        engine = JobRunner(job_queue, engine_kwargs, args.mode, args.parallel_files, on_event=print_event)
+        try: ok = engine.run()
+        except KeyboardInterrupt: return interrupted(engine)
+        stats = {"cost": sum(j.cost for j in job_queue.jobs)}
+
+    print(f"Total cost: ${stats['cost']:.4f} | ₹{stats['cost']*USD_TO_INR:.2f}")
+    return 0 if ok else 1
+
+def interrupted(runner):
+    # Workers save progress on their way out; a rerun resumes from there
+    runner.control.set()
+    print("Interrupted. Progress saved; run again to resume.", file=sys.stderr)
+    return 130
@@ -0,0 +1,279 @@
+import re
+import time
+import logging
+import threading
+from types import SimpleNamespace
+from contextlib import nullcontext
+
+from .config import MAX_RETRIES, REQUEST_TIMEOUT_SECS
+from .backends import get_backend, split_model, model_limits
+from .control import Cancelled, RunControl
+
+# ================= RATE LIMITING =================
+def parse_duration(value):
+    """Parses OpenAI reset/retry durations such as '20ms', '1.5s' or '6m0s' into seconds."""
+    if value is None: return None
+    value = str(value).strip()
+    try: return float(value)
+    except ValueError: pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts: return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+def estimate_tokens(*texts):
+    # Rough heuristic (~4 characters per token); the limiter settles on real usage afterwards
+    return sum(len(t) for t in texts) // 4 + 1
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self):
+        return self.capacity / 60.0
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # Requests larger than the whole bucket are allowed once it is full
+        need = min(amount, self.capacity) - self.level
+        return need / self.rate if need > 0 else 0.0
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute budget for one model.
+    Shared by every worker thread; paced by the x-ratelimit-* and retry-after headers.
+    """
+    def __init__(self, rpm, tpm):
+        self.cond = threading.Condition()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+
+    def acquire(self, tokens, control=None):
+        """Blocks until the budget allows the request; raises Cancelled if `control` stops first."""
+        with control.listening(self.wake) if control else nullcontext(), self.cond:
+            while True:
+                if control: control.check()
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                delay = max(self.blocked_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= tokens
+                    return
+                self.cond.wait(delay)
+
+    def wake(self):
+        with self.cond: self.cond.notify_all()
+
+    def settle(self, reserved, used):
+        """Returns (or charges) the difference between the reserved and actual token count."""
+        with self.cond:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+            self.cond.notify_all()
+
+    def backoff(self, seconds):
+        with self.cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        if not headers: return
+        with self.cond:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                try:
+                    if limit is not None:
+                        bucket.refill(now)
+                        bucket.capacity = float(limit)
+                    if remaining is not None:
+                        # The server's view is authoritative when it is stricter than ours
+                        bucket.refill(now)
+                        bucket.level = min(bucket.level, float(remaining))
+                        if float(remaining) <= 0 and reset:
+                            self.blocked_until = max(self.blocked_until, now + reset)
+                except ValueError:
+                    continue
+            self.cond.notify_all()
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model):
+    with _rate_limiters_lock:
+        if model not in _rate_limiters:
+            rpm, tpm = model_limits(model)
+            _rate_limiters[model] = RateLimiter(rpm, tpm)
+        return _rate_limiters[model]
+
+def get_retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    ms = headers.get("retry-after-ms")
+    if ms is not None:
+        try: return float(ms) / 1000
+        except ValueError: pass
+    return parse_duration(headers.get("retry-after"))
+
+def is_transient(error):
+    """Whether an APIStatusError is worth retrying: a timeout (408), a conflict (409) or a server error."""
+    status = getattr(error, "status_code", None) or 0
+    return status in (408, 409) or status >= 500
+
+# ================= API WRAPPER =================
+class OpenAIClient:
+    """
+    Chat completions (and OpenAI embeddings) with rate limiting and retries, for any backend: `model`
+    is routed by name ("gpt-4o-mini", "local:llama3.1:8b", see backends.py).
+    `api_key` is only used for OpenAI models.
+
+    `control` (a RunControl) makes every wait cancellable: limiter waits,
+    retry backoff and streamed responses end with Cancelled soon after it is
+    stopped. Each HTTP request is bounded by `timeout` seconds of silence.
+    """
+    def __init__(self, api_key, control=None, timeout=REQUEST_TIMEOUT_SECS):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.control = control or RunControl()
+
+    def backend(self, name):
+        return get_backend(name, self.api_key, self.timeout)
+
+    @property
+    def client(self):
+        """The openai.OpenAI client, for the OpenAI-only APIs (Batch, embeddings)."""
+        return self.backend("openai").client
+
+    def generate_answer(self, system_prompt, user_prompt, model, temp, max_tokens, on_delta=None, metrics=None,
+                        response_format=None):
+        """
+        Returns the chat completion. With `on_delta`, the answer is streamed and
+        each text fragment is passed to `on_delta` as it arrives. If a `metrics`
+        dict is given it receives "ttft" and "latency" (seconds, last attempt),
+        "retries", and "rate_wait" (seconds spent waiting on the limiter and backoff).
+        `response_format` is passed through, e.g. {"type": "json_object"}.
+        """
+        backend_name, name = split_model(model)
+        backend = self.backend(backend_name)
+        reserved = estimate_tokens(system_prompt, user_prompt) + max_tokens
+        metrics = metrics if metrics is not None else {}
+
+        def attempt(limiter):
+            sent = time.perf_counter()
+            extra = {"stream": True, "stream_options": {"include_usage": True}} if on_delta else {}
+            if response_format: extra["response_format"] = response_format
+            headers, parsed = backend.create(
+                model=name,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=temp,
+                max_tokens=max_tokens,
+                **extra
+            )
+            limiter.update(headers)
+            if on_delta:
+                response, ttft = self.collect_stream(parsed, on_delta, sent, system_prompt, user_prompt, self.control)
+            else:
+                response = parsed
+                ttft = time.perf_counter() - sent
+            metrics["ttft"] = ttft
+            metrics["latency"] = time.perf_counter() - sent
+            usage = getattr(response, "usage", None)
+            return response, usage.total_tokens if usage else reserved
+        return self.with_retries(model, reserved, attempt, metrics)
+
+    def embed(self, texts, model):
+        """Embedding vectors for `texts` (an OpenAI embeddings model), rate limited and retried like answers."""
+        reserved = estimate_tokens(*texts)
+
+        def attempt(limiter):
+            raw = self.client.embeddings.with_raw_response.create(model=model, input=list(texts))
+            limiter.update(raw.headers)
+            resp = raw.parse()
+            usage = getattr(resp, "usage", None)
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)], usage.total_tokens if usage else reserved
+        return self.with_retries(model, reserved, attempt)
+
+    def with_retries(self, model, reserved, attempt, metrics=None):
+        """
+        Runs `attempt(limiter)` -> (result, tokens used) under `model`'s rate
+        limiter, holding `reserved` tokens, and retries 429s, connection errors
+        and transient status errors with backoff; returns the result.
+        """
+        from openai import RateLimitError, APIConnectionError, APIStatusError # Deferred: importing openai takes most of start-up
+        limiter = get_rate_limiter(model)
+        base_delay = 2
+        metrics = metrics if metrics is not None else {}
+        metrics["retries"] = 0
+        metrics["rate_wait"] = 0.0
+        for attempt_no in range(MAX_RETRIES):
+            metrics["retries"] = attempt_no
+            waited = time.perf_counter()
+            limiter.acquire(reserved, self.control)
+            metrics["rate_wait"] += time.perf_counter() - waited
+            try:
+                result, used = attempt(limiter)
+                limiter.settle(reserved, used)
+                return result
+            except RateLimitError as e:
+                limiter.settle(reserved, 0)
+                limiter.update(getattr(e.response, "headers", None))
+                wait_time = get_retry_after(e) or base_delay * (2 ** attempt_no)
+                limiter.backoff(wait_time)
+                logging.warning(f"Rate limited ({attempt_no+1}): {e}. Pausing {model} requests for {wait_time:.1f}s...")
+            except (APIConnectionError, APIStatusError) as e: # Timeouts, stale pooled connections, 408/409/5xx
+                limiter.settle(reserved, 0)
+                if isinstance(e, APIStatusError) and not is_transient(e):
+                    logging.exception("API Error")
+                    raise
+                wait_time = get_retry_after(e) or base_delay * (2 ** attempt_no)
+                logging.warning(f"Retry ({attempt_no+1}) due to: {e}. Waiting {wait_time}s...")
+                waited = time.perf_counter()
+                if self.control.wait(wait_time): raise Cancelled("Stopped")
+                metrics["rate_wait"] += time.perf_counter() - waited
+            except Cancelled:
+                limiter.settle(reserved, 0)
+                raise
+            except Exception as e:
+                limiter.settle(reserved, 0)
+                logging.exception("API Error")
+                raise e
+        raise Exception("Max retries exceeded.")
+
+    @staticmethod
+    def collect_stream(stream, on_delta, sent, system_prompt, user_prompt, control=None):
+        """Drains a streamed completion into a ChatCompletion-shaped object; returns (response, ttft)."""
+        parts, usage, finish_reason, ttft = [], None, None, None
+        for chunk in stream:
+            if control and control.is_set():
+                stream.close() # Drops the connection; the server stops generating
+                raise Cancelled("Stopped")
+            if getattr(chunk, "usage", None): usage = chunk.usage
+            if not chunk.choices: continue
+            choice = chunk.choices[0]
+            if choice.finish_reason: finish_reason = choice.finish_reason
+            text = choice.delta.content if choice.delta else None
+            if text:
+                if ttft is None: ttft = time.perf_counter() - sent
+                parts.append(text)
+                on_delta(text)
+        content = "".join(parts)
+        if usage is None:
+            # Servers that ignore stream_options send no usage; estimate so costs stay close
+            pt, ct = estimate_tokens(system_prompt, user_prompt), estimate_tokens(content)
+            usage = SimpleNamespace(prompt_tokens=pt, completion_tokens=ct, total_tokens=pt + ct)
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason=finish_reason)],
+            usage=usage
+        )
+        return response, ttft if ttft is not None else time.perf_counter() - sent
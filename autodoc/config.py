@@ -0,0 +1,147 @@
+"""Shared configuration for the AutoDoc AI engine, CLI and GUI."""
+
+VERSION = "v1.0.0"
+SETTINGS_FILE = "settings.json"
+TEMPLATES_FILE = "templates.json"
+LOG_FILE = "run.log"
+CACHE_FILE = "answer_cache.sqlite3"
+JOBS_FILE = "jobs.json"
+REPORTS_DIR = "reports"
+DEBUG_MODE = False
+
+MIN_QUESTION_LENGTH = 15
+MAX_TOKENS = 1500
+USD_TO_INR = 86.0 
+
+# Concurrency: number of questions kept in flight, and how far ahead of the
+# next unwritten answer the dispatcher may run (in multiples of concurrency)
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 32
+REORDER_WINDOW_FACTOR = 4
+
+# Live throughput in Live Stats is measured over this trailing window
+THROUGHPUT_WINDOW_SECS = 60
+
+# GUI refresh: about one frame per UI_FRAME_MS while events arrive, backing
+# off to UI_IDLE_MS when quiet. The log box keeps the last LOG_MAX_LINES lines.
+UI_FRAME_MS = 40
+UI_IDLE_MS = 200
+LOG_MAX_LINES = 1000
+
+# Multi-document runs: input files processed side by side (sharing the request pool)
+MAX_PARALLEL_JOBS = 3
+
+# Output checkpoints: the DOCX is re-saved after this many answers or seconds,
+# whichever comes first (each save rewrites the whole file)
+SAVE_EVERY_N = 10
+SAVE_INTERVAL_SECS = 30
+
+# Output volumes (optional): answers are split into documents of VOLUME_SIZE
+# questions (<output>_Vol01.docx, ...), each saved and released from memory
+# once full; 0 writes one document. When every question is done, <output>
+# itself can be built as an "index" linking the volumes or as one "merged" document.
+VOLUME_SIZE = 0
+VOLUME_COMBINE_MODES = ["index", "merged"]
+
+# Question packing (optional): consecutive questions routed "short" of at most
+# PACK_MAX_QUESTION_TOKENS are sent together, up to PACK_MAX_QUESTIONS and
+# PACK_TOKEN_BUDGET question tokens per request; max_tokens is the sum of their
+# answer budgets, up to PACK_MAX_TOKENS
+PACK_MAX_QUESTION_TOKENS = 80
+PACK_TOKEN_BUDGET = 400
+PACK_MAX_QUESTIONS = 6
+PACK_MAX_TOKENS = 4000
+
+# Near-duplicate questions (optional): questions whose embeddings have a
+# cosine similarity of at least DEDUPE_THRESHOLD share one answer. Embeddings
+# of answered questions are kept in EMBEDDINGS_FILE_<embedder>.f32/.jsonl so
+# later papers can reuse cached answers.
+DEDUPE_THRESHOLD = 0.85
+DEDUPE_MODES = ["reference", "copy"]
+EMBEDDINGS_FILE = "question_index"
+EMBEDDING_DIM = 512
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Answer cache eviction limits
+CACHE_MAX_AGE_DAYS = 90
+CACHE_MAX_ENTRIES = 50000
+
+# Batch API mode: ~50% cheaper, results within the completion window
+BATCH_DISCOUNT = 0.5
+BATCH_POLL_SECS = 30
+BATCH_COMPLETION_WINDOW = "24h"
+EXECUTION_MODES = ["Interactive", "Batch"]
+
+# Client-side rate limits per model: (requests/min, tokens/min). These are
+# starting budgets only; the limiter adopts the real limits from API headers.
+MODEL_LIMITS = {
+    "gpt-4o": (500, 30000),
+    "gpt-4o-mini": (500, 200000),
+    "gpt-3.5-turbo": (500, 200000)
+}
+DEFAULT_LIMITS = (500, 30000)
+MAX_RETRIES = 6
+
+# Model backends: "openai" and "fake" are built in; OpenAI-compatible servers
+# (local vLLM / llama.cpp / Ollama, other hosts) are declared in BACKENDS_FILE
+# and used as "<backend>:<model>". Their models default to LOCAL_DEFAULT_LIMITS,
+# which in practice leaves pacing to the server.
+BACKENDS_FILE = "backends.json"
+LOCAL_DEFAULT_LIMITS = (6000, 10000000)
+
+# Shared HTTP connection pool for all backends. Idle connections are kept for
+# HTTP_KEEPALIVE_SECS so the next request skips the TCP/TLS handshake.
+HTTP_MAX_CONNECTIONS = 128
+HTTP_MAX_KEEPALIVE = 64
+HTTP_KEEPALIVE_SECS = 90
+
+# Routing: questions are "short" (at most SHORT_QUESTION_MARKS marks,
+# definitions, one-liners), "long" (at least HARD_QUESTION_MARKS marks, longer
+# than HARD_QUESTION_TOKENS, long-form wording) or "standard". Long ones go to
+# the hard-question model when one is set, the rest to the main (bulk) model.
+HARD_QUESTION_MARKS = 15
+HARD_QUESTION_TOKENS = 60
+SHORT_QUESTION_MARKS = 5
+
+# Adaptive answer sizing (optional): max_tokens per route, or from a stated word
+# limit at TOKENS_PER_WORD. An answer cut off at max_tokens is asked again with
+# ESCALATE_FACTOR times the budget (and the hard-question model), up to
+# ESCALATE_MAX_TOKENS.
+ROUTE_MAX_TOKENS = {"short": 400, "standard": 1000, "long": 1500}
+TOKENS_PER_WORD = 1.4
+ESCALATE_FACTOR = 2
+ESCALATE_MAX_TOKENS = 4000
+
+# Per-request HTTP timeouts (seconds). READ bounds the gap between bytes, i.e.
+# the whole generation for a non-streamed answer and the gap between chunks
+# when streaming. STOP does not wait for requests in flight; they are retried
+# on resume.
+CONNECT_TIMEOUT_SECS = 10
+REQUEST_TIMEOUT_SECS = 120
+
+# Dry-run estimator fallbacks, used until the answer cache has history for a model
+DEFAULT_COMPLETION_TOKENS = 600
+DEFAULT_TOKENS_PER_SEC = 60
+REQUEST_OVERHEAD_SECS = 0.6
+PROMPT_OVERHEAD_TOKENS = 7
+
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+DEFAULT_TEMPLATES = {
+    "UPSC Mains Expert": "You are a UPSC Civil Services expert. Answer strictly in UPSC Mains format: Introduction, Body (with headings & bullets), and Conclusion.",
+    "UPSC Ethics Expert": "You are an expert in UPSC Ethics. Provide answers with real-life examples, case studies, and ethical frameworks.",
+    "UPSC GS Expert": "You are a UPSC General Studies expert. Provide detailed, well-structured answers with relevant data and examples.",
+    "UPSC Essay Expert": "You are an expert essay writer for UPSC. Craft comprehensive essays with clear introductions, coherent arguments, and impactful conclusions.",
+    "AI Tutor": "You are an AI tutor. Explain concepts clearly and concisely, using examples and analogies where appropriate.",
+    "Tech Specialist": "You are a technology specialist. Provide detailed technical explanations and insights.",
+    "Medical Expert": "You are a medical expert. Provide accurate and detailed medical information and explanations.",
+    "Legal Advisor": "You are a legal advisor. Provide clear and precise legal explanations and advice.",
+    "Financial Analyst": "You are a financial analyst. Provide detailed financial insights and analysis.",
+    "Scientific Researcher": "You are a scientific researcher. Provide thorough and evidence-based scientific explanations.",
+    "Creative Writer": "You are a creative writer. Craft engaging and imaginative content with vivid descriptions.",
+    "General Professional": "You are a domain expert. Answer clearly and professionally."
+}
@@ -0,0 +1,76 @@
+import threading
+from contextlib import contextmanager
+
+class Cancelled(Exception):
+    """Raised inside a request thread when the run is stopped while it waits."""
+
+class RunControl:
+    """
+    Stop / pause switch shared by the GUI or CLI, the engines and their
+    request threads. It can be used wherever a threading.Event stop flag is
+    expected (`set`, `clear`, `is_set`, `wait`).
+
+    Every wait in a run goes through `cond`, and every change (stop, pause,
+    resume, `notify`) wakes all waiters at once, so nothing sleeps through a
+    stop or a resume. Code that waits on a lock of its own (e.g. the rate
+    limiter) registers a callback with `listening` to be woken as well.
+    """
+    def __init__(self):
+        self.cond = threading.Condition()
+        self._stopped = False
+        self._paused = False
+        self.listeners = []
+
+    # ----- Event-compatible stop flag -----
+    def is_set(self):
+        return self._stopped
+
+    def set(self):
+        self._change(stopped=True)
+
+    def clear(self):
+        self._change(stopped=False, paused=False)
+
+    def wait(self, timeout=None):
+        """Sleeps until stopped or `timeout` passes; returns True if stopped (like Event.wait)."""
+        self.wait_for(lambda: False, timeout)
+        return self._stopped
+
+    # ----- Pause -----
+    @property
+    def paused(self):
+        return self._paused
+
+    @paused.setter
+    def paused(self, value):
+        self._change(paused=bool(value))
+
+    # ----- Waiting -----
+    def notify(self):
+        """Wakes every waiter to re-check its condition (e.g. a request finished)."""
+        self._change()
+
+    def wait_for(self, predicate, timeout=None):
+        """Sleeps until `predicate()` is true or the run is stopped; returns the predicate's last value."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self._stopped or predicate(), timeout) and predicate()
+
+    def check(self):
+        if self._stopped: raise Cancelled("Stopped")
+
+    @contextmanager
+    def listening(self, callback):
+        """Calls `callback()` on every change while the block runs."""
+        with self.cond: self.listeners.append(callback)
+        try: yield self
+        finally:
+            with self.cond: self.listeners.remove(callback)
+
+    def _change(self, stopped=None, paused=None):
+        with self.cond:
+            if stopped is not None: self._stopped = stopped
+            if paused is not None: self._paused = paused
+            self.cond.notify_all()
+            listeners = list(self.listeners)
+        # Outside our lock: listeners take their own
+        for callback in listeners: callback()
@@ -0,0 +1,593 @@
+import os
+import time
+import sqlite3
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from .config import (MAX_TOKENS, DEFAULT_CONCURRENCY, MAX_CONCURRENCY,
+                     REORDER_WINDOW_FACTOR, BATCH_DISCOUNT, BATCH_POLL_SECS, DEDUPE_THRESHOLD)
+from .client import OpenAIClient, estimate_tokens
+from .control import Cancelled, RunControl
+from .cache import AnswerCache
+from .batch import BatchRunner, build_batch_requests
+from .writer import DocxWriter
+from .volumes import combine_volumes
+from .metrics import RunMetrics
+from .extract import QuestionLoader
+from .journal import ProgressJournal
+from .similar import Duplicate, HashEmbedder, OpenAIEmbedder, SimilarQuestions, get_index
+from .packing import Packer, question_id, parse_answers, split_tokens, make_response
+from .routing import Router
+from .backends import split_model
+from .utils import get_progress_filename, get_batch_filename, prompt_digest, calculate_cost
+
+# ================= ENGINE =================
+class Engine:
+    """
+    Runs one question bank through the pipeline: resume, cache lookup,
+    generation, DOCX rendering and checkpointing. Has no UI dependencies.
+
+    Progress is reported through `on_event(kind, data)` with the kinds
+    "log", "progress", "stats", "done" and "stopped". Call `control.set()`
+    to stop and toggle `is_paused` to pause; both are safe from other threads
+    and take effect at once. Stopping does not wait for requests in flight:
+    they are abandoned and redone on the next run.
+    Pass `pool` to share one request executor between several engines.
+    `questions` may be a QuestionLoader that is still reading the document;
+    dispatch starts with the questions available so far.
+
+    With `dedupe` ("reference" or "copy"), near-duplicate questions are
+    answered once: later members of a cluster get a cross-reference to the
+    first one or a copy of its answer (see similar.py). `embedder` is
+    "local" (offline hashing) or "openai" (embeddings API). With the cache on
+    and `reuse_earlier`, near-duplicates answered in earlier papers are
+    reused, under a note naming the question answered; by default only with
+    the "openai" embedder.
+
+    With `pack`, consecutive short questions are answered several per request
+    (see packing.py); packed requests are not streamed.
+
+    `model` may be any backend's model ("local:llama3.1:8b", see backends.py).
+    Each question is routed "short", "standard" or "long" (see routing.py):
+    with `hard_model`, long ones go to that model instead, and with
+    `adaptive`, max_tokens is sized per question and an answer cut off at
+    max_tokens is asked again with a bigger budget (and the hard model).
+    Batch runs use `model` and MAX_TOKENS only, and need an OpenAI model.
+
+    With `volume_size`, answers are written to volumes of that many questions
+    instead of one document (see volumes.py); once every question is done,
+    `combine` ("index" or "merged") builds `out_path` from them.
+    """
+    def __init__(self, api_key, system_prompt, model="gpt-4o-mini", temp=0.5,
+                 concurrency=DEFAULT_CONCURRENCY, page_break=False, use_cache=True,
+                 on_event=None, control=None, stats=None, pool=None, stream=False,
+                 dedupe=None, dedupe_threshold=DEDUPE_THRESHOLD, embedder="local", pack=False,
+                 hard_model=None, adaptive=False, volume_size=0, combine=None, reuse_earlier=None):
+        self.api_key = api_key
+        self.system_prompt = system_prompt
+        self.model = model
+        self.temp = temp
+        self.concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+        self.page_break = page_break
+        self.use_cache = use_cache
+        self.on_event = on_event or (lambda kind, data: None)
+        self.control = control or RunControl()
+        self.stats = stats if stats is not None else {"cost": 0.0, "processed": 0}
+        self.pool = pool
+        self.stream = stream
+        self.dedupe = dedupe
+        self.dedupe_threshold = dedupe_threshold
+        self.embedder = embedder
+        self.reuse_earlier = reuse_earlier
+        self.router = Router(model, hard_model, system_prompt, adaptive)
+        self.packer = Packer(self.router) if pack else None
+        self.volume_size = max(0, int(volume_size or 0))
+        self.combine = combine if self.volume_size else None
+        self.metrics = RunMetrics()
+
+    @property
+    def is_paused(self):
+        return self.control.paused
+
+    @is_paused.setter
+    def is_paused(self, value):
+        self.control.paused = value
+
+    def log(self, msg):
+        self.on_event("log", msg)
+
+    def resume(self, journal):
+        """Indices already in the output document; their cost is added back to stats."""
+        done = set(journal.done)
+        if done:
+            self.stats['cost'] += journal.cost
+            self.log(f"Resuming: {len(done)} question(s) already done (${journal.cost:.4f} spent so far).")
+            gaps = max(done) + 1 - len(done)
+            if gaps: self.log(f"{gaps} earlier question(s) failed before; their answers go under \"Retried questions\" "
+                              "at the end of the document, with their question numbers.")
+        return done
+
+    def finish(self, journal, total, out_path):
+        """Clears the journal if every question is in the output; otherwise keeps it so START retries the rest."""
+        missing = sum(1 for i in range(total) if i not in journal.done)
+        if missing:
+            self.log(f"⚠️ {missing} question(s) failed. Press START to retry just those.")
+            return
+        journal.clear()
+        if self.combine: self.build_combined(out_path)
+
+    def build_combined(self, out_path):
+        try:
+            started = time.perf_counter()
+            count = combine_volumes(out_path, self.combine)
+            if count: self.log(f"{'Merged' if self.combine == 'merged' else 'Indexed'} {count} volume(s) into "
+                               f"{os.path.basename(out_path)} ({time.perf_counter() - started:.1f}s).")
+        except Exception as e:
+            logging.exception(f"Could not combine the volumes of {out_path}")
+            self.log(f"⚠️ Could not build {os.path.basename(out_path)} from its volumes: {e}")
+
+    def open_cache(self):
+        if not self.use_cache: return None
+        try: return AnswerCache()
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Answer cache unavailable: {e}")
+            return None
+
+    def open_similar(self, client, cache):
+        """SimilarQuestions for this run, or None when near-duplicate detection is off."""
+        if not self.dedupe: return None
+        embedder = OpenAIEmbedder(client) if self.embedder == "openai" else HashEmbedder()
+        reuse = embedder.reuse_earlier if self.reuse_earlier is None else self.reuse_earlier
+        # Answers are only reused across papers under the same profile, model and temperature
+        group = AnswerCache.make_key(self.system_prompt, "", self.model, self.temp)
+        return SimilarQuestions(embedder, self.dedupe_threshold, get_index(embedder.name) if cache and reuse else None, group)
+
+    def duplicate_answer(self, index, dup, answers, done_before):
+        """Result for question `index`, clustered with an earlier one; None if that one has no answer."""
+        if self.dedupe == "copy" and dup.of in answers:
+            text = answers[dup.of]
+        elif dup.of in answers or dup.of in done_before:
+            text = f"_Same question as Q{dup.of+1} ({dup.similarity:.0%} similar); see the answer there._"
+        else:
+            self.log(f"Q{index+1} repeats Q{dup.of+1}, which has no answer; both are retried on the next run.")
+            return None
+        return (text, 0, 0, True, None)
+
+    def earlier_answer(self, cache, similar, index, questions):
+        """Cached answer of a near-duplicate from an earlier paper, under a note naming it; None if there is none."""
+        earlier = similar.earlier_answer(index, questions)
+        hit = cache.get(earlier.key) if earlier else None
+        if not hit: return None
+        ans, pt, ct = hit
+        note = f"_Reused from an earlier paper ({earlier.similarity:.0%} similar): \"{earlier.question}\"_"
+        return (f"{note}\n\n{ans}", pt, ct)
+
+    def lookup(self, cache, similar, index, questions):
+        """Cached (answer, prompt_tokens, completion_tokens) for the question or a near-duplicate from an earlier paper."""
+        if not cache: return None
+        question = questions[index]
+        hit = cache.get(AnswerCache.make_key(self.system_prompt, question, self.router.route(question).model, self.temp))
+        if hit or not similar: return hit
+        return self.earlier_answer(cache, similar, index, questions)
+
+    def ask(self, client, index, question, submitted):
+        """
+        Generates one answer; runs on a pool thread. Returns (response, metrics);
+        metrics include the "route", the "model" that answered, and the
+        "escalations" and "extra_cost" of attempts cut off at max_tokens.
+        """
+        on_delta = None
+        if self.stream:
+            on_delta = lambda text: self.on_event("delta", {"index": index, "text": text})
+        route = self.router.route(question)
+        model, max_tokens = route.model, route.max_tokens
+        metrics = {"queue_wait": time.perf_counter() - submitted, "route": route.name, "escalations": 0, "extra_cost": 0.0}
+        started = time.perf_counter()
+        try:
+            while True:
+                resp = client.generate_answer(self.system_prompt, question, model, self.temp, max_tokens,
+                                              on_delta=on_delta, metrics=metrics)
+                bigger = self.router.escalate(model, max_tokens) if resp.choices[0].finish_reason == "length" else None
+                if not bigger: break
+                # The cut-off attempt is paid for; the answer comes from the next one
+                metrics["escalations"] += 1
+                metrics["extra_cost"] += calculate_cost(model, resp.usage.prompt_tokens, resp.usage.completion_tokens)
+                logging.info(f"Q{index+1} was cut off at {max_tokens} tokens on {model}; asking {bigger[0]} with {bigger[1]}.")
+                if self.stream: self.on_event("delta", {"index": index, "text": "", "done": True})
+                model, max_tokens = bigger
+        finally:
+            if self.stream: self.on_event("delta", {"index": index, "text": "", "done": True})
+        metrics["model"] = model
+        if metrics["escalations"]: metrics["latency"] = time.perf_counter() - started # Every attempt
+        return resp, metrics
+
+    def ask_pack(self, client, pack, submitted):
+        """
+        Answers the (index, question) pairs in `pack` with one request; runs on a
+        pool thread. Questions missing from a malformed reply are asked one at a
+        time. Returns [(index, (response, metrics) or the exception it failed with)].
+        """
+        metrics = {"queue_wait": time.perf_counter() - submitted, "packed": len(pack), "model": self.model}
+        ids = {question_id(i) for i, _ in pack}
+        sys_prompt, user_prompt = self.packer.messages(self.system_prompt, pack)
+        try:
+            resp = client.generate_answer(sys_prompt, user_prompt, self.model, self.temp, self.packer.pack_tokens(pack),
+                                          metrics=metrics, response_format={"type": "json_object"})
+            answers = parse_answers(resp.choices[0].message.content, ids)
+            prompt_tokens, completion_tokens = resp.usage.prompt_tokens, resp.usage.completion_tokens
+        except Cancelled:
+            raise
+        except Exception as e:
+            logging.warning(f"Packed request for {', '.join(sorted(ids))} failed: {e}")
+            answers, prompt_tokens, completion_tokens = {}, 0, 0
+
+        # The pack's tokens are charged to its questions, including any asked again below
+        pts = split_tokens(prompt_tokens, [estimate_tokens(q) for _, q in pack])
+        cts = split_tokens(completion_tokens, [len(answers.get(question_id(i), "")) for i, _ in pack])
+        missing = [question_id(i) for i, _ in pack if question_id(i) not in answers]
+        if missing: self.log(f"Packed reply had no usable answer for {', '.join(missing)}; asking them one at a time.")
+        out = []
+        for (i, q), pt, ct in zip(pack, pts, cts):
+            answer = answers.get(question_id(i))
+            if answer is not None:
+                # Per question, so packed answers count under their own route ("short") in the stats
+                out.append((i, (make_response(answer, pt, ct), dict(metrics, route=self.router.route(q).name))))
+                continue
+            try:
+                resp, single = self.ask(client, i, q, time.perf_counter())
+                usage = resp.usage
+                out.append((i, (make_response(resp.choices[0].message.content, usage.prompt_tokens + pt,
+                                              usage.completion_tokens + ct), single)))
+            except Cancelled:
+                raise
+            except Exception as e:
+                out.append((i, e))
+        return out
+
+    def record_answer(self, index, metrics, prompt_tokens, completion_tokens, cached, render, cost=0.0):
+        self.metrics.finished(0 if cached else completion_tokens)
+        if cached or not metrics.get("latency"):
+            self.metrics.record(index, cached=cached, render=render)
+            return
+        ttft, latency = metrics.get("ttft"), metrics["latency"]
+        # Streaming: generation speed after the first token; otherwise the whole round trip
+        gen_time = latency - ttft if self.stream and ttft is not None else latency
+        tps = completion_tokens / gen_time if gen_time > 0 else 0.0
+        self.metrics.record(index, cached=False, queue_wait=metrics.get("queue_wait"), rate_wait=metrics.get("rate_wait"),
+                            retries=metrics.get("retries", 0), ttft=ttft, latency=latency, prompt_tokens=prompt_tokens,
+                            completion_tokens=completion_tokens, tps=tps, render=render, cost=cost,
+                            route=metrics.get("route"), model=metrics.get("model"), escalations=metrics.get("escalations"))
+        logging.debug(f"Q{index+1}: model={metrics.get('model', self.model)} ttft={ttft:.2f}s latency={latency:.2f}s tokens={completion_tokens} tok/s={tps:.1f}")
+
+    def live_stats(self):
+        qpm, tok_s = self.metrics.throughput()
+        return {**self.metrics.averages(), "qpm": qpm, "tok_s": tok_s, "routes": self.metrics.routes()}
+
+    def write_report(self, writer):
+        if not self.metrics.records: return # Nothing ran (e.g. the input could not be read)
+        for secs in writer.save_times: self.metrics.add_save(secs)
+        try:
+            path = self.metrics.write_report()
+            s = self.metrics.summary()
+            p95 = s["latency"]["p95"]
+            self.log(f"Run report: {path} ({s['answers_per_min']:.1f} answers/min"
+                     + (f", p95 latency {p95:.1f}s)" if p95 is not None else ")"))
+        except OSError as e:
+            self.log(f"⚠️ Could not write run report: {e}")
+
+    def run(self, questions, input_path, out_path):
+        """Processes `questions` interactively; returns True if the run completed."""
+        in_file_name = os.path.basename(input_path)
+        journal = ProgressJournal(get_progress_filename(input_path), input_path)
+        writer = DocxWriter(out_path, journal, self.page_break, self.volume_size)
+        done_before = self.resume(journal)
+        cache = self.open_cache()
+        sys_prompt, model, temp = self.system_prompt, self.model, self.temp
+        self.metrics = RunMetrics(os.path.splitext(in_file_name)[0], model, self.concurrency)
+
+        try:
+            control = self.control
+            client = OpenAIClient(self.api_key, control)
+            similar = self.open_similar(client, cache)
+            answers = {} # question index -> answer written this run, for near-duplicates
+            packer = self.packer
+            pack = [] # short questions waiting to go out in one request
+            concurrency = self.concurrency
+            streaming = isinstance(questions, QuestionLoader)
+            total = len(questions)
+            start_time = time.time()
+            processed_count = 0
+
+            # Questions are dispatched up to `concurrency` at a time, but answers are
+            # written strictly in question order: finished responses wait in `ready`
+            # until every earlier question has been written.
+            next_idx = 0   # next question to dispatch
+            write_idx = 0  # next question to write to the document
+            pending = {}           # future -> question index
+            ready = {}             # question index -> (answer, prompt_tokens, completion_tokens, cached, metrics), None on failure
+            window = concurrency * REORDER_WINDOW_FACTOR
+
+            def can_dispatch():
+                return (not control.paused and next_idx < len(questions)
+                        and len(pending) < concurrency and next_idx - write_idx < window)
+
+            def has_work():
+                # Checked under control.cond; every input to it notifies control when it changes
+                return (any(f.done() for f in pending) or can_dispatch()
+                        or (loading and questions.finished))
+
+            own_pool = None if self.pool else ThreadPoolExecutor(max_workers=concurrency)
+            pool = self.pool or own_pool
+
+            def submit(batch):
+                """Sends one question, or a pack of short ones, to the pool."""
+                if len(batch) == 1:
+                    (i, q), = batch
+                    fut = pool.submit(self.ask, client, i, q, time.perf_counter())
+                    pending[fut] = i
+                else:
+                    fut = pool.submit(self.ask_pack, client, list(batch), time.perf_counter())
+                    pending[fut] = tuple(i for i, _ in batch)
+                fut.add_done_callback(lambda f: control.notify())
+            try:
+                with questions.listening(control.notify) if streaming else nullcontext():
+                    while not control.is_set():
+                        # Check `finished` before taking the length so the last questions are never missed
+                        loading = streaming and not questions.finished
+                        total = len(questions)
+                        while can_dispatch():
+                            # Every question takes part in clustering, including ones already done
+                            dup = similar.match(next_idx, questions) if similar else None
+                            if next_idx in done_before:
+                                ready[next_idx] = None # Already in the document
+                                next_idx += 1
+                                continue
+                            q = questions[next_idx]
+                            hit = self.lookup(cache, None if dup else similar, next_idx, questions)
+                            if hit:
+                                ready[next_idx] = (*hit, True, None)
+                            elif dup:
+                                ready[next_idx] = dup # Resolved when written, after the question it repeats
+                            elif packer and packer.fits(q):
+                                if not packer.has_room(pack, q):
+                                    submit(pack)
+                                    pack = []
+                                pack.append((next_idx, q))
+                            else:
+                                submit([(next_idx, q)])
+                            next_idx += 1
+                        if pack:
+                            submit(pack)
+                            pack = []
+
+                        for fut in [f for f in pending if f.done()]:
+                            key = pending.pop(fut)
+                            indices = key if isinstance(key, tuple) else (key,)
+                            try:
+                                outcomes = fut.result() if isinstance(key, tuple) else [(key, fut.result())]
+                            except Cancelled:
+                                continue # Stopped; asked again on the next run
+                            except Exception as e:
+                                outcomes = [(i, e) for i in indices]
+                            for i, outcome in outcomes:
+                                if isinstance(outcome, Exception):
+                                    self.log(f"Error on Q{i+1}: {outcome}")
+                                    self.metrics.record(i, error=str(outcome))
+                                    ready[i] = None
+                                    continue
+                                resp, metrics = outcome
+                                ready[i] = (resp.choices[0].message.content, resp.usage.prompt_tokens, resp.usage.completion_tokens, False, metrics)
+
+                        while write_idx in ready:
+                            i, result = write_idx, ready.pop(write_idx)
+                            write_idx += 1
+                            if isinstance(result, Duplicate): result = self.duplicate_answer(i, result, answers, done_before)
+                            if result is None: continue
+
+                            q = questions[i]
+                            try:
+                                ans, pt, ct, cached, metrics = result
+                                if cached:
+                                    cost = 0.0
+                                else:
+                                    # Cached under the routed model, so the next run finds it before any escalation
+                                    answered_by = metrics.get("model") or model
+                                    cost = calculate_cost(answered_by, pt, ct) + metrics.get("extra_cost", 0.0)
+                                    key = AnswerCache.make_key(sys_prompt, q, self.router.route(q).model, temp)
+                                    if cache: cache.put(key, ans, pt, ct, answered_by, metrics.get("latency"))
+                                    if similar: similar.remember(i, key, q)
+                                if similar: answers[i] = ans if self.dedupe == "copy" else None
+                                processed_count += 1
+                                self.stats['cost'] += cost
+                                self.stats['processed'] += 1
+
+                                elapsed = time.time() - start_time
+                                avg_time = elapsed / processed_count
+                                remaining_qs = total - write_idx
+                                eta_str = str(timedelta(seconds=int(avg_time * remaining_qs)))
+
+                                if not writer.add_answer(i, q, ans, pt, ct, cost, cached):
+                                    self.log("⚠️ Save delayed (File open)")
+                                self.record_answer(i, metrics or {}, pt, ct, cached, writer.last_render_secs, cost)
+
+                                counted = f"{total}+" if loading else total
+                                self.on_event("progress", {"val": int((write_idx/total)*100), "text": f"Q{write_idx}/{counted}", "index": write_idx, "total": total})
+                                self.on_event("stats", {
+                                    "usd": self.stats['cost'],
+                                    "eta": eta_str,
+                                    "hits": cache.hits if cache else 0,
+                                    "misses": cache.misses if cache else 0,
+                                    **self.live_stats()
+                                })
+
+                            except Exception as e:
+                                self.log(f"Error on Q{i+1}: {e}")
+
+                        if not pending and next_idx >= total and not loading: break
+                        # Sleeps until a request finishes, a question is extracted, or pause/stop changes
+                        control.wait_for(has_work)
+            finally:
+                # Queued requests are dropped; running ones finish (or time out) on their own
+                abandoned = sum(1 for fut in pending if not fut.cancel())
+                if own_pool: own_pool.shutdown(wait=False, cancel_futures=True)
+
+            if abandoned: self.log(f"{abandoned} request(s) in flight were abandoned; they are redone on resume.")
+            if similar and similar.summary(): self.log(f"Near-duplicates: {similar.summary()}.")
+            if streaming and not control.is_set(): questions.wait() # Surfaces an extraction error
+
+            saved = writer.checkpoint()
+            if not saved:
+                self.log("⚠️ Could not save output (File open?). Progress kept for resume.")
+
+            if control.is_set():
+                if saved: self.log(f"Stopped after Question {write_idx}. Progress saved.")
+                self.on_event("progress", {"val": int((write_idx/max(total, 1))*100), "text": "Stopped"})
+                self.on_event("stopped", None)
+                return False
+
+            self.on_event("progress", {"val": 100, "text": "Finished", "index": total, "total": total})
+            if saved: self.finish(journal, total, out_path)
+            self.on_event("done", None)
+            return saved
+
+        except Exception as e:
+            logging.exception("Worker error")
+            self.log(f"Critical Worker Error: {e}")
+            self.on_event("stopped", None)
+            return False
+        finally:
+            writer.checkpoint()
+            self.write_report(writer)
+            if cache: cache.close()
+
+    def run_batch(self, questions, input_path, out_path):
+        """Processes `questions` through the Batch API; returns True if the run completed."""
+        in_file_name = os.path.basename(input_path)
+        journal = ProgressJournal(get_progress_filename(input_path), input_path)
+        writer = DocxWriter(out_path, journal, self.page_break, self.volume_size)
+        cache = self.open_cache()
+        sys_prompt = self.system_prompt
+        self.metrics = RunMetrics(os.path.splitext(in_file_name)[0] + "_batch", self.model)
+
+        try:
+            # A batch is submitted in one go, so it needs every question up front
+            if isinstance(questions, QuestionLoader): questions = list(questions.wait())
+            total = len(questions)
+            done_before = self.resume(journal)
+            remaining = [i for i in range(total) if i not in done_before]
+            client = OpenAIClient(self.api_key)
+            runner = BatchRunner(client.client, get_batch_filename(input_path))
+            if runner.batch_id and runner.state.get("prompt") != prompt_digest(sys_prompt):
+                # Its answers were written for another profile; that batch is left to finish on its own
+                self.log(f"System prompt changed since batch {runner.batch_id} was submitted; submitting a new batch.")
+                runner.clear()
+            model = runner.state.get("model", self.model)
+            if split_model(model)[0] != "openai":
+                self.log(f"⚠️ Batch mode needs an OpenAI model; {model} can only run interactively.")
+                self.on_event("stopped", None)
+                return False
+            temp = runner.state.get("temperature", self.temp)
+
+            def key(i): return AnswerCache.make_key(sys_prompt, questions[i], model, temp)
+
+            # Near-duplicates of an earlier question are not submitted; they are resolved when written
+            similar = self.open_similar(client, cache)
+            dups, answers = {}, {}
+            for i in range(total) if similar else ():
+                dup = similar.match(i, questions)
+                if dup and i not in done_before: dups[i] = dup
+
+            def reuse(i):
+                hit = cache.get(key(i)) if cache else None
+                if hit or not cache or not similar or i in dups: return hit
+                return self.earlier_answer(cache, similar, i, questions)
+
+            cached = {}
+            if runner.batch_id:
+                self.log(f"Resuming batch {runner.batch_id} ({model})...")
+            else:
+                for i in remaining:
+                    hit = reuse(i)
+                    if hit: cached[i] = hit
+                todo = [(i, questions[i]) for i in remaining if i not in cached and i not in dups]
+                if todo:
+                    runner.submit(build_batch_requests(todo, sys_prompt, model, temp, MAX_TOKENS),
+                                  {"model": model, "temperature": temp, "prompt": prompt_digest(sys_prompt)})
+                    self.log(f"Submitted batch {runner.batch_id} with {len(todo)} questions. Polling every {BATCH_POLL_SECS}s...")
+
+            results, errors = {}, {}
+            if runner.batch_id:
+                def on_status(batch):
+                    counts = getattr(batch, "request_counts", None)
+                    done_n, all_n = (counts.completed + counts.failed, counts.total) if counts else (0, 0)
+                    pct = int(done_n / all_n * 100) if all_n else 0
+                    self.on_event("progress", {"val": pct, "text": f"Batch {batch.status}: {done_n}/{all_n}"})
+
+                batch = runner.wait(self.control, on_status)
+                if batch is None:
+                    self.log("Stopped polling. The batch keeps running on OpenAI; press START to resume.")
+                    self.on_event("stopped", None)
+                    return False
+                if batch.status != "completed":
+                    self.log(f"⚠️ Batch ended with status '{batch.status}'. Writing any available results.")
+                results, errors = runner.fetch_results(batch)
+
+            for i in remaining:
+                q = questions[i]
+                if i in results:
+                    ans, pt, ct = results[i]
+                    cost = calculate_cost(model, pt, ct, BATCH_DISCOUNT)
+                    self.stats['cost'] += cost
+                    if cache: cache.put(key(i), ans, pt, ct, model)
+                    if similar: similar.remember(i, key(i), q)
+                    self.metrics.record(i, cached=False, prompt_tokens=pt, completion_tokens=ct)
+                else:
+                    hit = cached.get(i) or reuse(i)
+                    if not hit and i in dups:
+                        hit = self.duplicate_answer(i, dups[i], answers, done_before)
+                        if not hit: continue
+                        hit = hit[:3]
+                    if not hit:
+                        self.log(f"Error on Q{i+1}: {errors.get(i, 'No result returned')}")
+                        self.metrics.record(i, error=errors.get(i, 'No result returned'))
+                        continue
+                    ans, pt, ct = hit
+                    cost = 0.0
+                    self.metrics.record(i, cached=True)
+                if similar: answers[i] = ans if self.dedupe == "copy" else None
+                self.stats['processed'] += 1
+                if not writer.add_answer(i, q, ans, pt, ct, cost, i not in results):
+                    self.log("⚠️ Save delayed (File open)")
+                self.metrics.record(i, render=writer.last_render_secs)
+
+            if similar and similar.summary(): self.log(f"Near-duplicates: {similar.summary()}.")
+            self.on_event("stats", {
+                "usd": self.stats['cost'],
+                "eta": "0:00:00",
+                "hits": cache.hits if cache else 0,
+                "misses": cache.misses if cache else 0
+            })
+
+            saved = writer.checkpoint()
+            if not saved:
+                self.log("⚠️ Could not save output (File open?). Press START to write the results again.")
+                self.on_event("stopped", None)
+                return False
+
+            runner.clear()
+            self.finish(journal, total, out_path)
+            self.on_event("progress", {"val": 100, "text": "Finished", "index": total, "total": total})
+            self.on_event("done", None)
+            return True
+
+        except Exception as e:
+            logging.exception("Batch worker error")
+            self.log(f"Critical Worker Error: {e}")
+            self.on_event("stopped", None)
+            return False
+        finally:
+            writer.checkpoint()
+            self.write_report(writer)
+            if cache: cache.close()
@@ -0,0 +1,105 @@
+"""
+Offline dry run: projects tokens, cost and wall time for a question bank
+before any money is spent. Uses tiktoken when it is installed (and its
+encoding files are available), otherwise a character-based heuristic.
+"""
+import os
+import logging
+import sqlite3
+from datetime import timedelta
+
+from .config import (CACHE_FILE, DEFAULT_CONCURRENCY, BATCH_DISCOUNT, USD_TO_INR,
+                     DEFAULT_COMPLETION_TOKENS, DEFAULT_TOKENS_PER_SEC, REQUEST_OVERHEAD_SECS, PROMPT_OVERHEAD_TOKENS)
+from .cache import AnswerCache
+from .client import estimate_tokens
+from .backends import available_models, model_limits
+from .utils import calculate_cost
+
+_encoders = {}
+
+def get_encoder(model):
+    """Returns a tiktoken encoding for `model`, or None to fall back to the heuristic."""
+    if model not in _encoders:
+        try:
+            import tiktoken
+            try: _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError: _encoders[model] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Not installed, or the encoding files can't be fetched offline
+            logging.info(f"tiktoken unavailable for {model} ({e}); using heuristic token counts")
+            _encoders[model] = None
+    return _encoders[model]
+
+def count_tokens(texts, model):
+    """Token count of each text in `texts`."""
+    enc = get_encoder(model)
+    if enc is None: return [estimate_tokens(t) for t in texts]
+    return [len(ids) for ids in enc.encode_ordinary_batch(list(texts))]
+
+def load_history(models):
+    """{model: (avg completion tokens, avg latency)} from answers recorded in the cache; reads it without writing."""
+    history = {}
+    if not os.path.exists(CACHE_FILE): return history
+    try:
+        cache = AnswerCache(CACHE_FILE, read_only=True)
+    except sqlite3.Error:
+        return history
+    try:
+        for model in models:
+            n, ct, latency = cache.history(model)
+            if n: history[model] = (ct, latency)
+    except sqlite3.Error: # A cache from before model/latency were recorded
+        pass
+    finally:
+        cache.close()
+    return history
+
+def estimate_run(questions, system_prompt, concurrency=DEFAULT_CONCURRENCY, models=None, history=None):
+    """
+    Returns one projection per model: prompt/completion tokens, interactive and
+    batch cost (USD), and wall time in seconds at `concurrency`, capped by the
+    model's rate limits.
+    """
+    models = list(models or available_models())
+    history = load_history(models) if history is None else history
+    n = len(questions)
+    concurrency = max(1, concurrency)
+    results = []
+    for model in models:
+        system_tokens = count_tokens([system_prompt], model)[0]
+        prompt_tokens = sum(count_tokens(questions, model)) + n * (system_tokens + PROMPT_OVERHEAD_TOKENS)
+        avg_ct, avg_latency = history.get(model, (None, None))
+        from_history = avg_ct is not None
+        avg_ct = avg_ct if from_history else DEFAULT_COMPLETION_TOKENS
+        completion_tokens = int(avg_ct * n)
+        per_question = avg_latency or (REQUEST_OVERHEAD_SECS + avg_ct / DEFAULT_TOKENS_PER_SEC)
+
+        rpm, tpm = model_limits(model)
+        wall = max(n * per_question / concurrency, n / rpm * 60, (prompt_tokens + completion_tokens) / tpm * 60) if n else 0
+
+        results.append({
+            "model": model,
+            "questions": n,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": calculate_cost(model, prompt_tokens, completion_tokens),
+            "batch_cost": calculate_cost(model, prompt_tokens, completion_tokens, BATCH_DISCOUNT),
+            "wall_secs": wall,
+            "from_history": from_history,
+            "exact_tokens": get_encoder(model) is not None,
+        })
+    return results
+
+def format_estimate(results):
+    """Plain-text table for the GUI dialog and the CLI."""
+    w = max([15] + [len(r["model"]) + 2 for r in results])
+    lines = [f"{'Model':<{w}}{'Prompt tok':>12}{'Compl. tok':>12}{'Cost $':>10}{'Cost ₹':>10}{'Batch $':>10}{'Wall time':>11}"]
+    for r in results:
+        lines.append(f"{r['model']:<{w}}{r['prompt_tokens']:>12,}{r['completion_tokens']:>12,}{r['cost']:>10.2f}"
+                     f"{r['cost']*USD_TO_INR:>10.0f}{r['batch_cost']:>10.2f}{str(timedelta(seconds=int(r['wall_secs']))):>11}")
+    notes = []
+    if any(not r["from_history"] for r in results):
+        notes.append(f"Completion tokens assume {DEFAULT_COMPLETION_TOKENS}/answer where there is no history yet.")
+    if any(not r["exact_tokens"] for r in results):
+        notes.append("Prompt tokens are approximate (tiktoken not available).")
+    return "\n".join(lines + [""] + notes)
@@ -0,0 +1,62 @@
+import threading
+from collections import deque, namedtuple
+
+from .config import LOG_MAX_LINES
+
+# Only the newest of these matters: a burst collapses into one UI update
+LATEST_WINS = ("progress", "stats")
+
+# One drained frame. logs: lines to append (oldest first), dropped: lines
+# lost to the cap since the last frame, latest: {kind: data} for LATEST_WINS,
+# jobs: newest snapshot per job, deltas: preview text merged per answer,
+# control: ("done"/"stopped", data) in the order they arrived.
+UIBatch = namedtuple("UIBatch", ["logs", "dropped", "latest", "jobs", "deltas", "control"])
+
+class EventChannel:
+    """
+    Thread-safe buffer between worker threads and a UI loop. `put` is a
+    drop-in `on_event(kind, data)`; the UI calls `drain()` once per frame
+    and applies the coalesced batch, so the cost of a frame depends on how
+    much changed rather than on how many events were sent.
+    """
+    def __init__(self, max_logs=LOG_MAX_LINES):
+        self.lock = threading.Lock()
+        self.max_logs = max_logs
+        self.received = 0
+        self._reset()
+
+    def _reset(self):
+        self.logs = deque(maxlen=self.max_logs)
+        self.dropped = 0
+        self.latest = {}
+        self.jobs = {}
+        self.deltas = []
+        self.control = []
+
+    def put(self, kind, data=None):
+        with self.lock:
+            self.received += 1
+            if kind == "log":
+                if len(self.logs) == self.max_logs: self.dropped += 1
+                self.logs.append(data)
+            elif kind in LATEST_WINS:
+                self.latest[kind] = data
+            elif kind == "job":
+                self.jobs[data["id"]] = data
+            elif kind == "delta":
+                last = self.deltas[-1] if self.deltas else None
+                if (last and not last.get("done") and not data.get("done")
+                        and (last.get("job"), last["index"]) == (data.get("job"), data["index"])):
+                    last["text"] += data["text"]
+                else:
+                    self.deltas.append(dict(data))
+            else:
+                self.control.append((kind, data))
+
+    def drain(self):
+        """Returns everything put since the last call as a UIBatch, or None if nothing was."""
+        with self.lock:
+            if not (self.logs or self.latest or self.jobs or self.deltas or self.control): return None
+            batch = UIBatch(list(self.logs), self.dropped, self.latest, list(self.jobs.values()), self.deltas, self.control)
+            self._reset()
+        return batch
@@ -0,0 +1,232 @@
+"""
+Question extraction. The document XML is streamed with iterparse, so
+questions become available paragraph by paragraph and a 5,000-paragraph
+paper never has to be fully parsed before work can start.
+
+Which blocks count as questions is decided by a QuestionDetector: an
+ordered list of rules, each returning True (question), False (skip) or
+None (no opinion). Pass your own rules to change what gets picked up.
+"""
+import re
+import logging
+import zipfile
+import threading
+import posixpath
+from collections import namedtuple
+from contextlib import contextmanager
+from xml.etree.ElementTree import iterparse, parse
+
+from .config import MIN_QUESTION_LENGTH
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+# Content that python-docx's paragraph.text leaves out (text boxes, compatibility fallbacks)
+SKIPPED_SUBTREES = (W + "txbxContent", "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback")
+RUN_TEXT = {W + "tab": "\t", W + "br": "\n", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+# text: paragraph text (table cell: its paragraphs joined by newlines)
+# style: paragraph style id, e.g. "Heading1"; numbered: Word list numbering
+Block = namedtuple("Block", ["text", "style", "numbered", "in_table"])
+
+# ================= DETECTION RULES =================
+NUMBERED_RE = re.compile(r"^\s*(?:Q(?:uestion)?\s*\.?\s*\d{1,3}\b|\(?\d{1,3}\s*[.):])", re.IGNORECASE)
+INSTRUCTION_RE = re.compile(r"^\s*(?:general\s+)?(?:instructions?\b|note\s*[:\-]|time\s+allowed|duration\s*:|"
+                            r"max(?:imum|\.)?\s+marks|total\s+marks|answer\s+(?:all|any)\b|attempt\s+(?:all|any)\b)",
+                            re.IGNORECASE)
+SECTION_RE = re.compile(r"^\s*(?:section|part|paper)\s+[A-Z0-9IVX]{1,4}\b", re.IGNORECASE)
+HEADING_STYLES = ("heading", "title", "subtitle", "toc")
+
+def skip_headings(block):
+    """Heading, title and TOC styled paragraphs are structure, not questions."""
+    if block.style and block.style.lower().startswith(HEADING_STYLES): return False
+    return None
+
+def skip_instructions(block):
+    """'Time allowed: 3 hours', 'Answer any five...', 'Section A (20 marks)' etc."""
+    if INSTRUCTION_RE.match(block.text): return False
+    if SECTION_RE.match(block.text) and len(block.text) < 60: return False
+    return None
+
+def numbered_questions(block):
+    """'1. ...', 'Q3) ...', 'Question 12 ...' or Word list numbering; allows short questions."""
+    numbered = block.numbered or (block.style or "").lower().startswith("listnumber") or NUMBERED_RE.match(block.text)
+    if numbered and len(block.text) >= 5: return True
+    return None
+
+def min_length(block):
+    """The original rule: anything long enough is a question."""
+    return len(block.text) >= MIN_QUESTION_LENGTH
+
+DEFAULT_RULES = (skip_headings, skip_instructions, numbered_questions, min_length)
+
+class QuestionDetector:
+    def __init__(self, rules=DEFAULT_RULES, include_tables=True):
+        self.rules = list(rules)
+        self.include_tables = include_tables
+
+    def is_question(self, block):
+        if not block.text or (block.in_table and not self.include_tables): return False
+        for rule in self.rules:
+            verdict = rule(block)
+            if verdict is not None: return verdict
+        return False
+
+# ================= STREAMING PARSER =================
+def main_part(zf):
+    """Path of the main document part inside the package (normally word/document.xml)."""
+    try:
+        for rel in parse(zf.open("_rels/.rels")).getroot().iter(REL + "Relationship"):
+            if rel.get("Type") == OFFICE_DOCUMENT: return posixpath.normpath(rel.get("Target").lstrip("/"))
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+class _CountingReader:
+    """Tracks how many uncompressed bytes iterparse has consumed."""
+    def __init__(self, f):
+        self.f = f
+        self.pos = 0
+
+    def read(self, n=-1):
+        data = self.f.read(n)
+        self.pos += len(data)
+        return data
+
+def iter_blocks(input_path, on_progress=None):
+    """
+    Yields a Block per body paragraph and per table cell, in document order.
+    `on_progress(fraction)` is called as the XML is read.
+    """
+    with zipfile.ZipFile(input_path) as zf:
+        name = main_part(zf)
+        size = zf.getinfo(name).file_size or 1
+        with zf.open(name) as raw:
+            reader = _CountingReader(raw)
+            skip_depth = 0
+            cells = []  # open table cells (nested tables): list of Blocks for their paragraphs
+            para = None # [text parts, style, numbered] of the paragraph being read
+            last = 0.0
+            for event, el in iterparse(reader, events=("start", "end")):
+                tag = el.tag
+                if tag in SKIPPED_SUBTREES:
+                    skip_depth += 1 if event == "start" else -1
+                    if event == "end": el.clear()
+                    continue
+                if skip_depth: continue
+                if event == "start":
+                    if tag == W + "p" and para is None: para = [[], None, False]
+                    elif tag == W + "tc": cells.append([])
+                    continue
+
+                if para is not None:
+                    if tag == W + "t": para[0].append(el.text or "")
+                    elif tag in RUN_TEXT: para[0].append(RUN_TEXT[tag])
+                    elif tag == W + "pStyle": para[1] = el.get(W + "val")
+                    elif tag == W + "numPr": para[2] = True
+                if tag == W + "p":
+                    block = Block("".join(para[0]).strip(), para[1], para[2], bool(cells))
+                    para = None
+                    if cells: cells[-1].append(block)
+                    else: yield block
+                    el.clear()
+                elif tag == W + "tc":
+                    parts = cells.pop()
+                    text = "\n".join(b.text for b in parts if b.text)
+                    if parts: yield Block(text, parts[0].style, any(b.numbered for b in parts), True)
+                    el.clear()
+                elif tag in (W + "tbl", W + "body"):
+                    el.clear()
+
+                if on_progress and reader.pos / size - last >= 0.01:
+                    last = reader.pos / size
+                    on_progress(min(last, 1.0))
+
+def iter_questions(input_path, detector=None, on_progress=None):
+    detector = detector or QuestionDetector()
+    for block in iter_blocks(input_path, on_progress):
+        if detector.is_question(block): yield block.text
+
+def load_questions(input_path, detector=None):
+    return list(iter_questions(input_path, detector))
+
+# ================= BACKGROUND LOADER =================
+class QuestionLoader:
+    """
+    Extracts questions on a background thread. Behaves like a list that grows
+    while the document is read, so an Engine can start dispatching before
+    extraction finishes; `finished` turns True once it is complete (check
+    `error` for a failure).
+
+    `on_progress(fraction, count)` and `on_done(loader)` run on the loader thread,
+    as do callbacks registered with `listening` (after every new question).
+    """
+    def __init__(self, input_path, detector=None, on_progress=None, on_done=None):
+        self.input_path = input_path
+        self.detector = detector
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.items = []
+        self.error = None
+        self.cond = threading.Condition()
+        self._finished = False
+        self.listeners = []
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._load, daemon=True)
+        self.thread.start()
+        return self
+
+    def _load(self):
+        progress = (lambda f: self.on_progress(f, len(self.items))) if self.on_progress else None
+        try:
+            for q in iter_questions(self.input_path, self.detector, progress):
+                with self.cond:
+                    self.items.append(q)
+                    self.cond.notify_all()
+                self._notify()
+        except Exception as e:
+            logging.exception(f"Could not read questions from {self.input_path}")
+            self.error = e
+        finally:
+            with self.cond:
+                self._finished = True
+                self.cond.notify_all()
+            self._notify()
+            if self.on_done: self.on_done(self)
+
+    def _notify(self):
+        for callback in list(self.listeners): callback()
+
+    @contextmanager
+    def listening(self, callback):
+        """Calls `callback()` whenever a question is added or loading ends, while the block runs."""
+        self.listeners.append(callback)
+        try: yield self
+        finally: self.listeners.remove(callback)
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def wait_for(self, n, timeout=None):
+        """Blocks until at least `n` questions are loaded or loading ends; returns the count."""
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.items) >= n or self._finished, timeout)
+            return len(self.items)
+
+    def wait(self, timeout=None):
+        """Blocks until extraction is complete; re-raises a loading error."""
+        with self.cond: self.cond.wait_for(lambda: self._finished, timeout)
+        if self.error: raise self.error
+        return self
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __iter__(self):
+        return iter(list(self.items))
@@ -0,0 +1,225 @@
+import os
+import glob
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from .config import JOBS_FILE, MAX_PARALLEL_JOBS, DEFAULT_CONCURRENCY, MAX_CONCURRENCY
+from .control import RunControl
+from .extract import QuestionLoader
+from .metrics import merge_routes
+from .utils import load_json, save_json, default_output_path, is_output
+
+# Jobs in these states are picked up by the next run (including after a restart)
+PENDING_STATES = ("queued", "running", "stopped", "failed")
+
+def collect_inputs(paths):
+    """Expands files, directories and glob patterns into a sorted list of .docx inputs."""
+    found = []
+    for p in paths:
+        if os.path.isdir(p):
+            matches = glob.glob(os.path.join(p, "*.docx"))
+        else:
+            matches = glob.glob(p) or [p]
+        # Skip our own outputs (answers, volumes, index or merged documents) and Word lock files
+        found.extend(m for m in sorted(matches) if not is_output(m) and not os.path.basename(m).startswith("~$"))
+    return list(dict.fromkeys(found))
+
+# ================= JOB QUEUE =================
+class Job:
+    def __init__(self, input_path, output_path, id=None, status="queued", processed=0, total=0, cost=0.0):
+        self.id = id or uuid.uuid4().hex[:8]
+        self.input_path = input_path
+        self.output_path = output_path
+        self.status = status
+        self.processed = processed
+        self.total = total
+        self.cost = cost
+
+    @property
+    def name(self):
+        return os.path.basename(self.input_path)
+
+    @property
+    def percent(self):
+        return int(self.processed / self.total * 100) if self.total else 0
+
+    def to_dict(self):
+        return {"id": self.id, "input_path": self.input_path, "output_path": self.output_path, "status": self.status,
+                "processed": self.processed, "total": self.total, "cost": self.cost}
+
+class JobQueue:
+    """
+    Ordered list of input files to process, persisted to `path` so queued
+    work survives a restart. Pass path=None for an in-memory queue.
+    """
+    def __init__(self, path=JOBS_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.jobs = [Job(**d) for d in load_json(path, [])] if path else []
+        for job in self.jobs:
+            # Interrupted by a crash or exit; its progress file lets it resume
+            if job.status == "running": job.status = "queued"
+
+    def add(self, input_path, output_path=None):
+        input_path = os.path.abspath(input_path)
+        with self.lock:
+            for job in self.jobs:
+                if job.input_path == input_path and job.status in PENDING_STATES: return None
+            job = Job(input_path, output_path or default_output_path(input_path))
+            self.jobs.append(job)
+            self.save()
+            return job
+
+    def add_paths(self, paths, output_dir=None):
+        added = []
+        for p in collect_inputs(paths):
+            job = self.add(p, default_output_path(os.path.abspath(p), output_dir))
+            if job: added.append(job)
+        return added
+
+    def pending(self):
+        with self.lock: return [j for j in self.jobs if j.status in PENDING_STATES]
+
+    def update(self, job, save=True, **fields):
+        with self.lock:
+            for k, v in fields.items(): setattr(job, k, v)
+            if save: self.save()
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = [j for j in self.jobs if j.status != "done"]
+            self.save()
+
+    def save(self):
+        if not self.path: return
+        with self.lock: save_json(self.path, [j.to_dict() for j in self.jobs])
+
+# ================= JOB RUNNER =================
+class JobRunner:
+    """
+    Processes every pending job in a JobQueue, up to `max_parallel_jobs` files
+    at once. All engines share one request pool (`concurrency` workers) and
+    the per-model rate limiters, so adding files does not multiply API load.
+
+    Emits the Engine event kinds for the aggregate run, plus "job" events
+    carrying a job snapshot (Job.to_dict()) whenever a job changes.
+    """
+    def __init__(self, job_queue, engine_kwargs, mode="interactive", max_parallel_jobs=MAX_PARALLEL_JOBS,
+                 on_event=None, control=None):
+        self.queue = job_queue
+        self.engine_kwargs = engine_kwargs
+        self.mode = mode
+        self.max_parallel_jobs = max(1, max_parallel_jobs)
+        self.on_event = on_event or (lambda kind, data: None)
+        self.control = control or RunControl()
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.cache_counts = {}
+        self.latency = {}  # job id -> (avg ttft, avg tokens/sec)
+        self.throughput = {}  # job id -> (answers/min, tokens/sec)
+        self.routes = {}  # job id -> per-route stats (RunMetrics.routes)
+        self.start_time = time.time()
+        self.baseline = 0
+
+    @property
+    def is_paused(self):
+        return self.control.paused
+
+    @is_paused.setter
+    def is_paused(self, value):
+        self.control.paused = value # Shared with every engine
+
+    def run(self):
+        """Returns True if every job completed."""
+        self.jobs = self.queue.pending()
+        if not self.jobs:
+            self.on_event("done", None)
+            return True
+        self.start_time = time.time()
+        self.baseline = sum(j.processed for j in self.jobs)
+        concurrency = max(1, min(int(self.engine_kwargs.get("concurrency", DEFAULT_CONCURRENCY)), MAX_CONCURRENCY))
+        self.on_event("log", f"Processing {len(self.jobs)} file(s), {min(self.max_parallel_jobs, len(self.jobs))} at a time...")
+
+        api_pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_parallel_jobs, len(self.jobs))) as job_pool:
+                wait([job_pool.submit(self.run_job, job, api_pool) for job in self.jobs])
+        finally:
+            # After a stop, requests still in flight are not waited for (the engines have abandoned them)
+            api_pool.shutdown(wait=False, cancel_futures=True)
+
+        if self.control.is_set():
+            self.on_event("stopped", None)
+            return False
+        failed = [j for j in self.jobs if j.status != "done"]
+        if failed: self.on_event("log", f"⚠️ {len(failed)} file(s) did not complete; press START to retry.")
+        self.on_event("progress", {"val": 100, "text": "Finished"})
+        self.on_event("done", None)
+        return not failed
+
+    def run_job(self, job, api_pool):
+        if self.control.is_set(): return
+        self.queue.update(job, status="running")
+        self.on_event("job", job.to_dict())
+        stats = {"cost": 0.0, "processed": 0} # A resumed engine restores the cost so far from its journal
+        from .engine import Engine # Imported on first use: it loads openai and python-docx
+        engine = Engine(**self.engine_kwargs, on_event=lambda kind, data: self.handle(job, stats, kind, data),
+                        control=self.control, stats=stats, pool=api_pool)
+        try:
+            # Dispatch starts while the rest of the file is still being read
+            questions = QuestionLoader(job.input_path).start()
+            run = engine.run_batch if self.mode == "batch" else engine.run
+            ok = run(questions, job.input_path, job.output_path)
+            status = "done" if ok else ("stopped" if self.control.is_set() else "failed")
+        except Exception as e:
+            logging.exception(f"Job {job.name} failed")
+            self.on_event("log", f"[{job.name}] Error: {e}")
+            status = "failed"
+        self.queue.update(job, status=status, cost=stats["cost"])
+        self.on_event("job", job.to_dict())
+        self.emit_totals()
+
+    def handle(self, job, stats, kind, data):
+        if kind == "log":
+            self.on_event("log", f"[{job.name}] {data}")
+        elif kind == "progress" and "index" in data:
+            # Reported together with the "stats" event that follows
+            self.queue.update(job, save=False, processed=data["index"], total=data["total"])
+        elif kind == "stats":
+            self.queue.update(job, save=False, cost=stats["cost"])
+            with self.lock:
+                self.cache_counts[job.id] = (data.get("hits", 0), data.get("misses", 0))
+                if data.get("ttft") is not None: self.latency[job.id] = (data["ttft"], data["tps"])
+                self.throughput[job.id] = (data.get("qpm", 0.0), data.get("tok_s", 0.0))
+                if data.get("routes"): self.routes[job.id] = data["routes"]
+            self.on_event("job", job.to_dict())
+            self.emit_totals()
+        elif kind == "delta":
+            self.on_event("delta", {**data, "job": job.id})
+        # Per-job "done"/"stopped" are summarised by run()
+
+    def emit_totals(self):
+        with self.lock:
+            total = sum(j.total for j in self.jobs)
+            processed = sum(j.processed for j in self.jobs)
+            finished = sum(1 for j in self.jobs if j.status == "done")
+            hits = sum(h for h, _ in self.cache_counts.values())
+            misses = sum(m for _, m in self.cache_counts.values())
+            latency = list(self.latency.values())
+            running = {j.id for j in self.jobs if j.status == "running"}
+            qpm = sum(q for jid, (q, _) in self.throughput.items() if jid in running)
+            tok_s = sum(t for jid, (_, t) in self.throughput.items() if jid in running)
+            routes = merge_routes(self.routes.values())
+        elapsed = time.time() - self.start_time
+        done_now = processed - self.baseline
+        eta = str(timedelta(seconds=int(elapsed / done_now * (total - processed)))) if done_now > 0 else "--:--"
+        self.on_event("progress", {"val": int(processed / total * 100) if total else 0,
+                                   "text": f"{processed}/{total} Qs | {finished}/{len(self.jobs)} files"})
+        self.on_event("stats", {"usd": sum(j.cost for j in self.jobs), "eta": eta, "hits": hits, "misses": misses,
+                                "ttft": sum(t for t, _ in latency) / len(latency) if latency else None,
+                                "tps": sum(r for _, r in latency) / len(latency) if latency else None,
+                                "qpm": qpm, "tok_s": tok_s, "routes": routes})
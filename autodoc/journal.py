@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+from .utils import load_json, get_legacy_progress_filename
+
+@contextmanager
+def file_lock(f):
+    """Exclusive OS-level lock on an open file, so two processes never interleave appends."""
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try: yield
+        finally: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try: yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class ProgressJournal:
+    """
+    Append-only JSONL record of the answers that are safely in the output
+    document, one line per question:
+
+        {"index": 12, "answer_sha": "...", "prompt_tokens": 310, "completion_tokens": 540,
+         "cost": 0.00037, "cached": false, "ts": 1760000000.0}
+
+    Lines are appended under a lock and fsynced. A torn last line from a
+    crash mid-write is ignored on load. `done` maps index -> entry, so a
+    resume skips exactly those questions, in any order.
+    """
+    def __init__(self, path, input_path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        self.needs_newline = False
+        self.load()
+        if not self.done and input_path: self.import_legacy(input_path)
+
+    def load(self):
+        if not os.path.exists(self.path): return
+        with open(self.path, "rb") as f: data = f.read()
+        self.needs_newline = bool(data) and not data.endswith(b"\n")
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+                self.done[int(entry["index"])] = entry
+            except (ValueError, KeyError, TypeError):
+                logging.warning(f"Skipping unreadable line in {self.path}")
+
+    def import_legacy(self, input_path):
+        """Carries over a resume point from the old progress_<name>.json ({"last_index": i})."""
+        legacy = get_legacy_progress_filename(input_path)
+        last_idx = load_json(legacy, {}).get("last_index", -1)
+        if last_idx >= 0 and self.append([{"index": i, "legacy": True} for i in range(last_idx + 1)]):
+            os.remove(legacy)
+
+    @property
+    def cost(self):
+        return sum(e.get("cost", 0.0) for e in self.done.values())
+
+    def append(self, entries):
+        """Records `entries` (dicts with an "index"); returns False if they could not be written."""
+        if not entries: return True
+        now = time.time()
+        lines = "".join(json.dumps({"ts": now, **e}) + "\n" for e in entries)
+        with self.lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f, file_lock(f):
+                    if self.needs_newline: lines = "\n" + lines
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                logging.warning(f"Could not append to {self.path}", exc_info=True)
+                return False
+            self.needs_newline = False
+            for e in entries: self.done[e["index"]] = e
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.done.clear()
+            if os.path.exists(self.path): os.remove(self.path)
@@ -0,0 +1,141 @@
+import os
+import csv
+import json
+import math
+import time
+import threading
+from collections import deque
+
+from .config import REPORTS_DIR, THROUGHPUT_WINDOW_SECS
+
+# Per-question fields, in report (CSV) column order
+FIELDS = ["index", "cached", "route", "model", "escalations", "queue_wait", "rate_wait", "retries", "ttft", "latency",
+          "prompt_tokens", "completion_tokens", "tps", "cost", "render", "error"]
+TIMED_FIELDS = ["queue_wait", "rate_wait", "ttft", "latency", "tps", "render"]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (already filtered of None)."""
+    if not values: return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def merge_routes(parts):
+    """Combines routes() of several runs; latency is the weighted mean and p95 the worst of them."""
+    out = {}
+    for routes in parts:
+        for name, r in routes.items():
+            m = out.setdefault(name, {"questions": 0, "cost": 0.0, "latency": 0.0, "p95": 0.0, "escalations": 0})
+            n = m["questions"] + r["questions"]
+            m["latency"] = (m["latency"] * m["questions"] + r["latency"] * r["questions"]) / n if n else 0.0
+            m["questions"] = n
+            m["cost"] += r["cost"]
+            m["p95"] = max(m["p95"], r["p95"])
+            m["escalations"] += r["escalations"]
+    return out
+
+def format_routes(routes, sep=" | "):
+    """Per-route stats for Live Stats and the CLI: 'long 3 · $0.0310 · 8.2s | short 12 · ...'."""
+    return sep.join(f"{name} {r['questions']} · ${r['cost']:.4f} · {r['latency']:.1f}s"
+                      + (f" · {r['escalations']}↑" if r["escalations"] else "") for name, r in sorted(routes.items()))
+
+class RunMetrics:
+    """
+    Per-question timings and token counts for one run, plus DOCX save times.
+    Thread-safe; `summary()` aggregates p50/p95/p99 and `write_report()` saves
+    the run as JSON and CSV.
+    """
+    def __init__(self, label="run", model=None, concurrency=None):
+        self.lock = threading.Lock()
+        self.label = label
+        self.model = model
+        self.concurrency = concurrency
+        self.started = time.time()
+        self.records = {}
+        self.save_times = []
+        self.recent = deque()  # (finished_at, completion_tokens) inside the throughput window
+
+    def record(self, index, **fields):
+        with self.lock:
+            self.records.setdefault(index, {"index": index}).update(fields)
+
+    def finished(self, completion_tokens):
+        now = time.time()
+        with self.lock:
+            self.recent.append((now, completion_tokens))
+            while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW_SECS: self.recent.popleft()
+
+    def add_save(self, secs):
+        with self.lock: self.save_times.append(secs)
+
+    def throughput(self):
+        """(answers per minute, completion tokens per second) over the recent window."""
+        now = time.time()
+        with self.lock:
+            while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW_SECS: self.recent.popleft()
+            if not self.recent: return 0.0, 0.0
+            span = max(min(THROUGHPUT_WINDOW_SECS, now - self.started), 1.0)
+            return len(self.recent) * 60 / span, sum(t for _, t in self.recent) / span
+
+    def averages(self):
+        """Mean ttft and per-request tokens/sec over generated (non-cached) answers."""
+        with self.lock: rows = [r for r in self.records.values() if r.get("latency") is not None]
+        if not rows: return {"ttft": None, "tps": None}
+        return {"ttft": sum(r["ttft"] for r in rows) / len(rows), "tps": sum(r["tps"] for r in rows) / len(rows)}
+
+    def routes(self):
+        """{route: questions, cost, mean and p95 latency, escalations} over generated answers."""
+        with self.lock: rows = [r for r in self.records.values() if r.get("route") and r.get("latency") is not None]
+        out = {}
+        for name in {r["route"] for r in rows}:
+            mine = [r for r in rows if r["route"] == name]
+            latencies = [r["latency"] for r in mine]
+            out[name] = {"questions": len(mine), "cost": sum(r.get("cost") or 0.0 for r in mine),
+                         "latency": sum(latencies) / len(latencies), "p95": percentile(latencies, 95),
+                         "escalations": sum(r.get("escalations") or 0 for r in mine)}
+        return out
+
+    def summary(self):
+        with self.lock:
+            rows = list(self.records.values())
+            saves = list(self.save_times)
+        elapsed = time.time() - self.started
+        generated = [r for r in rows if r.get("latency") is not None]
+        completion = sum(r.get("completion_tokens") or 0 for r in generated)
+        out = {
+            "label": self.label,
+            "model": self.model,
+            "concurrency": self.concurrency,
+            "elapsed_secs": elapsed,
+            "questions": len(rows),
+            "generated": len(generated),
+            "cached": sum(1 for r in rows if r.get("cached")),
+            "errors": sum(1 for r in rows if r.get("error")),
+            "retries": sum(r.get("retries") or 0 for r in rows),
+            "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in generated),
+            "completion_tokens": completion,
+            "tokens_per_sec": completion / elapsed if elapsed > 0 else 0.0,
+            "answers_per_min": len(rows) * 60 / elapsed if elapsed > 0 else 0.0,
+            "routes": self.routes(),
+        }
+        for field in TIMED_FIELDS + ["save"]:
+            values = saves if field == "save" else [r[field] for r in rows if r.get(field) is not None]
+            out[field] = {
+                "mean": sum(values) / len(values) if values else None,
+                "p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99),
+                "max": max(values) if values else None, "count": len(values),
+            }
+        return out
+
+    def write_report(self, directory=REPORTS_DIR):
+        """Writes <label>_<timestamp>.json (summary + rows) and .csv (rows); returns the JSON path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.label}_{time.strftime('%Y%m%d_%H%M%S')}")
+        with self.lock: rows = [self.records[i] for i in sorted(self.records)]
+        with open(f"{base}.json", "w") as f:
+            json.dump({"summary": self.summary(), "questions": rows, "save_times": self.save_times}, f, indent=2)
+        with open(f"{base}.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        return f"{base}.json"
@@ -0,0 +1,108 @@
+"""
+Question packing: several short questions answered by one request. With
+short (e.g. MCQ-style) questions the system prompt and per-request overhead
+dominate cost and latency, so consecutive short questions are grouped up to
+a token budget and sent together. Only questions the Router puts on the
+"short" route are packed, and a pack's max_tokens is the sum of their answer
+budgets, so a pack is not cut off by questions that need long answers. The
+model replies with JSON, one answer per question id:
+
+    {"answers": [{"id": "Q12", "answer": "..."}, {"id": "Q13", "answer": "..."}]}
+
+The answers are split back into ordinary per-question responses. A pack
+that comes back malformed (bad JSON, truncated, missing ids) falls back to
+asking the affected questions one at a time.
+"""
+import re
+import json
+from types import SimpleNamespace
+
+from .config import PACK_MAX_QUESTION_TOKENS, PACK_TOKEN_BUDGET, PACK_MAX_QUESTIONS, PACK_MAX_TOKENS
+from .client import estimate_tokens
+
+PACK_INSTRUCTIONS = (
+    "You will receive several questions as a JSON array of objects with an \"id\" and a \"question\". "
+    "Answer every question on its own, following the instructions above, with each answer in Markdown. "
+    "Reply with only a JSON object of the form "
+    "{\"answers\": [{\"id\": \"<id>\", \"answer\": \"<markdown answer>\"}]}, "
+    "with one entry per question, in the same order."
+)
+ANSWER_OVERHEAD_TOKENS = 20 # Per answer in a pack: its id, quotes and JSON escapes
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+def question_id(index):
+    return f"Q{index + 1}"
+
+class Packer:
+    """
+    Decides which questions can be packed and when a pack is full, using
+    `router` (routing.Router) to tell short-answer questions and size their
+    answers. `max_tokens` caps the output of one pack.
+    """
+    def __init__(self, router, max_question_tokens=PACK_MAX_QUESTION_TOKENS, budget=PACK_TOKEN_BUDGET,
+                 max_questions=PACK_MAX_QUESTIONS, max_tokens=PACK_MAX_TOKENS):
+        self.router = router
+        self.max_question_tokens = max_question_tokens
+        self.budget = budget
+        self.max_questions = max_questions
+        self.max_tokens = max_tokens
+
+    def fits(self, question):
+        """Whether `question` is short, expects a short answer and goes to the main model."""
+        route = self.router.route(question)
+        return (route.name == "short" and route.model == self.router.model
+                and estimate_tokens(question) <= self.max_question_tokens)
+
+    def answer_tokens(self, question):
+        return self.router.sized_tokens("short", question) + ANSWER_OVERHEAD_TOKENS
+
+    def pack_tokens(self, pack):
+        """max_tokens for a pack: the sum of its questions' answer budgets."""
+        return min(self.max_tokens, sum(self.answer_tokens(q) for _, q in pack))
+
+    def has_room(self, pack, question):
+        """Whether `question` can join `pack`, a list of (index, question)."""
+        if len(pack) >= self.max_questions: return False
+        if sum(estimate_tokens(q) for _, q in pack) + estimate_tokens(question) > self.budget: return False
+        return sum(self.answer_tokens(q) for _, q in pack) + self.answer_tokens(question) <= self.max_tokens
+
+    def messages(self, system_prompt, pack):
+        """(system prompt, user prompt) for a packed request."""
+        items = [{"id": question_id(i), "question": q} for i, q in pack]
+        return f"{system_prompt}\n\n{PACK_INSTRUCTIONS}", json.dumps(items, ensure_ascii=False)
+
+def parse_answers(content, ids):
+    """{id: answer} for the well-formed entries of a packed reply; ids that are missing or empty are left out."""
+    m = FENCE_RE.match(content or "")
+    try:
+        data = json.loads(m.group(1) if m else content or "")
+    except ValueError:
+        return {}
+    entries = data.get("answers") if isinstance(data, dict) else data
+    if isinstance(entries, dict): # {"Q12": "...", ...}
+        entries = [{"id": k, "answer": v} for k, v in entries.items()]
+    answers = {}
+    for entry in entries if isinstance(entries, list) else ():
+        if not isinstance(entry, dict): continue
+        qid, answer = str(entry.get("id", "")).strip(), entry.get("answer")
+        if qid in ids and qid not in answers and isinstance(answer, str) and answer.strip():
+            answers[qid] = answer.strip()
+    return answers
+
+def split_tokens(total, weights):
+    """Splits `total` in proportion to `weights` into integers that add up to it."""
+    weights = [max(w, 0) for w in weights]
+    if not sum(weights): weights = [1] * len(weights)
+    exact = [total * w / sum(weights) for w in weights]
+    parts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(parts)), key=lambda k: exact[k] - parts[k], reverse=True)
+    for k in by_remainder[:total - sum(parts)]: parts[k] += 1
+    return parts
+
+def make_response(content, prompt_tokens, completion_tokens, finish_reason="stop"):
+    """A ChatCompletion-shaped object for one answer taken from a pack."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason=finish_reason)],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens)
+    )
@@ -0,0 +1,223 @@
+"""
+Markdown -> DOCX. Each answer is rendered in one pass: every line is
+classified by a single precompiled pattern, and inline markup is split by
+one tokenizer regex. Elements are built directly on the XML through a
+RenderContext that resolves style ids and the table width once per document
+and appends to the body without searching it: python-docx's `.style`
+setter scans every style on each call, and `add_paragraph`/`add_table` scan
+the whole body for the section properties, so render time used to grow
+with the length of the output.
+
+Supported: # headings, - / * / 1. lists (nested by indentation), | tables |,
+```code blocks```, **bold**, *italic* / _italic_, ***both*** and `inline code`.
+"""
+import re
+import weakref
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.table import CT_Tbl
+from docx.text.paragraph import Paragraph
+from docx.shared import Pt, RGBColor
+
+CODE_FONT = "Consolas"
+CODE_SIZE = Pt(9)
+CODE_COLOR = RGBColor(0, 100, 0) # Green code
+CODE_INDENT = Pt(20)
+CODE_BLOCK_STYLE = "Code Block"
+INLINE_CODE_STYLE = "Inline Code"
+MAX_LIST_LEVEL = 3 # 'List Bullet', 'List Bullet 2', 'List Bullet 3'
+
+BLOCK_RE = re.compile(r"""
+    (?P<indent>[ \t]*)
+    (?:
+        (?P<fence>```|~~~)
+      | (?P<hashes>\#{1,6})[ \t]+(?P<heading>.*)
+      | (?P<rule>(?:[-*_][ \t]*){3,})$
+      | [-*+][ \t]+(?P<bullet>.*)
+      | \d{1,9}[.)](?:[ \t]+(?P<number>.*))?$
+      | (?P<row>\|.*)
+    )?""", re.VERBOSE)
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+CELL_SPLIT_RE = re.compile(r"(?<!\\)\|")
+INLINE_RE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|\*\*\*(?P<bold_italic>\S(?:.*?\S)?)\*\*\*"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>\S(?:.*?\S)?)__"
+    r"|(?<![\w*])\*(?P<italic>[^\s*](?:[^*]*?[^\s*])?)\*(?![\w*])"
+    r"|(?<!\w)_(?P<italic2>[^\s_](?:[^_]*?[^\s_])?)_(?!\w)")
+INLINE_MARKERS = ("*", "_", "`")
+
+# ================= DOCUMENT CONTEXT =================
+class RenderContext:
+    """Style ids, table width and body of one document, created on first use (see get_context)."""
+    def __init__(self, document):
+        doc_styles = document.styles
+        def find(name):
+            try: return doc_styles[name].style_id
+            except KeyError: return None # Custom template without it: plain paragraph
+
+        self.headings = [find(f"Heading {i}") for i in range(1, 7)]
+        self.bullets = [find("List Bullet")] + [find(f"List Bullet {i}") or find("List Bullet") for i in range(2, MAX_LIST_LEVEL + 1)]
+        self.numbers = [find("List Number")] + [find(f"List Number {i}") or find("List Number") for i in range(2, MAX_LIST_LEVEL + 1)]
+        self.table = find("Table Grid")
+
+        self.code_block = find(CODE_BLOCK_STYLE)
+        if self.code_block is None:
+            style = doc_styles.add_style(CODE_BLOCK_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+            style.font.name = CODE_FONT
+            style.font.size = CODE_SIZE
+            style.font.color.rgb = CODE_COLOR
+            style.paragraph_format.left_indent = CODE_INDENT
+            self.code_block = style.style_id
+        self.inline_code = find(INLINE_CODE_STYLE)
+        if self.inline_code is None:
+            style = doc_styles.add_style(INLINE_CODE_STYLE, WD_STYLE_TYPE.CHARACTER)
+            style.font.name = CODE_FONT
+            style.font.color.rgb = CODE_COLOR
+            self.inline_code = style.style_id
+
+        section = document.sections[-1]
+        self.block_width = section.page_width - section.left_margin - section.right_margin
+        self.body = document.element.body
+        self.sect_pr = self.body.sectPr
+
+    def append(self, element):
+        """Adds a block element at the end of the body, ahead of the final w:sectPr."""
+        if self.sect_pr is not None and self.sect_pr.getparent() is self.body: self.sect_pr.addprevious(element)
+        else: self.body.append(element)
+        return element
+
+    def new_p(self, style_id=None):
+        p = self.append(OxmlElement("w:p"))
+        if style_id: p.style = style_id
+        return p
+
+_contexts = weakref.WeakKeyDictionary()
+
+def get_context(part):
+    """RenderContext for the document owning `part` (doc.part / paragraph.part)."""
+    ctx = _contexts.get(part)
+    if ctx is None:
+        ctx = _contexts[part] = RenderContext(part.document)
+    return ctx
+
+def add_paragraph(doc, text="", style_id=None):
+    """Like doc.add_paragraph(text), without the per-call body scan; `style_id` is a style id, not a name."""
+    p = get_context(doc.part).new_p(style_id)
+    if text: add_run(p, text)
+    return Paragraph(p, doc._body)
+
+# ================= INLINE =================
+def iter_spans(text, bold=False, italic=False):
+    """Yields (text, bold, italic, code) runs for one line of inline markdown."""
+    if not any(m in text for m in INLINE_MARKERS):
+        if text: yield text, bold, italic, False
+        return
+    pos = 0
+    for m in INLINE_RE.finditer(text):
+        if m.start() > pos: yield text[pos:m.start()], bold, italic, False
+        pos = m.end()
+        kind = m.lastgroup
+        inner = m.group(kind)
+        if kind == "code":
+            yield inner, bold, italic, True
+        elif kind == "bold_italic":
+            yield from iter_spans(inner, True, True)
+        elif kind in ("bold", "bold2"):
+            yield from iter_spans(inner, True, italic)
+        else:
+            yield from iter_spans(inner, bold, True)
+    if pos < len(text): yield text[pos:], bold, italic, False
+
+def add_run(p, text):
+    """Appends a run to the w:p element `p`; cheaper than Paragraph.add_run, which clears the new run first."""
+    r = p.add_r()
+    if "\t" in text: r.text = text # Becomes <w:tab/> elements
+    else: r.add_t(text)
+    return r
+
+def add_spans(p, text, ctx, bold=False):
+    for chunk, is_bold, is_italic, is_code in iter_spans(text, bold):
+        r = add_run(p, chunk)
+        if is_bold: r.get_or_add_rPr().get_or_add_b() # A bare <w:b/> is on
+        if is_italic: r.get_or_add_rPr().get_or_add_i()
+        if is_code: r.style = ctx.inline_code
+
+def add_formatted_text(paragraph, text, bold=False):
+    """
+    Adds `text` to `paragraph` as runs, applying **bold**, *italic* and `code`.
+    Example: "This is **important** text" -> "This is " + "important" (bold) + " text"
+    """
+    add_spans(paragraph._p, text, get_context(paragraph.part), bold)
+
+# ================= BLOCKS =================
+def list_level(indents, width):
+    """Nesting depth (0-based) of a list item indented by `width` columns."""
+    while indents and width < indents[-1]: indents.pop()
+    if not indents or width > indents[-1]: indents.append(width)
+    return min(len(indents), MAX_LIST_LEVEL) - 1
+
+def split_row(line):
+    line = line.strip()
+    if line.startswith("|"): line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"): line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in CELL_SPLIT_RE.split(line)]
+
+def add_table(ctx, rows):
+    tbl = ctx.append(CT_Tbl.new_tbl(len(rows), max(len(r) for r in rows), ctx.block_width))
+    if ctx.table: tbl.tblStyle_val = ctx.table
+    for r, (cells, tr) in enumerate(zip(rows, tbl.tr_lst)):
+        for text, tc in zip(cells, tr.tc_lst):
+            add_spans(tc.p_lst[0], text, ctx, bold=(r == 0)) # Header row in bold
+    return tbl
+
+def parse_markdown_to_docx(doc, text):
+    ctx = get_context(doc.part)
+    lines = text.split('\n')
+    n = len(lines)
+    i = 0
+    in_code_block = False
+    indents = [] # indentation of the enclosing list items
+
+    while i < n:
+        line = lines[i]
+        i += 1
+
+        if in_code_block:
+            if line.lstrip().startswith(("```", "~~~")): in_code_block = False
+            else: add_run(ctx.new_p(ctx.code_block), line)
+            continue
+
+        m = BLOCK_RE.match(line)
+        if m.group("fence"):
+            in_code_block = True
+            continue
+        if m.group("rule"):
+            continue
+
+        bullet, number = m.group("bullet"), m.group("number")
+        if bullet is not None or number is not None:
+            item = (bullet if bullet is not None else number).strip()
+            if not item: continue
+            level = list_level(indents, len(m.group("indent").expandtabs(4)))
+            add_spans(ctx.new_p((ctx.bullets if bullet is not None else ctx.numbers)[level]), item, ctx)
+            continue
+
+        stripped = line.strip()
+        if not stripped: continue
+        indents.clear()
+
+        if m.group("hashes"):
+            heading = m.group("heading").strip().rstrip("#").rstrip()
+            add_spans(ctx.new_p(ctx.headings[len(m.group("hashes")) - 1]), heading, ctx)
+        elif m.group("row") and i < n and TABLE_SEPARATOR_RE.match(lines[i]):
+            rows = [split_row(line)]
+            i += 1 # separator
+            while i < n and lines[i].lstrip().startswith("|"):
+                rows.append(split_row(lines[i]))
+                i += 1
+            add_table(ctx, rows)
+        else:
+            add_spans(ctx.new_p(), stripped, ctx)
@@ -0,0 +1,102 @@
+"""
+Per-question routing: which model answers a question, and how many tokens
+it may use. Each question is put on a route from its marks ("(15 marks)"),
+word limit ("in 150 words"), wording and length, and the profile's
+expected answer format:
+
+- "short": definitions, one-liners and low-mark questions.
+- "standard": everything else.
+- "long": questions worth at least HARD_QUESTION_MARKS, longer than
+  HARD_QUESTION_TOKENS, or asking for long-form answers ("critically
+  analyse", essays). These go to the hard-question model when one is set.
+
+With `adaptive` sizing, each route gets its own max_tokens from
+ROUTE_MAX_TOKENS (a stated word limit takes precedence, scaled by the
+profile), and an answer cut off at max_tokens (finish_reason "length")
+escalates: it is asked again with ESCALATE_FACTOR times the budget, on the
+hard-question model if there is one, up to ESCALATE_MAX_TOKENS. Otherwise
+every question gets MAX_TOKENS and a cut-off answer is kept as it is.
+"""
+import re
+import math
+from collections import namedtuple
+
+from .config import (MAX_TOKENS, HARD_QUESTION_MARKS, HARD_QUESTION_TOKENS, SHORT_QUESTION_MARKS,
+                     ROUTE_MAX_TOKENS, TOKENS_PER_WORD, ESCALATE_FACTOR, ESCALATE_MAX_TOKENS)
+from .client import estimate_tokens
+
+Route = namedtuple("Route", ["name", "model", "max_tokens"])
+
+MARKS_RE = re.compile(r"(\d{1,3})\s*marks?\b", re.IGNORECASE)
+WORDS_RE = re.compile(r"(\d{2,4})\s*words\b", re.IGNORECASE)
+SHORT_RE = re.compile(r"^\W*(?:\d+[.)]\s*)?(?:define|what is|what are|who|when|which|name|list|state|expand|mention)\b"
+                      r"|\b(?:one|single|a few) (?:word|line|sentence)s?\b|\bin brief\b|\bshort note\b", re.IGNORECASE)
+LONG_RE = re.compile(r"\bcritically\b|\bin detail\b|\belaborate\b|\bcomprehensive(?:ly)?\b|\bessay\b"
+                     r"|\bcase study\b|\bcompare and contrast\b|\bevaluate\b", re.IGNORECASE)
+
+# Profile wording -> expected answer length, as a factor on the route's budget
+PROFILE_SCALES = [
+    (re.compile(r"\bessays?\b", re.IGNORECASE), 2.0),
+    (re.compile(r"\b(?:detailed|comprehensive|thorough|in-depth)\b", re.IGNORECASE), 1.25),
+    (re.compile(r"\b(?:concise(?:ly)?|brief(?:ly)?|short)\b", re.IGNORECASE), 0.75),
+]
+
+class Router:
+    """
+    Picks the Route for each question. Deterministic, so it can be asked again
+    when an answer is written. `system_prompt` is the profile.
+    """
+    def __init__(self, model, hard_model=None, system_prompt="", adaptive=False,
+                 hard_marks=HARD_QUESTION_MARKS, hard_tokens=HARD_QUESTION_TOKENS):
+        self.model = model
+        self.hard_model = hard_model if hard_model != model else None
+        self.adaptive = adaptive
+        self.hard_marks = hard_marks
+        self.hard_tokens = hard_tokens
+        self.scale = 1.0
+        for pattern, factor in PROFILE_SCALES:
+            if pattern.search(system_prompt or ""):
+                self.scale = factor
+                break
+        self.essays = self.scale >= 2.0 # Every question is long-form
+
+    def classify(self, question):
+        """"short", "standard" or "long"."""
+        marks = [int(m) for m in MARKS_RE.findall(question)]
+        words = [int(w) for w in WORDS_RE.findall(question)]
+        if (self.essays or (marks and max(marks) >= self.hard_marks) or (words and max(words) >= 250)
+                or estimate_tokens(question) > self.hard_tokens or LONG_RE.search(question)):
+            return "long"
+        if (marks and max(marks) <= SHORT_QUESTION_MARKS) or (words and max(words) <= 100) or SHORT_RE.search(question):
+            return "short"
+        return "standard"
+
+    def max_tokens(self, name, question):
+        return self.sized_tokens(name, question) if self.adaptive else MAX_TOKENS
+
+    def sized_tokens(self, name, question):
+        """The answer budget of a question on route `name`, as adaptive sizing sets it."""
+        words = [int(w) for w in WORDS_RE.findall(question)]
+        if words:
+            # Room for the stated word limit plus headings and markdown
+            budget = max(words) * TOKENS_PER_WORD * 1.3 + 100
+        else:
+            budget = ROUTE_MAX_TOKENS[name]
+        return min(ESCALATE_MAX_TOKENS, int(math.ceil(budget * self.scale / 50) * 50))
+
+    def route(self, question):
+        name = self.classify(question)
+        model = self.hard_model if name == "long" and self.hard_model else self.model
+        return Route(name, model, self.max_tokens(name, question))
+
+    def escalate(self, model, max_tokens):
+        """(model, max_tokens) to ask again after an answer was cut off, or None if it cannot grow."""
+        if not self.adaptive: return None # Opt-in: every escalation is paid for again
+        bigger = min(ESCALATE_MAX_TOKENS, max_tokens * ESCALATE_FACTOR)
+        stronger = self.hard_model or model
+        if bigger <= max_tokens and stronger == model: return None
+        return stronger, max(bigger, max_tokens)
+
+    @property
+    def models(self):
+        return [m for m in (self.model, self.hard_model) if m]
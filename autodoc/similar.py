@@ -0,0 +1,329 @@
+"""
+Near-duplicate questions. Question banks often repeat a question with small
+wording changes, within one paper and across papers. Questions are embedded
+as unit vectors and compared by cosine similarity (a dot product):
+
+- Within a run, each question is compared with the earlier cluster leaders.
+  One at or above the threshold joins that cluster and is not sent to the
+  API; it gets the leader's answer or a cross-reference to it.
+- Across runs, the embeddings of answered questions are kept in an
+  EmbeddingIndex on disk next to their answer cache keys and questions, so a
+  near-duplicate in a later paper can reuse the cached answer.
+
+A close score is not enough on its own: the embedder also has to agree that
+the two questions ask the same thing (`agrees`). Questions that differ in a
+number ("Article 14" / "Article 21") never match, and for the hashing
+embedder neither do questions where each has a content word the other lacks
+("Governor" / "President", "Punjab" / "Kerala").
+
+NumPy is optional. With it the index is a memory-mapped float32 matrix
+searched with one matrix-vector product; without it the same search runs in
+pure Python, which is fine for a few hundred questions.
+"""
+import os
+import re
+import sys
+import json
+import math
+import array
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError: # Optional: pure-Python search
+    np = None
+
+from .config import EMBEDDING_DIM, EMBEDDING_MODEL, EMBEDDINGS_FILE, DEDUPE_THRESHOLD
+from .extract import NUMBERED_RE
+from .journal import file_lock
+
+# of: index (in this run) of the question whose answer is reused
+Duplicate = namedtuple("Duplicate", ["of", "similarity"])
+# key: answer cache key of the near-duplicate answered in an earlier paper
+Earlier = namedtuple("Earlier", ["key", "question", "similarity"])
+
+def normalize(vec):
+    norm = math.sqrt(sum(x * x for x in vec))
+    return [x / norm for x in vec] if norm else list(vec)
+
+# ================= EMBEDDERS =================
+TOKEN_RE = re.compile(r"\w+")
+# Function words, and the instruction words that vary between papers asking the same thing
+STOP_WORDS = frozenset("a an the of in on to and or for is are was were be been by with as at from its it "
+                       "this that these those which what how why do does your you "
+                       "discuss examine explain analyse analyze evaluate elaborate describe comment critically "
+                       "briefly detail detailed suitable example examples concept suggest give state write".split())
+STEM_CHARS = 5 # Crude stemming: 'urbanisation'/'urbanization' and 'India'/'Indian' share a prefix
+
+def numbers(text):
+    """The numerals of a question, without its own numbering ("Q3.", "(4)")."""
+    m = NUMBERED_RE.match(text)
+    if m: text = text[m.end():]
+    return {w for w in TOKEN_RE.findall(text) if w.isdigit()}
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(feature, dim):
+    """(slot, sign) of a hashed feature; blake2b so vectors are identical across processes and machines."""
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, 1.0 if h >> 63 else -1.0
+
+class HashEmbedder:
+    """
+    Deterministic offline embedding: signed feature hashing of word stems
+    (numerals included) and (weighted lower) stem pairs, ignoring question
+    numbering and instruction words. Catches rewording, reordering and
+    spelling variants, not paraphrases with different vocabulary (use
+    OpenAIEmbedder for those).
+
+    One swapped word barely moves the vector, so `agrees` also requires the
+    numerals to be equal and the content words of one question to be among
+    the other's: words may be added, not replaced.
+    """
+    name = "local"
+    reuse_earlier = False # Cross-paper reuse is opt-in; see Engine
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    @staticmethod
+    def stems(text):
+        m = NUMBERED_RE.match(text)
+        if m: text = text[m.end():]
+        return [w[:STEM_CHARS] for w in TOKEN_RE.findall(text.lower())
+                if (len(w) > 1 or w.isdigit()) and w not in STOP_WORDS]
+
+    @classmethod
+    def features(cls, text):
+        stems = cls.stems(text)
+        yield from ((w, 1.0) for w in stems)
+        yield from ((f"{a} {b}", 0.3) for a, b in zip(stems, stems[1:]))
+
+    def embed_one(self, text):
+        vec = [0.0] * self.dim
+        for feature, weight in self.features(text):
+            slot, sign = _bucket(feature, self.dim)
+            vec[slot] += sign * weight
+        return normalize(vec)
+
+    def embed(self, texts):
+        return [self.embed_one(t) for t in texts]
+
+    def agrees(self, a, b):
+        """Whether questions `a` and `b`, already close, ask the same thing."""
+        if numbers(a) != numbers(b): return False
+        sa, sb = set(self.stems(a)), set(self.stems(b))
+        return sa <= sb or sb <= sa
+
+class OpenAIEmbedder:
+    """
+    Embeddings from the API: paraphrase-aware, one request per EMBED_BATCH
+    questions, sent through OpenAIClient so they are rate limited, retried
+    and stopped like answers.
+    """
+    EMBED_BATCH = 256
+    reuse_earlier = True
+
+    def __init__(self, client, model=EMBEDDING_MODEL):
+        self.client = client # client.OpenAIClient
+        self.name = model
+
+    def agrees(self, a, b):
+        return numbers(a) == numbers(b) # Paraphrases score close; different articles or years can too
+
+    def embed(self, texts):
+        texts, out = list(texts), []
+        for start in range(0, len(texts), self.EMBED_BATCH):
+            out += [normalize(v) for v in self.client.embed(texts[start:start + self.EMBED_BATCH], self.name)]
+        return out
+
+# ================= INDEX =================
+class EmbeddingIndex:
+    """
+    Unit vectors, each with a JSON label and an optional group, searchable by
+    cosine similarity. Safe to share across threads.
+
+    With `path`, rows persist in `path`.f32 (a raw little-endian float32
+    matrix, memory-mapped when NumPy is available) and `path`.jsonl (a
+    {"dim": n} header, then one {"row": k, "group": ..., "label": ...} line
+    per row). Appends take the journal's file lock, so two processes can
+    share an index; a row torn by a crash is cut off on the next append.
+    """
+    def __init__(self, path=None, dim=None):
+        self.path = path
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.labels = [] # per row; None for a row whose label line never made it
+        self.groups = [] # per row
+        self.disk = None # NumPy: rows loaded from disk (memmap)
+        self.buf = None  # NumPy: rows added since, with spare capacity
+        self.rows = []   # Pure Python: all rows
+        self.masks = {}  # NumPy: group -> bool array of the rows that can match it
+        if path: self.load()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def load(self):
+        meta = f"{self.path}.jsonl"
+        if not os.path.exists(meta): return
+        labels = {}
+        with open(meta, encoding="utf-8") as f:
+            for line in f:
+                try: entry = json.loads(line)
+                except ValueError: continue # Torn last line
+                if "dim" in entry: self.dim = self.dim or entry["dim"]
+                elif "row" in entry: labels[entry["row"]] = (entry.get("label"), entry.get("group"))
+        if not self.dim or not os.path.exists(f"{self.path}.f32"): return
+        n = os.path.getsize(f"{self.path}.f32") // (4 * self.dim)
+        if not n: return
+        for row in range(n):
+            label, group = labels.get(row, (None, None))
+            self.labels.append(label)
+            self.groups.append(group)
+        if np is not None:
+            self.disk = np.memmap(f"{self.path}.f32", dtype="<f4", mode="r", shape=(n, self.dim))
+        else:
+            data = array.array("f")
+            with open(f"{self.path}.f32", "rb") as f: data.frombytes(f.read(n * 4 * self.dim))
+            if sys.byteorder == "big": data.byteswap()
+            self.rows = [data[r * self.dim:(r + 1) * self.dim] for r in range(n)]
+
+    def add(self, vec, label, group=None):
+        with self.lock:
+            if self.dim is None: self.dim = len(vec)
+            if self.path: self.append_to_disk(vec, label, group)
+            if np is not None:
+                used = len(self.labels) - (len(self.disk) if self.disk is not None else 0)
+                if self.buf is None or used == len(self.buf):
+                    grown = np.empty((max(64, used * 2), self.dim), dtype=np.float32)
+                    if self.buf is not None: grown[:used] = self.buf
+                    self.buf = grown
+                self.buf[used] = vec
+                for g, mask in self.masks.items():
+                    self.masks[g] = np.append(mask, g == group and label is not None)
+            else:
+                self.rows.append(array.array("f", vec))
+            self.labels.append(label)
+            self.groups.append(group)
+
+    def append_to_disk(self, vec, label, group):
+        row_bytes = 4 * self.dim
+        data = array.array("f", vec)
+        if sys.byteorder == "big": data.byteswap()
+        try:
+            with open(f"{self.path}.jsonl", "a", encoding="utf-8") as meta, file_lock(meta):
+                if meta.tell() == 0: meta.write(json.dumps({"dim": self.dim}) + "\n")
+                with open(f"{self.path}.f32", "ab") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    if size % row_bytes: f.truncate(size - size % row_bytes)
+                    row = size // row_bytes
+                    f.write(data.tobytes())
+                meta.write(json.dumps({"row": row, "group": group, "label": label}) + "\n")
+        except OSError:
+            logging.warning(f"Could not append to {self.path}", exc_info=True)
+
+    def best(self, vec, group=None):
+        """(label, similarity) of the closest row in `group`, or (None, 0.0) if there is none."""
+        with self.lock:
+            if not self.labels: return None, 0.0
+            if np is None:
+                candidates = [r for r, g in enumerate(self.groups) if g == group and self.labels[r] is not None]
+                if not candidates: return None, 0.0
+                nonzero = [(j, x) for j, x in enumerate(vec) if x] # Hashed embeddings are sparse
+                scores = {r: sum(self.rows[r][j] * x for j, x in nonzero) for r in candidates}
+                row = max(scores, key=scores.get)
+                return self.labels[row], scores[row]
+
+            v = np.asarray(vec, dtype=np.float32)
+            parts = []
+            if self.disk is not None: parts.append(self.disk @ v)
+            used = len(self.labels) - (len(self.disk) if self.disk is not None else 0)
+            if used: parts.append(self.buf[:used] @ v)
+            sims = np.concatenate(parts) if len(parts) > 1 else parts[0]
+            mask = self.masks.get(group)
+            if mask is None:
+                mask = self.masks[group] = np.array([g == group and l is not None for g, l in zip(self.groups, self.labels)], dtype=bool)
+            if not mask.any(): return None, 0.0
+            row = int(np.argmax(np.where(mask, sims, -2.0)))
+            return self.labels[row], float(sims[row])
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(embedder_name):
+    """The on-disk index of answered questions for one embedder, shared by every engine in the process."""
+    path = f"{EMBEDDINGS_FILE}_{re.sub(r'[^A-Za-z0-9_.-]', '_', embedder_name)}"
+    with _indexes_lock:
+        if path not in _indexes: _indexes[path] = EmbeddingIndex(path)
+        return _indexes[path]
+
+# ================= PER-RUN MATCHING =================
+class SimilarQuestions:
+    """
+    Near-duplicate lookup for one run. `match(i, questions)` clusters
+    question i with an earlier leader (returns a Duplicate) or makes it a
+    leader (returns None); questions must be matched in index order.
+    `earlier_answer(i, questions)` finds a near-duplicate answered in an
+    earlier run in the `shared` index (returns an Earlier); `remember(i, key,
+    question)` adds a newly answered question to it. `group` scopes shared
+    entries, e.g. to a profile, model and temperature.
+    """
+    def __init__(self, embedder, threshold=DEDUPE_THRESHOLD, shared=None, group=None):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.shared = shared
+        self.group = group
+        self.leaders = EmbeddingIndex()
+        self.vectors = []
+        self.duplicates = 0
+        self.reused = 0
+        self.unchecked = 0 # Questions the embedder failed on
+
+    def prepare(self, questions, n):
+        """
+        Embeds questions[:n] that are not embedded yet, in one call. If the
+        embedder fails (or the run is stopped), those questions get no vector
+        and are answered without near-duplicate detection.
+        """
+        if n <= len(self.vectors): return
+        texts = [questions[i] for i in range(len(self.vectors), n)]
+        try:
+            self.vectors += self.embedder.embed(texts)
+        except Exception as e: # Includes Cancelled; the engine sees the stop itself
+            logging.warning(f"Could not embed {len(texts)} question(s); they are not checked for near-duplicates: {e}")
+            self.vectors += [None] * len(texts)
+            self.unchecked += len(texts)
+
+    def match(self, i, questions):
+        self.prepare(questions, max(i + 1, len(questions))) # Everything loaded so far
+        vec = self.vectors[i]
+        if vec is None: return None
+        leader, sim = self.leaders.best(vec)
+        if leader is not None and sim >= self.threshold and self.embedder.agrees(questions[leader], questions[i]):
+            self.duplicates += 1
+            return Duplicate(leader, sim)
+        self.leaders.add(vec, i)
+        return None
+
+    def earlier_answer(self, i, questions):
+        if self.shared is None or self.vectors[i] is None: return None
+        label, sim = self.shared.best(self.vectors[i], self.group)
+        # Rows written before labels carried the question cannot be checked, so they are not reused
+        if not isinstance(label, dict) or sim < self.threshold: return None
+        if not self.embedder.agrees(label["question"], questions[i]): return None
+        self.reused += 1
+        return Earlier(label["key"], label["question"], sim)
+
+    def remember(self, i, key, question):
+        if self.shared is not None and self.vectors[i] is not None: self.shared.add(self.vectors[i], {"key": key, "question": question}, self.group)
+
+    def summary(self):
+        parts = []
+        if self.duplicates: parts.append(f"{self.duplicates} near-duplicate(s) answered once")
+        if self.reused: parts.append(f"{self.reused} reused from earlier papers")
+        if self.unchecked: parts.append(f"{self.unchecked} not checked (embedding failed)")
+        return ", ".join(parts)
@@ -0,0 +1,66 @@
+import os
+import re
+import json
+import hashlib
+import logging
+
+from .backends import model_pricing
+
+OUTPUT_SUFFIX = "_Answers"
+VOLUME_RE = re.compile(r"_Vol(\d+)$") # On the stem of an output volume (see volumes.py)
+
+def file_digest(path, chunk_size=1 << 20):
+    """md5 of the file's content, so renamed or same-named inputs resolve correctly."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): h.update(chunk)
+    return h.hexdigest()
+
+def get_progress_filename(input_path):
+    return f"progress_{file_digest(input_path)}.jsonl"
+
+def get_legacy_progress_filename(input_path):
+    # Before the journal: keyed by basename, {"last_index": i}
+    file_hash = hashlib.md5(os.path.basename(input_path).encode('utf-8')).hexdigest()
+    return f"progress_{file_hash}.json"
+
+def default_output_path(input_path, output_dir=None):
+    d, f = os.path.split(input_path)
+    return os.path.join(output_dir or d, f"{os.path.splitext(f)[0]}{OUTPUT_SUFFIX}.docx")
+
+def is_output(path):
+    """Whether `path` is one of our outputs: an answers document (or its index or merged volumes) or a volume."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.endswith(OUTPUT_SUFFIX) or bool(VOLUME_RE.search(stem))
+
+def get_batch_filename(input_path):
+    # By content, like the progress journal: same-named papers in different folders run side by side
+    return f"batch_{file_digest(input_path)}.json"
+
+def prompt_digest(system_prompt):
+    return hashlib.md5(system_prompt.encode('utf-8')).hexdigest()
+
+def calculate_cost(model, prompt_tokens, completion_tokens, discount=1.0):
+    pi, po = model_pricing(model)
+    return ((prompt_tokens/1e6 * pi) + (completion_tokens/1e6 * po)) * discount
+
+def load_json(file, default):
+    if os.path.exists(file):
+        try:
+            with open(file, "r") as f: return json.load(f)
+        except: pass
+    return default
+
+def save_json(file, data):
+    """Writes `data` atomically (temp file, fsync, rename); returns False on failure."""
+    tmp = f"{file}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, file)
+        return True
+    except (OSError, TypeError, ValueError):
+        logging.warning(f"Could not save {file}", exc_info=True)
+        return False
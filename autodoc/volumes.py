@@ -0,0 +1,130 @@
+"""
+Output volumes. With a volume size, a run writes its answers to
+<output>_Vol01.docx, <output>_Vol02.docx, ... (VOLUME_SIZE questions each)
+instead of one growing document, so memory and checkpoint time stay flat
+however large the bank is. Once every question is done, `combine_volumes` can build
+<output> itself from the volumes:
+
+- "index": a table of contents with a link to each volume file and the
+  questions it holds (read back with the streaming parser, one volume at a time).
+- "merged": one document with every answer. Each volume's body XML is copied
+  into the first volume's package in turn, so only one volume is parsed at a
+  time; answers have no images or links, so the body is all there is to copy.
+"""
+import os
+import re
+import glob
+import zipfile
+from urllib.parse import quote
+
+from lxml import etree
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from .extract import W, iter_blocks, main_part
+from .utils import VOLUME_RE
+QUESTION_RE = re.compile(r"^Q(\d+): (.*)", re.DOTALL)
+LINK_COLOR = "0563C1"
+
+def volume_path(out_path, number):
+    stem, ext = os.path.splitext(out_path)
+    return f"{stem}_Vol{number:02d}{ext}"
+
+def list_volumes(out_path):
+    """Paths of the volumes of `out_path` on disk, in volume order."""
+    stem, ext = os.path.splitext(out_path)
+    found = []
+    for path in glob.glob(f"{glob.escape(stem)}_Vol*{ext}"):
+        m = VOLUME_RE.search(os.path.splitext(path)[0])
+        if m: found.append((int(m.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+def volume_questions(path):
+    """(question number, question) for each answer in a volume, in order."""
+    for block in iter_blocks(path):
+        m = QUESTION_RE.match(block.text)
+        if m and (block.style or "").startswith("Heading") and not block.in_table: yield int(m.group(1)), m.group(2)
+
+def add_hyperlink(paragraph, target, text):
+    """Appends a link to `target` (a URL or a path relative to the document) to the paragraph."""
+    r_id = paragraph.part.relate_to(target, RT.HYPERLINK, is_external=True)
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), r_id)
+    run = OxmlElement("w:r")
+    rpr = OxmlElement("w:rPr")
+    color = OxmlElement("w:color")
+    color.set(qn("w:val"), LINK_COLOR)
+    underline = OxmlElement("w:u")
+    underline.set(qn("w:val"), "single")
+    rpr.append(color)
+    rpr.append(underline)
+    run.append(rpr)
+    t = OxmlElement("w:t")
+    t.text = text
+    run.append(t)
+    link.append(run)
+    paragraph._p.append(link)
+    return link
+
+def write_index(volumes, out_path):
+    """Writes a table of contents for `volumes` to `out_path`: a linked heading per volume, then its questions."""
+    contents = [(path, list(volume_questions(path))) for path in volumes]
+    doc = Document()
+    doc.add_heading(os.path.splitext(os.path.basename(out_path))[0], level=0)
+    total = sum(len(questions) for _, questions in contents)
+    doc.add_paragraph(f"{total} answers in {len(volumes)} volumes.")
+    for number, (path, questions) in enumerate(contents, 1):
+        span = f"Q{questions[0][0]}–Q{questions[-1][0]}, " if questions else ""
+        heading = doc.add_heading(level=1)
+        add_hyperlink(heading, quote(os.path.basename(path)), f"Volume {number}")
+        heading.add_run(f"  ({span}{len(questions)} answers)")
+        for q, text in questions:
+            doc.add_paragraph(f"Q{q}: {text[:150]}{'…' if len(text) > 150 else ''}")
+    tmp_path = f"{out_path}.tmp"
+    doc.save(tmp_path)
+    os.replace(tmp_path, out_path)
+    return total
+
+def body_content(xml):
+    """The serialized block elements of a document.xml body, without its final w:sectPr."""
+    body = etree.fromstring(xml).find(W + "body")
+    sect_pr = body.find(W + "sectPr")
+    if sect_pr is not None: body.remove(sect_pr)
+    if not len(body): return b""
+    # Namespaces are declared on the serialized w:body; every volume shares the first one's root declarations
+    data = etree.tostring(body, encoding="UTF-8")
+    return data[data.index(b">", data.index(b"<w:body")) + 1:data.rindex(b"</w:body>")]
+
+def merge_volumes(volumes, out_path):
+    """Writes every answer of `volumes` to `out_path` as one document; returns the number of volumes merged."""
+    with zipfile.ZipFile(volumes[0]) as first:
+        name = main_part(first)
+        root = etree.fromstring(first.read(name))
+        body = root.find(W + "body")
+        sect_pr = body.find(W + "sectPr")
+        for child in list(body): body.remove(child)
+        body.append(etree.Comment("answers"))
+        if sect_pr is not None: body.append(sect_pr)
+        head, tail = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).split(b"<!--answers-->")
+
+        tmp_path = f"{out_path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as out:
+            for item in first.infolist():
+                if item.filename != name: out.writestr(item, first.read(item.filename))
+            with out.open(name, "w") as f:
+                f.write(head)
+                for path in volumes:
+                    with zipfile.ZipFile(path) as zf: f.write(body_content(zf.read(main_part(zf))))
+                f.write(tail)
+    os.replace(tmp_path, out_path)
+    return len(volumes)
+
+def combine_volumes(out_path, mode="index"):
+    """Builds `out_path` from its volumes ("index" or "merged"); returns the volume count (0: no volumes)."""
+    volumes = list_volumes(out_path)
+    if not volumes: return 0
+    if mode == "merged": merge_volumes(volumes, out_path)
+    else: write_index(volumes, out_path)
+    return len(volumes)
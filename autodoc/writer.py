@@ -0,0 +1,117 @@
+import gc
+import os
+import time
+import hashlib
+import logging
+from datetime import datetime
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+from .config import SAVE_EVERY_N, SAVE_INTERVAL_SECS
+from .render import parse_markdown_to_docx, add_paragraph, get_context
+from .volumes import volume_path
+
+class DocxWriter:
+    """
+    Appends answers to the output document and checkpoints it in batches.
+    Answers are only recorded in the journal after a successful save, so a
+    resume never skips an answer that is not on disk.
+
+    With `volume_size`, question i goes to volume i // volume_size + 1
+    (see volumes.py) instead of `out_path`. Only one volume is held in
+    memory: moving on to the next one saves the last and lets it go.
+
+    Answers are appended, so a question that failed in an earlier run and
+    is answered on resume comes after answers to later questions. Such
+    answers go under a "Retried questions" heading at the end of the
+    document, each with its Q number; the questions after them follow
+    under "Remaining questions".
+    """
+    def __init__(self, out_path, journal, page_break=False, volume_size=0):
+        self.out_path = out_path
+        self.journal = journal
+        self.page_break = page_break
+        self.volume_size = volume_size
+        self.path = None # document being written, opened with its first answer
+        self.doc = None
+        self.last_done = -1 # highest question already in the document when it was opened
+        self.retried_section = None # None, "retried", then "remaining"
+        self.held = [] # (path, doc, pending) of full volumes whose last save failed
+        self.pending = [] # journal entries for answers not saved yet
+        self.unsaved = 0
+        self.last_save = time.time()
+        self.last_render_secs = 0.0
+        self.save_times = []
+
+    def path_for(self, index):
+        if not self.volume_size: return self.out_path
+        return volume_path(self.out_path, index // self.volume_size + 1)
+
+    def open(self, path):
+        if path == self.path: return
+        if self.doc is not None:
+            self.checkpoint()
+            if self.unsaved: self.held.append((self.path, self.doc, self.pending)) # Retried by the next checkpoint
+            # Documents are reference cycles, and the XML they hold lives outside Python's heap,
+            # so the collector would rarely notice them: release the volume now
+            self.doc = None
+            gc.collect()
+        self.path = path
+        self.doc = Document(path) if os.path.exists(path) else Document()
+        self.last_done = max((i for i in self.journal.done if self.path_for(i) == path), default=-1)
+        self.retried_section = None
+        self.pending = []
+        self.unsaved = 0
+
+    def add_answer(self, index, question, answer, prompt_tokens=0, completion_tokens=0, cost=0.0, cached=False):
+        """Returns False if a due checkpoint could not be written."""
+        self.open(self.path_for(index))
+        started = time.perf_counter()
+        headings = get_context(self.doc.part).headings
+        if index < self.last_done and not self.retried_section:
+            add_paragraph(self.doc, f"Retried questions ({datetime.now():%d %b %Y %H:%M})", headings[0])
+            add_paragraph(self.doc, "These questions failed in an earlier run and were answered on resume, "
+                                    "so they appear here instead of in question order.")
+            self.retried_section = "retried"
+        elif index > self.last_done and self.retried_section == "retried":
+            add_paragraph(self.doc, "Remaining questions", headings[0])
+            self.retried_section = "remaining"
+        p = add_paragraph(self.doc, style_id=headings[1])
+        p.add_run(f"Q{index+1}: {question}").bold = True
+
+        parse_markdown_to_docx(self.doc, answer)
+
+        add_paragraph(self.doc, "_"*30)
+        if self.page_break: add_paragraph(self.doc).add_run().add_break(WD_BREAK.PAGE)
+        self.last_render_secs = time.perf_counter() - started
+
+        self.pending.append({"index": index, "answer_sha": hashlib.sha256(answer.encode("utf-8")).hexdigest(),
+                             "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                             "cost": cost, "cached": cached})
+        self.unsaved += 1
+        if self.unsaved >= SAVE_EVERY_N or time.time() - self.last_save >= SAVE_INTERVAL_SECS:
+            return self.checkpoint()
+        return True
+
+    def save(self, path, doc, pending):
+        # Save next to the target and swap it in, so a crash mid-save can't corrupt the output
+        tmp_path = f"{path}.tmp"
+        try:
+            started = time.perf_counter()
+            doc.save(tmp_path)
+            os.replace(tmp_path, path)
+            self.save_times.append(time.perf_counter() - started)
+        except Exception:
+            logging.warning(f"Checkpoint of {path} failed", exc_info=True)
+            return False
+        return self.journal.append(pending) # Retried with the next checkpoint
+
+    def checkpoint(self):
+        self.held = [volume for volume in self.held if not self.save(*volume)]
+        if not self.unsaved: return not self.held
+        if not self.save(self.path, self.doc, self.pending): return False
+        self.pending = []
+        self.unsaved = 0
+        self.last_save = time.time()
+        return not self.held
@@ -0,0 +1,153 @@
+"""
+Pipeline load test against the local mock OpenAI server (mock_openai.py): for
+each bank size and concurrency level, a synthetic question paper goes through
+the whole pipeline (streaming extraction, generation over HTTP, markdown ->
+DOCX rendering, checkpoints) in a fresh process and working directory.
+Reports throughput, tail latency and peak memory per run; no API key, no cost.
+
+Exits with status 1 if a run leaves questions unanswered or misses a budget
+given on the command line, so it can guard regressions in CI. The mock is
+seeded and reset before each run, so every run of a bank (at any
+concurrency) and every invocation with the same arguments replays the same
+latencies and faults.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --banks 200,2000 --concurrency 1,8,32 --latency lognormal:0.3:0.5 \\
+        --rate-429 0.05 --rate-drop 0.01 --stream --min-answers-per-min 600 --max-p95-ms 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_openai import MockOpenAI
+
+WORDS = ("federalism governance constitution policy reform economy growth judiciary parliament "
+         "ethics integrity accountability welfare climate agriculture monsoon infrastructure").split()
+STEMS = ["Discuss", "Critically analyse", "Examine", "Explain", "Evaluate", "What is meant by", "Comment on"]
+
+def write_bank(path, count, seed=1):
+    """A question paper of `count` numbered questions with a few headings and instructions."""
+    from docx import Document
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_heading("Synthetic Question Paper", level=1)
+    doc.add_paragraph("Time allowed: 3 hours. Answer all questions.")
+    for i in range(count):
+        if i % 50 == 0: doc.add_heading(f"Section {i // 50 + 1}", level=2)
+        topic = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        marks = rng.choice([5, 10, 10, 15, 20])
+        doc.add_paragraph(f"{i + 1}. {rng.choice(STEMS)} the {topic} in the Indian context. ({marks} marks)")
+    doc.save(path)
+
+def run_child(options):
+    """Runs one bank through Engine.run in this process; prints the run summary and peak memory as JSON."""
+    with open("backends.json", "w") as f:
+        json.dump({"mock": {"base_url": options["base_url"], "pricing": {"test": [0.15, 0.60]},
+                            "default_limits": options["limits"]}}, f)
+    from autodoc import Engine, QuestionLoader
+
+    engine = Engine("", "You are a UPSC General Studies expert.", model="mock:test", concurrency=options["concurrency"],
+                    use_cache=False, stream=options["stream"], volume_size=options["volume_size"])
+    started = time.perf_counter()
+    questions = QuestionLoader(options["bank"]).start()
+    ok = engine.run(questions, options["bank"], "answers.docx")
+    summary = engine.metrics.summary()
+    summary.update(ok=ok, wall_secs=time.perf_counter() - started, total=len(questions), peak_mb=peak_memory_mb())
+    print(json.dumps(summary))
+
+def peak_memory_mb():
+    try: import resource
+    except ImportError: return None # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def ms(stats, key):
+    value = stats.get(key)
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the pipeline against a local mock OpenAI server.")
+    parser.add_argument("--banks", default="100,500", help="Comma-separated question counts")
+    parser.add_argument("--concurrency", default="4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--latency", default="lognormal:0.05:0.5", help="Mock time to first token (see mock_openai.py)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Mock generation speed (0: instant)")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-drop", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=0.5, help="Seconds a dropped request hangs before the connection closes")
+    parser.add_argument("--stream", action="store_true", help="Stream responses")
+    parser.add_argument("--volume-size", type=int, default=0, help="Write output volumes of this many questions")
+    parser.add_argument("--limits", default="100000,100000000", help="Client-side requests/min,tokens/min for the mock model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-answers-per-min", type=float, help="Fail if any run is slower")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any run's p95 request latency is higher")
+    parser.add_argument("--max-memory-mb", type=float, help="Fail if any run's peak memory is higher")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child: return run_child(json.loads(args.child))
+
+    server = MockOpenAI(latency=args.latency, tokens_per_sec=args.tokens_per_sec, rate_429=args.rate_429,
+                        rate_drop=args.rate_drop, stall=args.stall, seed=args.seed).start()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    print(f"mock {server.base_url} | latency {args.latency} | 429 {args.rate_429:.0%} | dropped {args.rate_drop:.0%}"
+          f"{' | streaming' if args.stream else ''}")
+    print(f"{'bank':>6} {'conc':>5} {'wall s':>8} {'ans/min':>9} {'tok/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'retries':>7} {'errors':>6} {'save p95':>8} {'peak MB':>8} {'429':>5} {'drop':>5}")
+
+    results, failures, totals = [], [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in [int(n) for n in args.banks.split(",")]:
+            bank = os.path.join(tmp, f"bank_{count}.docx")
+            write_bank(bank, count, args.seed + 1)
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                cwd = tempfile.mkdtemp(dir=tmp)
+                server.reset()
+                options = {"base_url": server.base_url, "bank": bank, "concurrency": concurrency, "stream": args.stream,
+                           "volume_size": args.volume_size, "limits": [int(v) for v in args.limits.split(",")]}
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(options)],
+                                      cwd=cwd, env=env, capture_output=True, text=True)
+                counts = server.reset()
+                lines = proc.stdout.strip().splitlines()
+                for k, v in counts.items(): totals[k] = totals.get(k, 0) + v
+                if proc.returncode or not lines:
+                    failures.append(f"bank {count} x{concurrency}: run crashed\n{proc.stderr[-2000:]}")
+                    continue
+                s = json.loads(lines[-1])
+                s.update(bank=count, mock=counts)
+                results.append(s)
+                latency = s["latency"]
+                print(f"{count:>6} {concurrency:>5} {s['wall_secs']:>8.1f} {s['answers_per_min']:>9.0f} {s['tokens_per_sec']:>7.0f} "
+                      f"{ms(latency, 'p50'):>7} {ms(latency, 'p95'):>7} {ms(latency, 'p99'):>7} {s['retries']:>7} {s['errors']:>6} "
+                      f"{ms(s['save'], 'p95'):>8} {s['peak_mb'] or 0:>8.0f} {counts['429']:>5} {counts['dropped']:>5}", flush=True)
+
+                label = f"bank {count} x{concurrency}"
+                if not s["ok"] or s["questions"] < s["total"] or s["errors"]:
+                    failures.append(f"{label}: {s['total'] - s['questions'] + s['errors']} question(s) not answered")
+                if args.min_answers_per_min and s["answers_per_min"] < args.min_answers_per_min:
+                    failures.append(f"{label}: {s['answers_per_min']:.0f} answers/min is under {args.min_answers_per_min:.0f}")
+                p95 = latency.get("p95")
+                if args.max_p95_ms and p95 is not None and p95 * 1000 > args.max_p95_ms:
+                    failures.append(f"{label}: p95 latency {p95 * 1000:.0f} ms is over {args.max_p95_ms:.0f} ms")
+                if args.max_memory_mb and s["peak_mb"] and s["peak_mb"] > args.max_memory_mb:
+                    failures.append(f"{label}: peak memory {s['peak_mb']:.0f} MB is over {args.max_memory_mb:.0f} MB")
+    server.shutdown()
+
+    if totals:
+        print(f"mock requests: {totals['requests']} ({totals['ok']} ok, {totals['429']} 429, {totals['dropped']} dropped)")
+    if args.json:
+        with open(args.json, "w") as f: json.dump({"args": vars(args), "mock": totals, "runs": results}, f, indent=2)
+    for failure in failures: print(f"FAIL: {failure}")
+    if failures: return 1
+    print("OK: every question answered" + (" within budget" if args.min_answers_per_min or args.max_p95_ms or args.max_memory_mb else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
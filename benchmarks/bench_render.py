@@ -0,0 +1,93 @@
+"""
+Render benchmark: renders thousands of synthetic answers into one document
+(the way DocxWriter does) and reports time per answer. Exits with status 1
+if the p95 render time goes over the budget, so it can guard regressions.
+
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --answers 5000 --budget-ms 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from autodoc.render import parse_markdown_to_docx
+from autodoc.metrics import percentile
+
+WORDS = ("federalism governance constitution policy reform economy growth judiciary parliament "
+         "ethics integrity accountability welfare climate agriculture monsoon infrastructure").split()
+
+def sentence(rng, words=12):
+    out = []
+    for _ in range(words):
+        w = rng.choice(WORDS)
+        r = rng.random()
+        if r < 0.08: w = f"**{w}**"
+        elif r < 0.12: w = f"*{w}*"
+        elif r < 0.14: w = f"`{w}()`"
+        out.append(w)
+    return " ".join(out).capitalize() + "."
+
+def synthetic_answer(rng):
+    """A typical model answer: headings, nested lists, a table, sometimes code."""
+    parts = [f"## {sentence(rng, 4)}", sentence(rng, 30), sentence(rng, 25), "", f"### {sentence(rng, 3)}"]
+    for _ in range(rng.randint(3, 6)):
+        parts.append(f"- {sentence(rng)}")
+        if rng.random() < 0.4: parts.append(f"  - {sentence(rng, 8)}")
+    parts += ["", f"### {sentence(rng, 3)}"]
+    parts += [f"{i}. {sentence(rng)}" for i in range(1, rng.randint(3, 6))]
+    if rng.random() < 0.5:
+        parts += ["", "| Aspect | Details |", "|---|---|"]
+        parts += [f"| {rng.choice(WORDS)} | {sentence(rng, 6)} |" for _ in range(rng.randint(2, 5))]
+    if rng.random() < 0.2:
+        parts += ["```python", "def score(x):", "    return x * 2", "```"]
+    parts += ["", f"**Conclusion:** {sentence(rng, 20)}"]
+    return "\n".join(parts)
+
+def check_formatting():
+    """Problems with how **bold** and *italic* spans come out, or an empty list."""
+    doc = Document()
+    parse_markdown_to_docx(doc, "Plain **strong** and *slanted* text.")
+    runs = {run.text: run for run in doc.paragraphs[-1].runs}
+    problems = []
+    if not (runs.get("strong") and runs["strong"].bold): problems.append("a **bold** span is not bold")
+    if not (runs.get("slanted") and runs["slanted"].italic): problems.append("an *italic* span is not italic")
+    if runs.get("Plain ") and (runs["Plain "].bold or runs["Plain "].italic): problems.append("plain text is formatted")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark markdown -> DOCX rendering.")
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="Maximum allowed p95 render time per answer")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    answers = [synthetic_answer(rng) for _ in range(args.answers)]
+    doc = Document()
+    times = []
+    for answer in answers:
+        started = time.perf_counter()
+        parse_markdown_to_docx(doc, answer)
+        times.append(time.perf_counter() - started)
+
+    problems = check_formatting()
+    ms = [t * 1000 for t in times]
+    p95 = percentile(ms, 95)
+    print(f"{len(answers)} answers, {sum(len(a) for a in answers) / len(answers):.0f} chars avg")
+    print(f"total {sum(times):.2f}s | mean {sum(ms) / len(ms):.2f} ms | p50 {percentile(ms, 50):.2f} ms | "
+          f"p95 {p95:.2f} ms | p99 {percentile(ms, 99):.2f} ms | max {max(ms):.2f} ms")
+    for problem in problems: print(f"FAIL: {problem}")
+    if p95 > args.budget_ms:
+        print(f"FAIL: p95 {p95:.2f} ms is over the {args.budget_ms:.0f} ms budget")
+    if problems or p95 > args.budget_ms: return 1
+    print(f"OK: p95 within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Start-up benchmark: how long the GUI takes to show its first frame, and what
+importing it costs. Each sample is a fresh interpreter (a cold start, like
+launching the EXE) running in an empty working directory. Exits with status 1
+if the median is over budget, or if start-up imported a module that should
+only load on first use (openai, python-docx, numpy, dotenv).
+
+Time-to-first-frame needs a display; without one only import cost is measured.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --import-budget-ms 300 --frame-budget-ms 1500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autodoc.metrics import percentile
+
+# Must not be imported before the first frame
+DEFERRED = ("openai", "docx", "numpy", "dotenv")
+
+IMPORT_CHILD = """
+import sys, json, time
+started = time.perf_counter()
+import main
+print(json.dumps({"ms": (time.perf_counter() - started) * 1000,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED,)
+
+FRAME_CHILD = """
+import sys, json, time
+import tkinter as tk
+import main
+try:
+    root = main.ttk.Window(themename="cyborg")
+except tk.TclError as e:
+    print(json.dumps({"error": str(e)}))
+    sys.exit(0)
+main.AutoDocAI(root)
+loaded = [m for m in %r if m in sys.modules] # Settings are read on a thread once the frame is up
+root.update()
+print(json.dumps({"loaded": loaded}), flush=True)
+root.destroy()
+""" % (DEFERRED,)
+
+def run_child(code, cwd):
+    """(wall ms from spawn until the child printed, its JSON line)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=cwd, env=env, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    elapsed = (time.perf_counter() - started) * 1000
+    proc.communicate()
+    if not line: raise RuntimeError(f"child exited with status {proc.returncode}")
+    return elapsed, json.loads(line)
+
+def top_imports(cwd, count):
+    """The slowest modules main imports directly, as (cumulative us, name), from -X importtime."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=cwd, env=env,
+                         capture_output=True, text=True).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "site": rows = [] # Interpreter start-up, not ours
+        elif name.startswith("   ") and not name.startswith("     "): rows.append((int(cumulative), name.strip())) # Imported by main
+    return sorted(rows, reverse=True)[:count]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GUI cold start: import cost and time to first frame.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=400.0, help="Maximum allowed median time to import main.py")
+    parser.add_argument("--frame-budget-ms", type=float, default=2000.0, help="Maximum allowed median time from launch to first frame")
+    parser.add_argument("--top", type=int, default=8, help="Show the slowest top-level imports")
+    args = parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as cwd:
+        base = [run_child("print('{}')", cwd)[0] for _ in range(args.runs)]
+        samples = [run_child(IMPORT_CHILD, cwd)[1] for _ in range(args.runs)]
+        ms = [s["ms"] for s in samples]
+        loaded = sorted({m for s in samples for m in s["loaded"]})
+        print(f"interpreter start: p50 {percentile(base, 50):.0f} ms")
+        print(f"import main: p50 {percentile(ms, 50):.0f} ms | max {max(ms):.0f} ms")
+        for cumulative, name in top_imports(cwd, args.top):
+            print(f"  {cumulative / 1000:7.1f} ms  {name}")
+        if percentile(ms, 50) > args.import_budget_ms:
+            failures.append(f"import p50 {percentile(ms, 50):.0f} ms is over the {args.import_budget_ms:.0f} ms budget")
+        if loaded:
+            failures.append(f"imported at start-up: {', '.join(loaded)}")
+
+        frames = []
+        for _ in range(args.runs):
+            elapsed, result = run_child(FRAME_CHILD, cwd)
+            if "error" in result:
+                print(f"first frame: skipped (no display: {result['error']})")
+                break
+            frames.append(elapsed)
+            if result["loaded"]:
+                failures.append(f"imported before the first frame: {', '.join(result['loaded'])}")
+        if frames:
+            p50 = percentile(frames, 50)
+            print(f"first frame: p50 {p50:.0f} ms | max {max(frames):.0f} ms (from launch)")
+            if p50 > args.frame_budget_ms:
+                failures.append(f"first frame p50 {p50:.0f} ms is over the {args.frame_budget_ms:.0f} ms budget")
+
+    for failure in dict.fromkeys(failures): print(f"FAIL: {failure}")
+    if failures: return 1
+    print("OK: start-up within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
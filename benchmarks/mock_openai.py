@@ -0,0 +1,199 @@
+"""
+Local mock of the OpenAI chat completions endpoint, for load tests and
+offline runs. Answers come from FakeBackend (deterministic markdown, JSON
+mode for packed requests, cut off at max_tokens), sent either as one JSON
+response or as a stream of server-sent events, the way OpenAIClient asks.
+
+Latency and faults are drawn from a generator seeded with --seed, the request
+body and the how-many-th time that body was sent, so a run is replayed
+exactly (the same questions are slow, rate limited or dropped on the same
+attempt) whatever order concurrent requests arrive in. Call `reset()` between
+runs that share one server so each starts from the same draws.
+
+    python benchmarks/mock_openai.py --port 8900 --latency lognormal:0.3:0.5 --rate-429 0.05 --rate-drop 0.01
+
+then point a backend at it in backends.json and run with `-m mock:test`:
+
+    {"mock": {"base_url": "http://127.0.0.1:8900/v1", "pricing": {"test": [0.15, 0.6]}}}
+
+Latency specs (seconds to the first token): fixed:S, uniform:LO:HI,
+lognormal:MEDIAN:SIGMA, exp:MEAN. With --tokens-per-sec, the rest of the
+answer takes its length in tokens at that rate (streamed as it goes).
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autodoc.backends import FakeBackend, FakeStream
+
+def parse_latency(spec):
+    """A function rng -> seconds for a latency spec such as "lognormal:0.3:0.5"."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":")] if args else []
+    if kind == "fixed" and len(values) == 1: return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2: return lambda rng: rng.uniform(*values)
+    if kind == "lognormal" and len(values) == 2: return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp" and len(values) == 1: return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    raise ValueError(f"Unknown latency spec {spec!r} (fixed:S, uniform:LO:HI, lognormal:MEDIAN:SIGMA, exp:MEAN)")
+
+class MockOpenAI(ThreadingHTTPServer):
+    """
+    The server; `counts` tallies requests, "ok", "429" and "dropped". A 429
+    carries retry-after-ms; a dropped request is held for `stall` seconds and
+    then the connection is closed without a response, like a timeout.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency="fixed:0", tokens_per_sec=0.0, rate_429=0.0, rate_drop=0.0,
+                 retry_after=0.2, stall=1.0, seed=0):
+        super().__init__(address, MockHandler)
+        self.latency = parse_latency(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.rate_429 = rate_429
+        self.rate_drop = rate_drop
+        self.retry_after = retry_after
+        self.stall = stall
+        self.seed = seed
+        self.backend = FakeBackend("mock")
+        self.lock = threading.Lock()
+        self.attempts = {} # request body digest -> times seen
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "dropped": 0}
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)): return # The client went away
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reset(self, seed=None):
+        """Forgets the attempts seen so far and zeroes `counts`; returns the counts of the requests before."""
+        with self.lock:
+            before = self.counts
+            if seed is not None: self.seed = seed
+            self.attempts = {}
+            self.counts = {"requests": 0, "ok": 0, "429": 0, "dropped": 0}
+        return before
+
+    def start(self):
+        """Serves on a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def draw(self, body):
+        """(rng, outcome) for this request: "ok", "429" or "dropped"."""
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        with self.lock:
+            attempt = self.attempts[digest] = self.attempts.get(digest, 0) + 1
+            self.counts["requests"] += 1
+        rng = random.Random(f"{self.seed}|{digest}|{attempt}")
+        roll = rng.random()
+        outcome = "429" if roll < self.rate_429 else "dropped" if roll < self.rate_429 + self.rate_drop else "ok"
+        with self.lock: self.counts[outcome] += 1
+        return rng, outcome
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so the client's connection pool is exercised
+    disable_nagle_algorithm = True # Headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, payload):
+        data = (f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+        try: request = json.loads(body)
+        except ValueError:
+            return self.send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+
+        rng, outcome = server.draw(body)
+        if outcome == "429":
+            return self.send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                                  {"retry-after-ms": str(int(server.retry_after * 1000))})
+        if outcome == "dropped":
+            time.sleep(server.stall)
+            self.close_connection = True
+            return
+
+        _, response = server.backend.create(request["model"], request["messages"], request.get("temperature", 1.0),
+                                            request.get("max_tokens"), response_format=request.get("response_format"))
+        content, finish_reason = response.choices[0].message.content, response.choices[0].finish_reason
+        usage = vars(response.usage)
+        time.sleep(server.latency(rng))
+        per_token = 1 / server.tokens_per_sec if server.tokens_per_sec else 0.0
+        base = {"id": f"chatcmpl-mock{rng.getrandbits(48):x}", "created": int(time.time()), "model": request["model"]}
+
+        if not request.get("stream"):
+            time.sleep(per_token * usage["completion_tokens"])
+            return self.send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk = {**base, "object": "chat.completion.chunk"}
+        try:
+            step = FakeStream.CHUNK_CHARS
+            for start in range(0, len(content), step):
+                piece = content[start:start + step]
+                self.send_chunk({**chunk, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                if per_token: time.sleep(per_token * len(piece) / 4)
+            self.send_chunk({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self.send_chunk({**chunk, "choices": [], "usage": usage})
+            self.send_chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True # The client stopped reading (STOP)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="lognormal:0.3:0.5", help="Time to the first token (fixed:S, uniform:LO:HI, lognormal:MEDIAN:SIGMA, exp:MEAN)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Generation speed after the first token (0: instant)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-drop", type=float, default=0.0, help="Fraction of requests dropped without a response")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="retry-after of a 429, in seconds")
+    parser.add_argument("--stall", type=float, default=1.0, help="Seconds a dropped request is held before the connection closes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = MockOpenAI((args.host, args.port), args.latency, args.tokens_per_sec, args.rate_429, args.rate_drop,
+                        args.retry_after, args.stall, args.seed)
+    print(f"Mock OpenAI API on {server.base_url} (Ctrl+C to stop)", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    print(json.dumps(server.counts))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
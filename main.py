@@ -1,59 +1,31 @@
 import os
-import sys
-import json
-import re
 import time
-import threading
 import logging
-import queue
+import threading
 import webbrowser
-import hashlib
 import tkinter as tk
-from datetime import timedelta
 from tkinter import filedialog, messagebox, scrolledtext, simpledialog
-from docx import Document
-from docx.shared import Pt, RGBColor
-from dotenv import load_dotenv
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
-# ================= CONFIGURATION =================
-VERSION = "v1.0.0"
-SETTINGS_FILE = "settings.json"
-TEMPLATES_FILE = "templates.json"
-LOG_FILE = "run.log"
-DEBUG_MODE = False
-
-MIN_QUESTION_LENGTH = 15
-MAX_TOKENS = 1500
-USD_TO_INR = 86.0 
+# Only light modules here, so the window appears quickly. The engine (openai,
+# python-docx, numpy) is imported by the worker thread when a run starts.
+from autodoc import JobQueue, JobRunner, QuestionLoader, RunControl, load_questions, default_output_path
+from autodoc.events import EventChannel
+from autodoc.config import (VERSION, SETTINGS_FILE, TEMPLATES_FILE, LOG_FILE, DEBUG_MODE, USD_TO_INR,
+                            DEFAULT_CONCURRENCY, MAX_CONCURRENCY, MAX_PARALLEL_JOBS, EXECUTION_MODES,
+                            DEFAULT_TEMPLATES, UI_FRAME_MS, UI_IDLE_MS, LOG_MAX_LINES, VOLUME_SIZE, VOLUME_COMBINE_MODES)
+from autodoc.metrics import format_routes
+from autodoc.backends import available_models, needs_api_key
+from autodoc.utils import load_json, save_json
 
+# ================= CONFIGURATION =================
 # Social Links
 LINKEDIN_URL = "https://www.linkedin.com/in/tamil-venthan4"
 GITHUB_URL = "https://github.com/Tamil-Venthan"
 UPDATE_URL = "https://github.com/Tamil-Venthan/AutoDocAI/releases" 
-
-MODEL_PRICING = {
-    "gpt-4o": (2.50, 10.00),
-    "gpt-4o-mini": (0.15, 0.60),
-    "gpt-3.5-turbo": (0.50, 1.50)
-}
-
-DEFAULT_TEMPLATES = {
-    "UPSC Mains Expert": "You are a UPSC Civil Services expert. Answer strictly in UPSC Mains format: Introduction, Body (with headings & bullets), and Conclusion.",
-    "UPSC Ethics Expert": "You are an expert in UPSC Ethics. Provide answers with real-life examples, case studies, and ethical frameworks.",
-    "UPSC GS Expert": "You are a UPSC General Studies expert. Provide detailed, well-structured answers with relevant data and examples.",
-    "UPSC Essay Expert": "You are an expert essay writer for UPSC. Craft comprehensive essays with clear introductions, coherent arguments, and impactful conclusions.",
-    "AI Tutor": "You are an AI tutor. Explain concepts clearly and concisely, using examples and analogies where appropriate.",
-    "Tech Specialist": "You are a technology specialist. Provide detailed technical explanations and insights.",
-    "Medical Expert": "You are a medical expert. Provide accurate and detailed medical information and explanations.",
-    "Legal Advisor": "You are a legal advisor. Provide clear and precise legal explanations and advice.",
-    "Financial Analyst": "You are a financial analyst. Provide detailed financial insights and analysis.",
-    "Scientific Researcher": "You are a scientific researcher. Provide thorough and evidence-based scientific explanations.",
-    "Creative Writer": "You are a creative writer. Craft engaging and imaginative content with vivid descriptions.",
-    "General Professional": "You are a domain expert. Answer clearly and professionally."
-}
+NO_HARD_MODEL = "(same)"
+NO_COMBINE = "(none)"
 
 USER_GUIDE_TEXT = """
 📘 AutoDoc AI – User Guide
@@ -97,125 +69,19 @@ Best for:
 
 Temperature:`0.4 – 0.6`
 
+🌙 Batch Mode (Large question banks)
+Set Mode to `Batch` to submit all questions to the OpenAI Batch API.
+Results arrive within 24h at ~50% of the normal cost. You can close
+the app and press START later to resume polling.
+
 💰 COST ESTIMATE (per 100 Qs):
 • gpt-4o-mini: ₹10–₹20
 • gpt-4o: ₹50–₹80
 """
 
-# Setup Logging
-log_level = logging.DEBUG if DEBUG_MODE else logging.INFO
-logging.basicConfig(filename=LOG_FILE, level=log_level, format="%(asctime)s - %(levelname)s - %(message)s")
-load_dotenv()
-
-# ================= API WRAPPER =================
-class OpenAIClient:
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
-
-    def generate_answer(self, system_prompt, user_prompt, model, temp, max_tokens):
-        retries = 3
-        base_delay = 2
-        for attempt in range(retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=temp,
-                    max_tokens=max_tokens
-                )
-                return response
-            except (RateLimitError, APITimeoutError) as e:
-                wait_time = base_delay * (2 ** attempt)
-                logging.warning(f"Retry ({attempt+1}) due to: {e}. Waiting {wait_time}s...")
-                time.sleep(wait_time)
-            except Exception as e:
-                logging.exception("API Error")
-                raise e
-        raise Exception("Max retries exceeded.")
-
-# ================= HELPER FUNCTIONS =================
-def get_progress_filename(input_path):
-    file_hash = hashlib.md5(input_path.encode('utf-8')).hexdigest()
-    return f"progress_{file_hash}.json"
-
-def load_json(file, default):
-    if os.path.exists(file):
-        try:
-            with open(file, "r") as f: return json.load(f)
-        except: pass
-    return default
-
-def save_json(file, data):
-    try:
-        with open(file, "w") as f: json.dump(data, f)
-    except: pass
-
-# --- FIXED FORMATTING LOGIC START ---
-def add_formatted_text(paragraph, text):
-    """
-    Splits text by '**' and applies bold formatting to the bold parts.
-    Example: "This is **important** text" -> "This is " (normal) + "important" (bold) + " text" (normal)
-    """
-    parts = re.split(r'(\*\*.*?\*\*)', text)
-    for part in parts:
-        if part.startswith("**") and part.endswith("**"):
-            # Remove the asterisks and make bold
-            clean_part = part[2:-2]
-            paragraph.add_run(clean_part).bold = True
-        else:
-            paragraph.add_run(part)
-
-def parse_markdown_to_docx(doc, text):
-    lines = text.split('\n')
-    in_code_block = False
-
-    for line in lines:
-        stripped = line.strip()
-        
-        # 1. Handle Code Blocks
-        if stripped.startswith("```"):
-            in_code_block = not in_code_block
-            continue
-        
-        if in_code_block:
-            p = doc.add_paragraph()
-            run = p.add_run(line)
-            run.font.name = 'Consolas'
-            run.font.size = Pt(9)
-            run.font.color.rgb = RGBColor(0, 100, 0) # Green code
-            p.paragraph_format.left_indent = Pt(20)
-            continue
-        
-        # 2. Handle Headings (Fixed ###)
-        if stripped.startswith("# "):
-            doc.add_paragraph(stripped[2:], style='Heading 1')
-        elif stripped.startswith("## "):
-            doc.add_paragraph(stripped[3:], style='Heading 2')
-        elif stripped.startswith("### "):
-            doc.add_paragraph(stripped[4:], style='Heading 3')
-        elif stripped.startswith("#### "):
-            doc.add_paragraph(stripped[5:], style='Heading 4')
-            
-        # 3. Handle Lists
-        elif stripped.startswith("- ") or stripped.startswith("* "):
-            p = doc.add_paragraph(style='List Bullet')
-            add_formatted_text(p, stripped[2:]) # Apply formatting inside list
-            
-        elif re.match(r"^\d+\.", stripped):
-            p = doc.add_paragraph(style='List Number')
-            # Remove "1. " from start
-            clean_text = re.sub(r"^\d+\.\s*", "", stripped)
-            add_formatted_text(p, clean_text)
-
-        # 4. Normal Text
-        else:
-            if not stripped: continue
-            p = doc.add_paragraph()
-            add_formatted_text(p, line)
-# --- FIXED FORMATTING LOGIC END ---
+def setup_logging():
+    log_level = logging.DEBUG if DEBUG_MODE else logging.INFO
+    logging.basicConfig(filename=LOG_FILE, level=log_level, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # ================= MAIN APP =================
 class AutoDocAI:
@@ -224,19 +90,24 @@ class AutoDocAI:
         self.root.title(f"AutoDoc AI {VERSION}")
         self.root.geometry("1100x1000")
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        setup_logging() # Cheap; the heavy start-up work is in load_state
 
         self.root.bind("<Control-o>", lambda e: self.select_input())
         self.root.bind("<Control-Return>", lambda e: self.start())
         self.root.bind("<Escape>", lambda e: self.stop())
 
-        self.msg_queue = queue.Queue()
-        self.stop_event = threading.Event()
+        self.events = EventChannel()
+        self.ui_delay = UI_FRAME_MS
+        self.control = RunControl()
         self.worker_thread = None
+        self.engine = None
         self.is_paused = False
         self.questions = []
-        
-        self.templates = load_json(TEMPLATES_FILE, DEFAULT_TEMPLATES)
-        self.settings = load_json(SETTINGS_FILE, {"theme": "cyborg", "last_template": "UPSC Mains Expert"})
+        # Defaults until load_state has read the saved files (see apply_state)
+        self.state_loaded = False
+        self.start_pending = False # START pressed before then
+        self.jobs = JobQueue(path=None)
+        self.templates = dict(DEFAULT_TEMPLATES)
 
         self.input_path = tk.StringVar()
         self.output_path = tk.StringVar()
@@ -244,13 +115,65 @@ class AutoDocAI:
         self.temp_var = tk.DoubleVar(value=0.5)
         self.api_key_var = tk.StringVar(value=os.getenv("OPENAI_API_KEY", ""))
         self.show_key = tk.BooleanVar(value=False)
-        self.current_template = tk.StringVar(value=self.settings.get("last_template", "UPSC Mains Expert"))
-        self.current_theme = tk.StringVar(value=self.settings.get("theme", "cyborg"))
+        self.current_template = tk.StringVar(value="UPSC Mains Expert")
+        self.current_theme = tk.StringVar(value="cyborg")
         self.page_break_var = tk.BooleanVar(value=False)
+        self.concurrency_var = tk.IntVar(value=DEFAULT_CONCURRENCY)
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.mode_var = tk.StringVar(value=EXECUTION_MODES[0])
+        self.stream_var = tk.BooleanVar(value=False)
+        self.dedupe_var = tk.BooleanVar(value=False)
+        self.pack_var = tk.BooleanVar(value=False)
+        self.hard_model_var = tk.StringVar(value=NO_HARD_MODEL)
+        self.adaptive_var = tk.BooleanVar(value=False)
+        self.volume_size_var = tk.IntVar(value=VOLUME_SIZE)
+        self.combine_var = tk.StringVar(value=VOLUME_COMBINE_MODES[0])
+        self.preview_key = None
         
         self.stats = {"cost": 0.0, "processed": 0}
         self.setup_ui()
-        self.root.after(100, self.process_queue)
+        self.root.after(UI_FRAME_MS, self.process_queue)
+        # Once the first frame is drawn
+        self.root.after_idle(lambda: threading.Thread(target=self.load_state, daemon=True).start())
+
+    def load_state(self):
+        # Background thread: .env, settings, profiles and the saved job queue
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.events.put("state", {
+            "settings": load_json(SETTINGS_FILE, {}),
+            "templates": load_json(TEMPLATES_FILE, DEFAULT_TEMPLATES),
+            "jobs": JobQueue(),
+            "api_key": os.getenv("OPENAI_API_KEY", ""),
+        })
+
+    def apply_state(self, state):
+        s = state["settings"]
+        self.templates = state["templates"]
+        for key, var in (("last_template", self.current_template), ("concurrency", self.concurrency_var),
+                         ("use_cache", self.use_cache_var), ("mode", self.mode_var), ("stream", self.stream_var),
+                         ("dedupe", self.dedupe_var), ("pack", self.pack_var),
+                         ("hard_model", self.hard_model_var), ("adaptive", self.adaptive_var),
+                         ("volume_size", self.volume_size_var), ("combine", self.combine_var)):
+            if key in s: var.set(s[key])
+        if s.get("theme", self.current_theme.get()) != self.current_theme.get():
+            self.current_theme.set(s["theme"])
+            ttk.Style().theme_use(s["theme"])
+        if not self.api_key_var.get(): self.api_key_var.set(state["api_key"])
+        self.cb_tpl['values'] = list(self.templates.keys())
+        self.txt_system.delete("1.0", tk.END)
+        self.txt_system.insert(tk.END, self.templates.get(self.current_template.get(), ""))
+        # Files added before the saved queue was read join it
+        jobs = state["jobs"]
+        for job in self.jobs.jobs: jobs.add(job.input_path, job.output_path)
+        self.jobs = jobs
+        self.refresh_jobs()
+        if self.jobs.pending() and not self.start_pending:
+            self.log_gui(f"Restored {len(self.jobs.pending())} queued file(s). Press START to continue.")
+        self.state_loaded = True
+        if self.start_pending:
+            self.start_pending = False
+            self.start()
 
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding=20)
@@ -287,6 +210,41 @@ class AutoDocAI:
         self.btn_browse.grid(row=0, column=2)
         f_grid.columnconfigure(1, weight=1)
         ttk.Checkbutton(file_fr, text="Insert Page Break after each Answer", variable=self.page_break_var, bootstyle="square-toggle").pack(anchor="w", pady=(5,0))
+        self.chk_cache = ttk.Checkbutton(file_fr, text="Reuse cached answers (same profile, question, model & temperature)", variable=self.use_cache_var, bootstyle="square-toggle")
+        self.chk_cache.pack(anchor="w", pady=(5,0))
+        self.chk_stream = ttk.Checkbutton(file_fr, text="Stream answers (live preview, time-to-first-token stats)", variable=self.stream_var, bootstyle="square-toggle")
+        self.chk_stream.pack(anchor="w", pady=(5,0))
+        self.chk_dedupe = ttk.Checkbutton(file_fr, text="Answer near-duplicate questions once (repeats refer to the first)", variable=self.dedupe_var, bootstyle="square-toggle")
+        self.chk_dedupe.pack(anchor="w", pady=(5,0))
+        self.chk_pack = ttk.Checkbutton(file_fr, text="Pack short questions into one request (fewer calls, not streamed)", variable=self.pack_var, bootstyle="square-toggle")
+        self.chk_pack.pack(anchor="w", pady=(5,0))
+        self.chk_adaptive = ttk.Checkbutton(file_fr, text="Size answers per question (short / standard / long; cut-off answers retried bigger)", variable=self.adaptive_var, bootstyle="square-toggle")
+        self.chk_adaptive.pack(anchor="w", pady=(5,0))
+        vol_fr = ttk.Frame(file_fr)
+        vol_fr.pack(anchor="w", pady=(5,0))
+        ttk.Label(vol_fr, text="Split output into volumes of").pack(side=LEFT)
+        self.spin_volume = ttk.Spinbox(vol_fr, textvariable=self.volume_size_var, from_=0, to=100000, increment=100, width=6)
+        self.spin_volume.pack(side=LEFT, padx=5)
+        ttk.Label(vol_fr, text="questions (0 = one file), then build:").pack(side=LEFT)
+        self.cb_combine = ttk.Combobox(vol_fr, textvariable=self.combine_var, values=[NO_COMBINE] + VOLUME_COMBINE_MODES, state="readonly", width=8)
+        self.cb_combine.pack(side=LEFT, padx=5)
+
+        # Job Queue
+        job_fr = ttk.Labelframe(main_frame, text=" 📚 Job Queue (multiple files) ", padding=10, bootstyle="info")
+        job_fr.pack(fill=X, pady=5)
+        job_bar = ttk.Frame(job_fr)
+        job_bar.pack(fill=X, pady=(0, 5))
+        self.btn_add_files = ttk.Button(job_bar, text="➕ Add Files", command=self.add_job_files, bootstyle="outline-info")
+        self.btn_add_files.pack(side=LEFT)
+        self.btn_add_folder = ttk.Button(job_bar, text="📁 Add Folder", command=self.add_job_folder, bootstyle="outline-info")
+        self.btn_add_folder.pack(side=LEFT, padx=5)
+        self.btn_clear_jobs = ttk.Button(job_bar, text="🧹 Clear Finished", command=self.clear_finished_jobs, bootstyle="outline-secondary")
+        self.btn_clear_jobs.pack(side=LEFT)
+        self.tree_jobs = ttk.Treeview(job_fr, columns=("file", "status", "progress", "cost"), show="headings", height=4)
+        for col, title, width in (("file", "File", 420), ("status", "Status", 90), ("progress", "Progress", 120), ("cost", "Cost", 90)):
+            self.tree_jobs.heading(col, text=title)
+            self.tree_jobs.column(col, width=width, stretch=(col == "file"))
+        self.tree_jobs.pack(fill=X)
 
         # Prompt
         sys_fr = ttk.Labelframe(main_frame, text=" 🧠 System Instruction ", padding=10, bootstyle="warning")
@@ -312,8 +270,13 @@ class AutoDocAI:
         set_fr.pack(side=LEFT, fill=BOTH, expand=True, padx=(0, 10))
         
         ttk.Label(set_fr, text="Model:").pack(side=LEFT)
-        self.cb_model = ttk.Combobox(set_fr, textvariable=self.model_var, values=list(MODEL_PRICING.keys()), state="readonly", width=15)
+        models = available_models()
+        self.cb_model = ttk.Combobox(set_fr, textvariable=self.model_var, values=models, state="readonly", width=15)
         self.cb_model.pack(side=LEFT, padx=5)
+
+        ttk.Label(set_fr, text="Hard Qs:").pack(side=LEFT, padx=(10,5))
+        self.cb_hard_model = ttk.Combobox(set_fr, textvariable=self.hard_model_var, values=[NO_HARD_MODEL] + models, state="readonly", width=12)
+        self.cb_hard_model.pack(side=LEFT)
         
         ttk.Label(set_fr, text="Temp:").pack(side=LEFT, padx=(10,5))
         self.slider_temp = ttk.Scale(set_fr, variable=self.temp_var, from_=0.0, to=1.0, command=self.update_temp_label)
@@ -321,6 +284,14 @@ class AutoDocAI:
         self.lbl_temp_val = ttk.Label(set_fr, text="0.5", width=4, anchor="center")
         self.lbl_temp_val.pack(side=LEFT, padx=(5,0))
 
+        ttk.Label(set_fr, text="Mode:").pack(side=LEFT, padx=(10,5))
+        self.cb_mode = ttk.Combobox(set_fr, textvariable=self.mode_var, values=EXECUTION_MODES, state="readonly", width=10)
+        self.cb_mode.pack(side=LEFT)
+
+        ttk.Label(set_fr, text="Parallel:").pack(side=LEFT, padx=(10,5))
+        self.spin_concurrency = ttk.Spinbox(set_fr, textvariable=self.concurrency_var, from_=1, to=MAX_CONCURRENCY, width=4)
+        self.spin_concurrency.pack(side=LEFT)
+
         # Stats
         cost_fr = ttk.Labelframe(ctrl_fr, text=" Live Stats ", padding=10, bootstyle="success")
         cost_fr.pack(side=LEFT, fill=BOTH)
@@ -328,6 +299,14 @@ class AutoDocAI:
         self.lbl_cost.pack(anchor="w")
         self.lbl_eta = ttk.Label(cost_fr, text="ETA: --:--", font=("Consolas", 10), bootstyle="secondary")
         self.lbl_eta.pack(anchor="w")
+        self.lbl_cache = ttk.Label(cost_fr, text="Cache: 0 hits | 0 misses", font=("Consolas", 10), bootstyle="secondary")
+        self.lbl_cache.pack(anchor="w")
+        self.lbl_latency = ttk.Label(cost_fr, text="TTFT: -- | -- tok/s", font=("Consolas", 10), bootstyle="secondary")
+        self.lbl_latency.pack(anchor="w")
+        self.lbl_throughput = ttk.Label(cost_fr, text="Throughput: -- Q/min | -- tok/s", font=("Consolas", 10), bootstyle="secondary")
+        self.lbl_throughput.pack(anchor="w")
+        self.lbl_routes = ttk.Label(cost_fr, text="Routes: --", font=("Consolas", 10), bootstyle="secondary")
+        self.lbl_routes.pack(anchor="w")
 
         # Buttons
         btn_fr = ttk.Frame(main_frame)
@@ -338,10 +317,16 @@ class AutoDocAI:
         self.btn_pause.pack(side=LEFT, padx=5)
         self.btn_stop = ttk.Button(btn_fr, text="⏹ STOP (Esc)", command=self.stop, bootstyle="danger", width=15, state="disabled")
         self.btn_stop.pack(side=LEFT, padx=5)
+        self.btn_estimate = ttk.Button(btn_fr, text="🧮 ESTIMATE", command=self.show_estimate, bootstyle="outline-info", width=15)
+        self.btn_estimate.pack(side=RIGHT, padx=5)
 
         # Logs
         self.progress = ttk.Floodgauge(main_frame, bootstyle="info", text="Ready", mask="{}%")
         self.progress.pack(fill=X, pady=10)
+        preview_fr = ttk.Labelframe(main_frame, text=" 👁 Live Preview ", padding=10)
+        preview_fr.pack(fill=BOTH, expand=True, pady=(0, 5))
+        self.preview_box = scrolledtext.ScrolledText(preview_fr, height=6, state='disabled', wrap=tk.WORD, font=("Segoe UI", 9))
+        self.preview_box.pack(fill=BOTH, expand=True)
         log_fr = ttk.Labelframe(main_frame, text=" Logs ", padding=10)
         log_fr.pack(fill=BOTH, expand=True)
         self.log_box = scrolledtext.ScrolledText(log_fr, height=5, state='disabled', font=("Consolas", 9))
@@ -370,22 +355,71 @@ class AutoDocAI:
         st.insert(tk.END, USER_GUIDE_TEXT)
         st.config(state='disabled')
 
+    def show_estimate(self):
+        if isinstance(self.questions, QuestionLoader) and not self.questions.finished:
+            return messagebox.showinfo("Loading", "Questions are still loading. Try again in a moment.")
+        questions = list(self.questions)
+        current = os.path.abspath(self.input_path.get() or ".")
+        others = [job.input_path for job in self.jobs.pending() if job.input_path != current]
+        if not questions and not others: return messagebox.showwarning("Error", "Load file first.")
+        sys_prompt = self.txt_system.get("1.0", tk.END).strip()
+        concurrency, model = self.get_concurrency(), self.model_var.get()
+        self.btn_estimate.config(state="disabled")
+        if others: self.log_gui(f"Estimating (reading {len(others)} queued file(s))...")
+        threading.Thread(target=self.run_estimate, args=(questions, others, sys_prompt, concurrency, model), daemon=True).start()
+
+    def run_estimate(self, questions, paths, sys_prompt, concurrency, model):
+        # Worker thread: reading the queued files can take a while; the result comes back as an "estimate" event
+        try:
+            for path in paths: questions.extend(load_questions(path))
+            from autodoc.estimate import estimate_run, format_estimate
+            report = format_estimate(estimate_run(questions, sys_prompt, concurrency)) if questions else None
+            self.events.put("estimate", {"count": len(questions), "concurrency": concurrency, "model": model, "report": report})
+        except Exception as e:
+            logging.exception("Estimate failed")
+            self.events.put("estimate", {"error": str(e)})
+
+    def show_estimate_result(self, d):
+        self.btn_estimate.config(state="normal")
+        if d.get("error"): return messagebox.showerror("Estimate", f"Could not estimate the run: {d['error']}")
+        if not d["report"]: return messagebox.showwarning("Error", "No questions found in the queued files.")
+        top = tk.Toplevel(self.root)
+        top.title("Dry Run Estimate")
+        top.geometry("760x260")
+        st = scrolledtext.ScrolledText(top, font=("Consolas", 10), padx=10, pady=10)
+        st.pack(fill=BOTH, expand=True)
+        st.insert(tk.END, f"{d['count']} questions · concurrency {d['concurrency']} · selected model: {d['model']}\n\n{d['report']}")
+        st.config(state='disabled')
+
     def toggle_controls(self, enable=True):
         state = "normal" if enable else "disabled"
         read_only = "readonly" if enable else "disabled"
         self.ent_input.config(state=state)
         self.btn_browse.config(state=state)
+        self.btn_add_files.config(state=state)
+        self.btn_add_folder.config(state=state)
+        self.btn_clear_jobs.config(state=state)
         self.cb_tpl.config(state=read_only)
         self.txt_system.config(state=state)
         self.cb_model.config(state=read_only)
+        self.cb_hard_model.config(state=read_only)
         self.slider_temp.config(state=state)
+        self.spin_concurrency.config(state=state)
+        self.cb_mode.config(state=read_only)
+        self.chk_cache.config(state=state)
+        self.chk_stream.config(state=state)
+        self.chk_dedupe.config(state=state)
+        self.chk_pack.config(state=state)
+        self.chk_adaptive.config(state=state)
+        self.spin_volume.config(state=state)
+        self.cb_combine.config(state=read_only)
         self.cb_theme.config(state=read_only)
     
     def load_template(self, event):
         name = self.current_template.get()
         self.txt_system.delete("1.0", tk.END)
         self.txt_system.insert(tk.END, self.templates.get(name, ""))
-        save_json(SETTINGS_FILE, {"last_template": name, "theme": self.current_theme.get()})
+        self.save_settings()
 
     def save_new_template(self):
         name = simpledialog.askstring("Save Profile", "Profile Name:")
@@ -407,64 +441,194 @@ class AutoDocAI:
     def change_theme(self, event):
         t = self.current_theme.get()
         ttk.Style().theme_use(t)
-        save_json(SETTINGS_FILE, {"last_template": self.current_template.get(), "theme": t})
+        self.save_settings()
+
+    def save_settings(self):
+        if not self.state_loaded: return # Would overwrite the saved settings with defaults
+        save_json(SETTINGS_FILE, {
+            "last_template": self.current_template.get(),
+            "theme": self.current_theme.get(),
+            "concurrency": self.get_concurrency(),
+            "use_cache": self.use_cache_var.get(),
+            "mode": self.mode_var.get(),
+            "stream": self.stream_var.get(),
+            "dedupe": self.dedupe_var.get(),
+            "pack": self.pack_var.get(),
+            "hard_model": self.hard_model_var.get(),
+            "adaptive": self.adaptive_var.get(),
+            "volume_size": self.get_volume_size(),
+            "combine": self.combine_var.get()
+        })
+
+    def get_volume_size(self):
+        try: return max(0, int(self.volume_size_var.get()))
+        except (tk.TclError, ValueError): return VOLUME_SIZE
+
+    def get_concurrency(self):
+        try: return max(1, min(int(self.concurrency_var.get()), MAX_CONCURRENCY))
+        except (tk.TclError, ValueError): return DEFAULT_CONCURRENCY
 
     def select_input(self):
         p = filedialog.askopenfilename(filetypes=[("Word Files", "*.docx")])
         if p:
             self.input_path.set(p)
-            d, f = os.path.split(p)
-            self.output_path.set(os.path.join(d, f"{os.path.splitext(f)[0]}_Answers.docx"))
+            self.output_path.set(default_output_path(p))
             if os.path.exists(p):
-                doc = Document(p)
-                self.questions = [para.text.strip() for para in doc.paragraphs if len(para.text.strip()) >= MIN_QUESTION_LENGTH]
-                self.log_gui(f"Loaded {len(self.questions)} questions.")
+                # Read on a background thread; START can begin before it finishes
+                self.log_gui(f"Loading {os.path.basename(p)}...")
+                self.questions = QuestionLoader(p, on_progress=self.on_load_progress, on_done=self.on_loaded).start()
+
+    def has_questions(self):
+        if isinstance(self.questions, QuestionLoader) and not self.questions.finished: return True
+        return len(self.questions) > 0
+
+    def run_active(self):
+        return self.worker_thread is not None and self.worker_thread.is_alive()
+
+    def on_load_progress(self, fraction, count):
+        # Loader thread; once a run starts its own progress takes over the bar
+        if not self.run_active():
+            self.events.put("progress", {"val": int(fraction * 100), "text": f"Loading... {count} Qs"})
+
+    def on_loaded(self, loader):
+        if loader is not self.questions: return # Another file was selected meanwhile
+        if loader.error:
+            self.log_gui(f"⚠️ Could not read {os.path.basename(loader.input_path)}: {loader.error}")
+        else:
+            self.log_gui(f"Loaded {len(loader)} questions.")
+        if not self.run_active(): self.events.put("progress", {"val": 0, "text": "Ready"})
+
+    def add_job_files(self):
+        paths = filedialog.askopenfilenames(filetypes=[("Word Files", "*.docx")])
+        if paths: self.add_jobs(paths)
+
+    def add_job_folder(self):
+        d = filedialog.askdirectory()
+        if d: self.add_jobs([d])
+
+    def add_jobs(self, paths):
+        added = self.jobs.add_paths(paths)
+        self.refresh_jobs()
+        self.log_gui(f"Queued {len(added)} file(s).")
+
+    def clear_finished_jobs(self):
+        self.jobs.clear_finished()
+        self.refresh_jobs()
+
+    def refresh_jobs(self):
+        self.tree_jobs.delete(*self.tree_jobs.get_children())
+        for job in self.jobs.jobs: self.update_job_row(job.to_dict())
+
+    def update_job_row(self, d):
+        values = (os.path.basename(d['input_path']), d['status'], f"{d['processed']}/{d['total'] or '?'}", f"${d['cost']:.4f}")
+        if self.tree_jobs.exists(d['id']): self.tree_jobs.item(d['id'], values=values)
+        else: self.tree_jobs.insert("", tk.END, iid=d['id'], values=values)
 
     def log_gui(self, msg):
-        self.msg_queue.put(("log", msg))
+        self.events.put("log", msg)
 
     def process_queue(self):
+        # Applies everything that arrived since the last frame in one go. While busy,
+        # frames are spaced so updates take at most ~1/4 of the main loop; when
+        # quiet, polling backs off to UI_IDLE_MS.
+        started = time.perf_counter()
+        batch = None
         try:
-            while True:
-                t, d = self.msg_queue.get_nowait()
-                if t == "log":
-                    self.log_box.config(state='normal')
-                    self.log_box.insert(tk.END, f"• {d}\n")
-                    self.log_box.see(tk.END)
-                    self.log_box.config(state='disabled')
-                elif t == "progress":
-                    self.progress.configure(value=d['val'], text=d['text'])
-                elif t == "stats":
-                    self.lbl_cost.config(text=f"${d['usd']:.4f} | ₹{d['usd']*USD_TO_INR:.2f}")
-                    self.lbl_eta.config(text=f"ETA: {d['eta']}")
-                elif t == "done":
-                    messagebox.showinfo("Done", "Processing Complete")
-                    self.reset_ui()
-        except queue.Empty: pass
-        finally: self.root.after(100, self.process_queue)
+            batch = self.events.drain()
+            if batch: self.apply_events(batch)
+        except Exception:
+            logging.exception("UI update failed")
+        finally:
+            if batch:
+                spent_ms = (time.perf_counter() - started) * 1000
+                self.ui_delay = max(UI_FRAME_MS, int(spent_ms * 4))
+            else:
+                self.ui_delay = min(self.ui_delay * 2, UI_IDLE_MS)
+            self.root.after(self.ui_delay, self.process_queue)
+
+    def apply_events(self, batch):
+        if batch.logs or batch.dropped: self.append_logs(batch.logs, batch.dropped)
+        if "progress" in batch.latest:
+            d = batch.latest["progress"]
+            self.progress.configure(value=d['val'], text=d['text'])
+        if "stats" in batch.latest: self.show_stats(batch.latest["stats"])
+        for d in batch.jobs: self.update_job_row(d)
+        for d in batch.deltas: self.show_delta(d)
+        for t, d in batch.control:
+            if t == "done":
+                messagebox.showinfo("Done", "Processing Complete")
+                self.reset_ui()
+            elif t == "stopped":
+                self.reset_ui()
+            elif t == "state":
+                self.apply_state(d)
+            elif t == "estimate":
+                self.show_estimate_result(d)
+
+    def append_logs(self, lines, dropped):
+        text = "".join(f"• {line}\n" for line in lines)
+        if dropped: text = f"• … {dropped} earlier message(s) not shown\n" + text
+        self.log_box.config(state='normal')
+        self.log_box.insert(tk.END, text)
+        # Ring buffer: keep the last LOG_MAX_LINES lines
+        excess = int(self.log_box.index('end-1c').split('.')[0]) - 1 - LOG_MAX_LINES
+        if excess > 0: self.log_box.delete("1.0", f"{excess + 1}.0")
+        self.log_box.see(tk.END)
+        self.log_box.config(state='disabled')
+
+    def show_stats(self, d):
+        self.lbl_cost.config(text=f"${d['usd']:.4f} | ₹{d['usd']*USD_TO_INR:.2f}")
+        self.lbl_eta.config(text=f"ETA: {d['eta']}")
+        self.lbl_cache.config(text=f"Cache: {d['hits']} hits | {d['misses']} misses")
+        if d.get('ttft') is not None:
+            self.lbl_latency.config(text=f"TTFT: {d['ttft']:.2f}s | {d['tps']:.0f} tok/s")
+        if d.get('qpm') is not None:
+            self.lbl_throughput.config(text=f"Throughput: {d['qpm']:.1f} Q/min | {d['tok_s']:.0f} tok/s")
+        if d.get('routes'):
+            self.lbl_routes.config(text="Routes:\n" + format_routes(d['routes'], sep="\n"))
+
+    def show_delta(self, d):
+        # Follow one streaming answer at a time; the next one takes over when it finishes
+        key = (d.get('job'), d['index'])
+        if self.preview_key is None and not d.get('done'):
+            self.preview_key = key
+            self.preview_box.config(state='normal')
+            self.preview_box.delete("1.0", tk.END)
+            self.preview_box.insert(tk.END, f"Q{d['index']+1}:\n")
+            self.preview_box.config(state='disabled')
+        if key != self.preview_key: return
+        if d.get('done'):
+            self.preview_key = None
+            return
+        self.preview_box.config(state='normal')
+        self.preview_box.insert(tk.END, d['text'])
+        self.preview_box.see(tk.END)
+        self.preview_box.config(state='disabled')
 
     def toggle_pause(self):
         self.is_paused = not self.is_paused
+        if self.engine: self.engine.is_paused = self.is_paused
         self.btn_pause.config(text="▶ RESUME" if self.is_paused else "⏸ PAUSE")
         self.log_gui("Paused" if self.is_paused else "Resumed")
 
     def stop(self):
         if self.worker_thread and self.worker_thread.is_alive():
             if messagebox.askyesno("Confirm", "Stop processing?"):
-                self.stop_event.set()
+                self.control.set()
 
     def on_close(self):
         if self.worker_thread and self.worker_thread.is_alive():
             if messagebox.askyesno("Exit", "Process running. Stop & Save?"):
-                self.stop_event.set()
+                self.control.set()
                 self.root.attributes('-disabled', True) 
-                self.root.after(200, self.check_safe_exit)
+                self.root.after(50, self.check_safe_exit)
         else:
             self.root.destroy()
 
     def check_safe_exit(self):
+        # The worker returns right after a stop (requests in flight are not waited for)
         if self.worker_thread.is_alive():
-            self.root.after(200, self.check_safe_exit)
+            self.root.after(50, self.check_safe_exit)
         else:
             self.root.destroy()
 
@@ -475,96 +639,66 @@ class AutoDocAI:
         self.btn_stop.config(state="disabled")
 
     def start(self):
-        if not self.questions: return messagebox.showwarning("Error", "Load file first.")
+        if not self.state_loaded:
+            # Settings, profiles and the saved queue are still being read; start once they are in
+            if not self.start_pending: self.log_gui("Loading settings... the run starts as soon as they are in.")
+            self.start_pending = True
+            return
+        queued = self.jobs.pending()
+        if not self.has_questions() and not queued: return messagebox.showwarning("Error", "Load file first.")
         api_key = self.api_key_var.get()
-        if not api_key: return messagebox.showwarning("Error", "API Key required.")
+        hard_model = None if self.hard_model_var.get() == NO_HARD_MODEL else self.hard_model_var.get()
+        if not api_key and needs_api_key(self.model_var.get(), hard_model): return messagebox.showwarning("Error", "API Key required.")
         sys_prompt = self.txt_system.get("1.0", tk.END).strip()
         self.toggle_controls(False)
         self.btn_start.config(state="disabled")
         self.btn_pause.config(state="normal")
         self.btn_stop.config(state="normal")
-        self.stop_event.clear()
-        self.worker_thread = threading.Thread(target=self.worker, args=(sys_prompt, api_key), daemon=True)
+        self.control.clear()
+        self.stats = {"cost": 0.0, "processed": 0} # A resume restores the file's cost so far
+        self.save_settings()
+        self.is_paused = False
+        self.btn_pause.config(text="⏸ PAUSE")
+        on_event = self.events.put
+        mode = self.mode_var.get()
+        engine_kwargs = {"api_key": api_key, "system_prompt": sys_prompt, "model": self.model_var.get(),
+                         "temp": self.temp_var.get(), "concurrency": self.get_concurrency(),
+                         "page_break": self.page_break_var.get(), "use_cache": self.use_cache_var.get(),
+                         "stream": self.stream_var.get(), "dedupe": "reference" if self.dedupe_var.get() else None,
+                         "pack": self.pack_var.get(), "hard_model": hard_model,
+                         "adaptive": self.adaptive_var.get(), "volume_size": self.get_volume_size(),
+                         "combine": None if self.combine_var.get() == NO_COMBINE else self.combine_var.get()}
+
+        if queued:
+            # The selected single file joins the queue rather than running separately
+            if self.has_questions(): self.jobs.add(self.input_path.get(), self.output_path.get())
+            self.refresh_jobs()
+            self.engine = JobRunner(self.jobs, engine_kwargs, mode.lower(), MAX_PARALLEL_JOBS,
+                                    on_event=on_event, control=self.control)
+            target, args = self.engine.run, ()
+        else:
+            self.engine = None
+            target = self.run_single
+            args = (engine_kwargs, mode, self.questions, self.input_path.get(), self.output_path.get())
+        if mode == "Batch": self.btn_pause.config(state="disabled")
+        self.worker_thread = threading.Thread(target=target, args=args, daemon=True)
         self.worker_thread.start()
 
-    def worker(self, sys_prompt, api_key):
-        input_path = self.input_path.get()
-        in_file_name = os.path.basename(input_path)
-        out_path = self.output_path.get()
-        doc = Document(out_path) if os.path.exists(out_path) else Document()
-        
-        progress_file = get_progress_filename(in_file_name)
-        start_idx = 0
-        if os.path.exists(progress_file):
-            data = load_json(progress_file, {})
-            last_idx = data.get("last_index", -1)
-            if last_idx >= 0 and last_idx < len(self.questions) - 1:
-                start_idx = last_idx + 1
-                self.log_gui(f"Resuming from Question {start_idx + 1}...")
-
-        try:
-            client = OpenAIClient(api_key)
-            model = self.model_var.get()
-            temp = self.temp_var.get()
-            start_time = time.time()
-            processed_count = 0
-
-            for i in range(start_idx, len(self.questions)):
-                if self.stop_event.is_set(): break
-                while self.is_paused: time.sleep(0.5)
-
-                q = self.questions[i]
-                self.msg_queue.put(("progress", {"val": int((i/len(self.questions))*100), "text": f"Q{i+1}/{len(self.questions)}"}))
-
-                try:
-                    resp = client.generate_answer(sys_prompt, q, model, temp, MAX_TOKENS)
-                    ans = resp.choices[0].message.content
-                    pt = resp.usage.prompt_tokens
-                    ct = resp.usage.completion_tokens
-                    pi, po = MODEL_PRICING.get(model, (0,0))
-                    cost = (pt/1e6 * pi) + (ct/1e6 * po)
-                    processed_count += 1
-                    self.stats['cost'] += cost
-                    
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / processed_count
-                    remaining_qs = len(self.questions) - (i + 1)
-                    eta_str = str(timedelta(seconds=int(avg_time * remaining_qs)))
-
-                    self.msg_queue.put(("stats", {
-                        "usd": self.stats['cost'], 
-                        "eta": eta_str
-                    }))
-
-                    p = doc.add_paragraph()
-                    p.add_run(f"Q{i+1}: {q}").bold = True
-                    p.style = 'Heading 2'
-                    
-                    # Call the FIXED format parser
-                    parse_markdown_to_docx(doc, ans)
-                    
-                    doc.add_paragraph("_"*30)
-                    if self.page_break_var.get(): doc.add_page_break()
-
-                    save_json(progress_file, {"last_index": i})
-                    try: doc.save(out_path)
-                    except: self.log_gui("⚠️ Save delayed (File open)")
-
-                except Exception as e:
-                    self.log_gui(f"Error on Q{i+1}: {e}")
-
-            self.msg_queue.put(("progress", {"val": 100, "text": "Finished"}))
-            self.msg_queue.put(("done", None))
-            if os.path.exists(progress_file): os.remove(progress_file)
-
-        except Exception as e:
-            self.log_gui(f"Critical Worker Error: {e}")
-        finally:
-            try: doc.save(out_path)
-            except: pass
+    def run_single(self, engine_kwargs, mode, questions, input_path, output_path):
+        # Worker thread: the first run pays for importing the engine here, not the UI
+        from autodoc.engine import Engine
+        self.engine = Engine(**engine_kwargs, on_event=self.events.put, control=self.control, stats=self.stats)
+        self.engine.is_paused = self.is_paused
+        run = self.engine.run_batch if mode == "Batch" else self.engine.run
+        return run(questions, input_path, output_path)
 
 if __name__ == "__main__":
-    s = load_json(SETTINGS_FILE, {"theme": "cyborg"})
-    app = ttk.Window(themename=s.get("theme", "cyborg")) 
+    # The saved theme is applied with the other settings, once they are read
+    app = ttk.Window(themename="cyborg")
     AutoDocAI(app)
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    if threading.active_count() > 1:
+        # Requests abandoned by STOP may still be waiting on the network. Their
+        # questions are not journaled as done, so exit without waiting for them.
+        logging.shutdown()
+        os._exit(0)
\ No newline at end of file
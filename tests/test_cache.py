@@ -0,0 +1,41 @@
+import time
+
+from autodoc.cache import AnswerCache
+
+def test_put_get(tmp_path):
+    cache = AnswerCache(str(tmp_path / "cache.db"))
+    key = AnswerCache.make_key("Profile", " Define GDP. ", "gpt-4o-mini", 0.5)
+    assert key == AnswerCache.make_key("Profile", "Define GDP.", "gpt-4o-mini", 0.501)
+    assert cache.get(key) is None
+    cache.put(key, "Answer", 10, 20, "gpt-4o-mini", 1.5)
+    assert cache.get(key) == ("Answer", 10, 20)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.history("gpt-4o-mini") == (1, 20, 1.5)
+    cache.close()
+
+def test_evict_keeps_most_recently_used(tmp_path):
+    cache = AnswerCache(str(tmp_path / "cache.db"))
+    for k in "abc": cache.put(k, k, 1, 1)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.evict(max_age_days=90, max_entries=2)
+    assert cache.get("a") and cache.get("c") and cache.get("b") is None
+    cache.close()
+
+def test_evict_by_age(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnswerCache(path)
+    cache.put("old", "x", 1, 1)
+    with cache.conn: cache.conn.execute("UPDATE answers SET created = ? WHERE key = 'old'", (time.time() - 100 * 86400,))
+    cache.put("new", "y", 1, 1)
+    cache.close()
+    cache = AnswerCache(path, max_age_days=90) # Evicts on open
+    assert cache.get("old") is None and cache.get("new")
+    cache.close()
+
+def test_read_only(tmp_path):
+    path = str(tmp_path / "cache.db")
+    AnswerCache(path).put("k", "v", 1, 2, "gpt-4o-mini")
+    cache = AnswerCache(path, read_only=True)
+    assert cache.history("gpt-4o-mini")[0] == 1
+    cache.close()
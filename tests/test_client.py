@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from autodoc.client import RateLimiter, parse_duration, estimate_tokens
+from autodoc.control import Cancelled, RunControl
+
+def test_parse_duration():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("2") == 2
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+def test_estimate_tokens():
+    assert estimate_tokens("abcd" * 10) == 11
+    assert estimate_tokens("ab", "cd") == 2
+
+def test_acquire_within_budget_does_not_wait():
+    limiter = RateLimiter(rpm=60, tpm=6000)
+    started = time.monotonic()
+    for _ in range(3): limiter.acquire(100)
+    assert time.monotonic() - started < 0.1
+    assert limiter.requests.level == pytest.approx(57, abs=0.1)
+
+def test_settle_returns_unused_tokens():
+    limiter = RateLimiter(rpm=60, tpm=6000)
+    limiter.acquire(1000)
+    limiter.settle(1000, 200)
+    assert limiter.tokens.level == pytest.approx(5800, abs=1)
+
+def test_acquire_waits_for_refill():
+    limiter = RateLimiter(rpm=600, tpm=60000) # 10 requests per second
+    limiter.requests.level = 0
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert 0.05 < time.monotonic() - started < 1
+
+def test_update_follows_stricter_headers():
+    limiter = RateLimiter(rpm=500, tpm=100000)
+    limiter.update({"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-tokens": "50",
+                    "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+    assert limiter.requests.capacity == 100
+    assert limiter.tokens.level <= 50
+    assert limiter.blocked_until > time.monotonic() + 1
+
+def test_acquire_is_cancellable():
+    limiter = RateLimiter(rpm=60, tpm=6000)
+    limiter.backoff(60)
+    control = RunControl()
+    threading.Timer(0.05, control.set).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled): limiter.acquire(1, control)
+    assert time.monotonic() - started < 5
@@ -0,0 +1,50 @@
+import json
+import os
+
+from autodoc.journal import ProgressJournal
+from autodoc.utils import get_legacy_progress_filename
+
+def test_append_and_load(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    journal = ProgressJournal(str(path))
+    assert journal.append([{"index": 0, "cost": 0.25}, {"index": 2, "cost": 0.5}])
+    reloaded = ProgressJournal(str(path))
+    assert set(reloaded.done) == {0, 2}
+    assert reloaded.cost == 0.75
+
+def test_load_skips_torn_and_bad_lines(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    path.write_text(json.dumps({"index": 0}) + "\nnot json\n" + json.dumps({"answer_sha": "x"}) + "\n"
+                    + json.dumps({"index": 1}) + '\n{"index": 2, "co', encoding="utf-8")
+    journal = ProgressJournal(str(path))
+    assert set(journal.done) == {0, 1}
+    # The next entry starts on a line of its own, not glued to the torn one
+    assert journal.append([{"index": 2}])
+    assert set(ProgressJournal(str(path)).done) == {0, 1, 2}
+
+def test_import_legacy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_path = str(tmp_path / "paper.docx")
+    legacy = get_legacy_progress_filename(input_path)
+    with open(legacy, "w") as f: json.dump({"last_index": 2}, f)
+    journal = ProgressJournal("progress.jsonl", input_path)
+    assert set(journal.done) == {0, 1, 2}
+    assert all(e["legacy"] for e in journal.done.values())
+    assert not os.path.exists(legacy)
+    assert set(ProgressJournal("progress.jsonl", input_path).done) == {0, 1, 2}
+
+def test_import_legacy_only_without_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_path = str(tmp_path / "paper.docx")
+    legacy = get_legacy_progress_filename(input_path)
+    with open(legacy, "w") as f: json.dump({"last_index": 5}, f)
+    ProgressJournal("progress.jsonl").append([{"index": 0}])
+    assert set(ProgressJournal("progress.jsonl", input_path).done) == {0}
+    assert os.path.exists(legacy)
+
+def test_clear(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    journal = ProgressJournal(str(path))
+    journal.append([{"index": 0}])
+    journal.clear()
+    assert not journal.done and not path.exists()
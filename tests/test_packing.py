@@ -0,0 +1,47 @@
+import json
+
+from autodoc.packing import Packer, parse_answers, split_tokens, question_id
+from autodoc.routing import Router
+
+IDS = {"Q1", "Q2", "Q3"}
+
+def test_parse_answers_object():
+    content = json.dumps({"answers": [{"id": "Q1", "answer": "One"}, {"id": "Q2", "answer": " Two "}]})
+    assert parse_answers(content, IDS) == {"Q1": "One", "Q2": "Two"}
+
+def test_parse_answers_fenced_list():
+    content = "```json\n" + json.dumps([{"id": "Q3", "answer": "Three"}]) + "\n```"
+    assert parse_answers(content, IDS) == {"Q3": "Three"}
+
+def test_parse_answers_id_map():
+    assert parse_answers(json.dumps({"answers": {"Q1": "One", "Q2": "Two"}}), IDS) == {"Q1": "One", "Q2": "Two"}
+
+def test_parse_answers_skips_bad_entries():
+    content = json.dumps({"answers": [
+        {"id": "Q1", "answer": ""},       # empty
+        {"id": "Q9", "answer": "Nine"},   # not asked
+        {"id": "Q2", "answer": 2},        # not text
+        "Q3",                             # not an object
+        {"id": "Q3", "answer": "Three"},
+        {"id": "Q3", "answer": "Again"},  # first one wins
+    ]})
+    assert parse_answers(content, IDS) == {"Q3": "Three"}
+
+def test_parse_answers_malformed():
+    assert parse_answers('{"answers": [{"id": "Q1", "answer": "cut o', IDS) == {}
+    assert parse_answers("", IDS) == {}
+    assert parse_answers(None, IDS) == {}
+    assert parse_answers(json.dumps({"answers": "none"}), IDS) == {}
+
+def test_split_tokens_adds_up():
+    assert split_tokens(10, [1, 1, 1]) == [4, 3, 3]
+    assert sum(split_tokens(101, [5, 0, 17, 3])) == 101
+    assert split_tokens(7, [0, 0]) == [4, 3]
+
+def test_packer_takes_short_questions_only():
+    packer = Packer(Router("gpt-4o-mini", adaptive=True))
+    assert packer.fits("Define inflation.")
+    assert not packer.fits("Critically analyse the role of the Finance Commission. (15 marks)")
+    pack = [(0, "Define inflation."), (1, "What is GDP?")]
+    assert packer.pack_tokens(pack) == sum(packer.answer_tokens(q) for _, q in pack)
+    assert question_id(0) == "Q1"
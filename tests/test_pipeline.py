@@ -0,0 +1,60 @@
+"""End-to-end runs on the offline "fake" backend (see backends.py)."""
+import os
+
+from docx import Document
+
+from autodoc.engine import Engine
+from autodoc.journal import ProgressJournal
+from autodoc.utils import get_progress_filename
+
+QUESTIONS = ["Define inflation.", "What is GDP?", "Explain the causes of inflation.",
+             "Critically analyse the role of the RBI. (15 marks)", "Define fiscal deficit."]
+
+def make_input(tmp_path):
+    path = str(tmp_path / "paper.docx")
+    doc = Document()
+    for q in QUESTIONS: doc.add_paragraph(q)
+    doc.save(path)
+    return path
+
+def headings(path):
+    return [p.text for p in Document(path).paragraphs if p.text.startswith("Q")]
+
+def run(input_path, out_path, **kwargs):
+    events = []
+    engine = Engine("", "You are an economics tutor.", model="fake:test", use_cache=False,
+                    on_event=lambda kind, data: events.append((kind, data)), **kwargs)
+    return engine.run(list(QUESTIONS), input_path, out_path), engine, events
+
+def test_run_answers_every_question(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_path, out_path = make_input(tmp_path), str(tmp_path / "answers.docx")
+    ok, engine, events = run(input_path, out_path, concurrency=4)
+    assert ok and ("done", None) in events
+    assert headings(out_path) == [f"Q{i+1}: {q}" for i, q in enumerate(QUESTIONS)]
+    assert not os.path.exists(get_progress_filename(input_path)) # Cleared once complete
+
+def test_resume_skips_journaled_questions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_path, out_path = make_input(tmp_path), str(tmp_path / "answers.docx")
+    # As left by a run that was stopped after Q1, Q2 and Q4 were saved
+    doc = Document()
+    for i in (0, 1, 3): doc.add_paragraph(f"Q{i+1}: {QUESTIONS[i]}")
+    doc.save(out_path)
+    ProgressJournal(get_progress_filename(input_path)).append([{"index": i, "cost": 0.0} for i in (0, 1, 3)])
+    ok, engine, events = run(input_path, out_path)
+    assert ok
+    assert headings(out_path) == [f"Q{i+1}: {QUESTIONS[i]}" for i in (0, 1, 3, 2, 4)]
+    texts = [p.text for p in Document(out_path).paragraphs]
+    assert texts.index("Remaining questions") > texts.index(f"Q3: {QUESTIONS[2]}")
+    assert any(t.startswith("Retried questions") for t in texts)
+
+def test_packed_answers_count_under_short_route(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_path, out_path = make_input(tmp_path), str(tmp_path / "answers.docx")
+    ok, engine, events = run(input_path, out_path, pack=True)
+    assert ok
+    assert len(headings(out_path)) == len(QUESTIONS)
+    routes = engine.metrics.routes()
+    assert "packed" not in routes
+    assert routes["short"]["questions"] == 3
@@ -0,0 +1,48 @@
+from autodoc.config import MAX_TOKENS, ROUTE_MAX_TOKENS, ESCALATE_MAX_TOKENS
+from autodoc.routing import Router
+
+def test_classify():
+    router = Router("gpt-4o-mini")
+    assert router.classify("1. Define fiscal deficit.") == "short"
+    assert router.classify("Explain the causes of inflation. (5 marks)") == "short"
+    assert router.classify("Explain the causes of inflation in 100 words.") == "short"
+    assert router.classify("Explain the causes of inflation.") == "standard"
+    assert router.classify("Explain the causes of inflation. (15 marks)") == "long"
+    assert router.classify("Critically examine the causes of inflation.") == "long"
+    assert router.classify("Explain the causes of inflation in 250 words.") == "long"
+    assert router.classify("Explain " + "the causes of inflation and " * 20) == "long"
+
+def test_essay_profile_makes_every_question_long():
+    router = Router("gpt-4o-mini", system_prompt="You write essays for the exam.")
+    assert router.classify("Define fiscal deficit.") == "long"
+
+def test_route_uses_hard_model_for_long_questions():
+    router = Router("gpt-4o-mini", hard_model="gpt-4o")
+    assert router.route("Critically analyse federalism.").model == "gpt-4o"
+    assert router.route("Define federalism.").model == "gpt-4o-mini"
+    assert Router("gpt-4o", hard_model="gpt-4o").hard_model is None
+
+def test_max_tokens():
+    assert Router("gpt-4o-mini").max_tokens("short", "Define GDP.") == MAX_TOKENS
+    router = Router("gpt-4o-mini", adaptive=True)
+    assert router.max_tokens("short", "Define GDP.") == ROUTE_MAX_TOKENS["short"]
+    # A stated word limit wins over the route's budget
+    assert router.max_tokens("short", "Define GDP in 50 words.") < ROUTE_MAX_TOKENS["short"]
+    concise = Router("gpt-4o-mini", system_prompt="Answer concisely.", adaptive=True)
+    assert concise.max_tokens("standard", "Explain GDP.") < ROUTE_MAX_TOKENS["standard"]
+
+def test_escalate_needs_adaptive():
+    assert Router("gpt-4o-mini", hard_model="gpt-4o").escalate("gpt-4o-mini", 400) is None
+
+def test_escalate():
+    router = Router("gpt-4o-mini", adaptive=True)
+    assert router.escalate("gpt-4o-mini", 400) == ("gpt-4o-mini", 800)
+    assert router.escalate("gpt-4o-mini", 3000) == ("gpt-4o-mini", ESCALATE_MAX_TOKENS)
+    assert router.escalate("gpt-4o-mini", ESCALATE_MAX_TOKENS) is None
+
+def test_escalate_to_hard_model():
+    router = Router("gpt-4o-mini", hard_model="gpt-4o", adaptive=True)
+    assert router.escalate("gpt-4o-mini", 400) == ("gpt-4o", 800)
+    # At the cap, only the model can still change
+    assert router.escalate("gpt-4o-mini", ESCALATE_MAX_TOKENS) == ("gpt-4o", ESCALATE_MAX_TOKENS)
+    assert router.escalate("gpt-4o", ESCALATE_MAX_TOKENS) is None